@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Forecasting the monthly sales of French champagne.
+
+Importing the package loads nothing: the names below are imported from
+their submodule on first access. The difference -> forecast -> score path
+needs NumPy only; statsmodels is imported on the first fit (arima.py),
+pandas when a CSV is parsed or a Series is built, matplotlib when a figure
+is drawn. Loading a saved model and forecasting from it (artifact.py) needs
+neither NumPy nor statsmodels. benchmark.py checks the import times.
+"""
+import importlib
+
+# public name -> submodule defining it
+_EXPORTS = {
+  'difference': 'differencing',
+  'inverse_difference': 'differencing',
+  'inverse_difference_steps': 'differencing',
+  'SeriesHistory': 'history',
+  'ForecastModel': 'artifact',
+  'BiasEstimator': 'bias',
+  'persistence': 'baselines',
+  'evaluate_baselines': 'baselines',
+  'rmse': 'baselines',
+  'fit_arma': 'batched_arma',
+  'evaluate_models': 'grid_search',
+  'evaluate_arima_model': 'grid_search',
+  'IncrementalARIMA': 'incremental',
+  'forecast_horizon': 'horizon',
+  'FitCache': 'model_cache',
+  'select_order': 'order_selection',
+  'cross_validate': 'cross_validation',
+  'diagnose': 'diagnostics',
+  'select_interval': 'diagnostics',
+  'stream_forecast': 'streaming',
+  'SeriesReport': 'reporting',
+  'ResultsStore': 'results_store',
+  'record_walk_forward': 'results_store',
+  'load': 'data_loader',
+  'load_series': 'data_loader',
+}
+
+def __getattr__(name):
+  if name not in _EXPORTS:
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+  value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+  globals()[name] = value
+  return value
+
+def __dir__():
+  return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""The statsmodels ARIMA model, imported on the first fit.
+
+statsmodels (with scipy and pandas behind it) takes far longer to import
+than most forecasts take to run, and forecasting from a saved artifact
+never needs it. Every module that fits goes through ARIMA() here, so
+importing the package costs NumPy alone.
+"""
+
+# statsmodels' ARIMA(endog, order), imported on first use
+def ARIMA(endog, order):
+  from statsmodels.tsa.arima_model import ARIMA
+  return ARIMA(endog, order=order)
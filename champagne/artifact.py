@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""Compact, versioned artifact of a finalized ARIMA model.
+
+Replaces pickling the whole ARIMAResults (and the __getnewargs__ monkey
+patch) with a small JSON file holding only what forecasting needs: the
+coefficients, the last p values and q residuals of the differenced series,
+the tail of the seasonal differences needed to undo d, the last interval
+observations for inverse_difference, and the bias estimator, which keeps
+updating from the one-step errors as observations are appended. Loading and
+forecasting use plain Python floats, so neither statsmodels nor NumPy is
+imported.
+"""
+import json
+import os
+from .bias import BiasEstimator
+
+FORMAT = 'arima-forecast'
+VERSION = 2
+
+# binomial weights of (1 - B)^d, lag 0 first
+def difference_weights(d):
+  weights = [1.0]
+  for k in range(1, d + 1):
+    weights.append(-weights[-1] * (d - k + 1) / k)
+  return weights
+
+class ForecastModel(object):
+
+  __slots__ = ('order', 'interval', 'const', 'arparams', 'maparams', 'w', 'resid',
+               'diff_tail', 'history_tail', 'bias_state', 'n_obs', '_weights')
+
+  def __init__(self, order, interval, const, arparams, maparams, w, resid, diff_tail,
+               history_tail, bias=0.0, n_obs=None):
+    self.order = tuple(int(x) for x in order)
+    self.interval = int(interval)
+    self.const = float(const)
+    self.arparams = [float(x) for x in arparams]
+    self.maparams = [float(x) for x in maparams]
+    self.w = [float(x) for x in w]
+    self.resid = [float(x) for x in resid]
+    self.diff_tail = [float(x) for x in diff_tail]
+    self.history_tail = [float(x) for x in history_tail]
+    self.bias_state = BiasEstimator.coerce(bias)
+    self.n_obs = n_obs
+    self._weights = difference_weights(self.order[1])
+
+  # state after fitting ARIMA(order) to difference(history, interval); bias is a
+  # number, an estimator, or 'mean'/'rolling' to estimate it from the residuals
+  @classmethod
+  def from_fit(cls, model_fit, history, order, interval=12, trend='nc', bias=0.0, window=12):
+    p, d, q = order
+    # only the tail of the history is needed for the state
+    tail = [float(x) for x in history[max(0, len(history) - (interval + p + d)):]]
+    diff = [tail[i] - tail[i - interval] for i in range(interval, len(tail))]
+    w = diff
+    for i in range(d):
+      w = [w[j] - w[j - 1] for j in range(1, len(w))]
+    resid = list(model_fit.resid)
+    bias = BiasEstimator.coerce(bias, resid, window)
+    const = model_fit.params[0] if trend == 'c' else 0.0
+    return cls(order, interval, const, model_fit.arparams, model_fit.maparams,
+               w[len(w) - p:] if p else [], resid[len(resid) - q:] if q else [],
+               diff[len(diff) - d:] if d else [], tail[len(tail) - interval:], bias, len(history))
+
+  # current bias correction
+  @property
+  def bias(self):
+    return self.bias_state.value
+
+  # one-step forecast of the d-differenced series
+  def _predict_w(self, w, resid):
+    w_hat = self.const
+    for i, phi in enumerate(self.arparams):
+      w_hat += phi * (w[-1 - i] - self.const)
+    for j, theta in enumerate(self.maparams):
+      w_hat += theta * resid[-1 - j]
+    return w_hat
+
+  # h-step forecast on the original scale, bias included
+  def forecast(self, steps=1):
+    p, d, q = self.order
+    w, resid = list(self.w), list(self.resid)
+    diffs, history = list(self.diff_tail), list(self.history_tail)
+    weights = self._weights
+    forecasts = list()
+    for step in range(steps):
+      w_hat = self._predict_w(w, resid)
+      diff_hat = w_hat
+      for k in range(1, d + 1):
+        diff_hat -= weights[k] * diffs[-k]
+      yhat = diff_hat + history[-self.interval]
+      forecasts.append(yhat + self.bias)
+      # future shocks are zero in expectation
+      w.append(w_hat)
+      resid.append(0.0)
+      diffs.append(diff_hat)
+      history.append(yhat)
+    return forecasts
+
+  # take in a new observation without refitting, updating the bias from its error
+  def append(self, obs):
+    p, d, q = self.order
+    obs = float(obs)
+    w_hat = self._predict_w(self.w, self.resid)
+    diff = obs - self.history_tail[0]
+    newest = [diff] + self.diff_tail[::-1]
+    w = sum(self._weights[k] * newest[k] for k in range(d + 1))
+    if p:
+      self.w = self.w[1:] + [w]
+    if q:
+      self.resid = self.resid[1:] + [w - w_hat]
+    # the error of the unbiased level forecast equals the error of w_hat
+    self.bias_state.update(w - w_hat)
+    if d:
+      self.diff_tail = self.diff_tail[1:] + [diff]
+    self.history_tail = self.history_tail[1:] + [obs]
+    if self.n_obs is not None:
+      self.n_obs += 1
+
+  def to_dict(self):
+    return {'format': FORMAT, 'version': VERSION, 'order': list(self.order),
+            'interval': self.interval, 'const': self.const, 'arparams': self.arparams,
+            'maparams': self.maparams, 'w': self.w, 'resid': self.resid,
+            'diff_tail': self.diff_tail, 'history_tail': self.history_tail,
+            'bias': self.bias, 'bias_state': self.bias_state.to_dict(), 'n_obs': self.n_obs}
+
+  @classmethod
+  def from_dict(cls, data):
+    if data.get('format') != FORMAT:
+      raise ValueError('not an %s artifact' % FORMAT)
+    if data.get('version') not in (1, VERSION):
+      raise ValueError('unsupported %s version %r' % (FORMAT, data.get('version')))
+    # version 1 artifacts carry a fixed bias only
+    bias = BiasEstimator.from_dict(data['bias_state']) if 'bias_state' in data else data['bias']
+    return cls(data['order'], data['interval'], data['const'], data['arparams'],
+               data['maparams'], data['w'], data['resid'], data['diff_tail'],
+               data['history_tail'], bias, data['n_obs'])
+
+  # written to a temporary file and renamed, so readers never see half a model
+  def save(self, path):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+      json.dump(self.to_dict(), f)
+    os.replace(tmp, path)
+
+  @classmethod
+  def load(cls, path):
+    with open(path) as f:
+      return cls.from_dict(json.load(f))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Vectorized naive baselines for walk-forward validation.
+
+For the naive baselines a walk-forward run over the test window is only a
+shifted (or cumulatively summed) view of the series, so the forecasts for
+every test step are computed in one pass. X may be a single series or a
+2-D array of series x time; every function works along the last axis.
+"""
+import numpy
+
+# persistence: the last observed value
+def persistence(X, train_size):
+  X = numpy.asarray(X)
+  return X[..., train_size - 1:X.shape[-1] - 1]
+
+# seasonal naive: the value one season back
+def seasonal_naive(X, train_size, lag=12):
+  X = numpy.asarray(X)
+  if train_size < lag:
+    raise ValueError('train_size %d is shorter than the seasonal lag %d' % (train_size, lag))
+  return X[..., train_size - lag:X.shape[-1] - lag]
+
+# drift: the last value plus the average change since the first observation
+def drift(X, train_size):
+  X = numpy.asarray(X, dtype='float64')
+  last = X[..., train_size - 1:X.shape[-1] - 1]
+  steps = numpy.arange(train_size - 1, X.shape[-1] - 1)
+  return last + (last - X[..., :1]) / steps
+
+# moving average of the last window observations
+def moving_average(X, train_size, window=3):
+  X = numpy.asarray(X, dtype='float64')
+  if train_size < window:
+    raise ValueError('train_size %d is shorter than the window %d' % (train_size, window))
+  csum = numpy.cumsum(X, axis=-1)
+  csum = numpy.concatenate([numpy.zeros(X.shape[:-1] + (1,)), csum], axis=-1)
+  ends = numpy.arange(train_size, X.shape[-1])
+  return (csum[..., ends] - csum[..., ends - window]) / window
+
+def rmse(actual, predicted):
+  return numpy.sqrt(numpy.mean((actual - predicted) ** 2, axis=-1))
+
+# RMSE of one walk-forward run whose predictions may be length-1 arrays
+def walk_forward_rmse(test, predictions):
+  return float(rmse(numpy.asarray(test, dtype='float64'), numpy.ravel(predictions).astype('float64')))
+
+def mae(actual, predicted):
+  return numpy.mean(numpy.abs(actual - predicted), axis=-1)
+
+# mean absolute percentage error, in percent; zero actuals are skipped
+def mape(actual, predicted):
+  with numpy.errstate(divide='ignore', invalid='ignore'):
+    ratio = numpy.abs((actual - predicted) / actual)
+  ratio = numpy.where(actual == 0, numpy.nan, ratio)
+  return 100.0 * numpy.nanmean(ratio, axis=-1)
+
+BASELINES = {
+  'persistence': persistence,
+  'seasonal_naive': seasonal_naive,
+  'drift': drift,
+  'moving_average': moving_average,
+}
+
+# score every baseline over the walk-forward test window
+def evaluate_baselines(X, train_size=None, names=None):
+  X = numpy.asarray(X)
+  if train_size is None:
+    train_size = int(X.shape[-1] * 0.50)
+  test = X[..., train_size:]
+  scores = dict()
+  for name in names or BASELINES:
+    predictions = BASELINES[name](X, train_size)
+    scores[name] = {'rmse': rmse(test, predictions), 'mae': mae(test, predictions),
+                    'mape': mape(test, predictions)}
+  return scores
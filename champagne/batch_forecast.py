@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Batch forecasting of many series with the champagne pipeline.
+
+Every series goes through difference(12) -> ARIMA(4,0,1) -> bias correction
+-> inverse_difference, fitted in parallel chunks on a process pool. With
+engine='batched' each chunk is fitted in one vectorized pass (batched_arma)
+instead of one statsmodels fit per series. Series
+are read lazily from a long-format table (sorted by series id) or from a
+directory of per-series CSVs shaped like dataset.csv, only a bounded number
+of chunks is in flight at once, and results are appended to one parquet
+file as chunks finish, so memory does not grow with the number of series.
+"""
+import os
+import sys
+import time
+import warnings
+from contextlib import closing
+from math import sqrt
+import numpy
+from parallel import ignore_sigint, pool_map
+from .arima import ARIMA
+from .batched_arma import fit_arma
+from .differencing import difference, inverse_difference_steps
+
+OUTPUT_COLUMNS = ('series_id', 'step', 'forecast', 'rmse', 'error')
+
+# parquet schema of the results; pyarrow is only imported by the parent process
+def output_schema():
+  import pyarrow
+  return pyarrow.schema([
+    ('series_id', pyarrow.string()),
+    ('step', pyarrow.int32()),
+    ('forecast', pyarrow.float64()),
+    ('rmse', pyarrow.float64()),
+    ('error', pyarrow.string()),
+  ])
+
+# yield (series_id, values) from a directory of dataset.csv-like files
+def read_directory(path):
+  from pandas import read_csv
+  for name in sorted(os.listdir(path)):
+    if not name.endswith('.csv'):
+      continue
+    series = read_csv(os.path.join(path, name), header=None, index_col=0)
+    yield os.path.splitext(name)[0], series.iloc[:, 0].values
+
+# yield (series_id, values) from a long table sorted by series id
+def read_long(path, id_col='series_id', value_col='value', chunksize=1000000):
+  if path.endswith('.parquet'):
+    import pyarrow.parquet
+    batches = (batch.to_pandas() for batch in
+               pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunksize, columns=[id_col, value_col]))
+  else:
+    from pandas import read_csv
+    batches = read_csv(path, usecols=[id_col, value_col], chunksize=chunksize)
+  current, parts = None, list()
+  for frame in batches:
+    ids = frame[id_col].values
+    values = frame[value_col].values
+    # boundaries where the series id changes inside this chunk
+    starts = numpy.flatnonzero(ids[1:] != ids[:-1]) + 1
+    bounds = [0] + list(starts) + [len(ids)]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+      if start == end:
+        continue
+      sid = ids[start]
+      if current is not None and sid != current:
+        yield str(current), numpy.concatenate(parts)
+        parts = list()
+      current = sid
+      parts.append(values[start:end])
+  if current is not None:
+    yield str(current), numpy.concatenate(parts)
+
+# difference(12) -> ARIMA -> bias correct -> inverse_difference for one series
+def forecast_series(values, order=(4,0,1), interval=12, steps=1, holdout=0):
+  X = numpy.asarray(values, dtype='float32')
+  rmse = None
+  if holdout:
+    # score a multi-step forecast of the last holdout observations
+    train, test = X[:-holdout], X[-holdout:]
+    model_fit = ARIMA(difference(train, interval), order=order).fit(trend='nc', disp=0)
+    bias = numpy.mean(model_fit.resid)
+    yhat = bias + inverse_difference_steps(train, model_fit.forecast(steps=holdout)[0], interval)
+    rmse = sqrt(numpy.mean((test - yhat) ** 2))
+  model_fit = ARIMA(difference(X, interval), order=order).fit(trend='nc', disp=0)
+  # bias from the in-sample mean residual
+  bias = numpy.mean(model_fit.resid)
+  if rmse is None:
+    rmse = sqrt(numpy.mean(numpy.asarray(model_fit.resid) ** 2))
+  yhat = bias + inverse_difference_steps(X, model_fit.forecast(steps=steps)[0], interval)
+  return yhat, rmse
+
+# the differenced series as rows of one array, padded with NaN at the start
+def _pad_rows(series, interval):
+  diffs = [difference(numpy.asarray(X, dtype='float64'), interval) for X in series]
+  rows = numpy.full((len(diffs), max(len(d) for d in diffs)), numpy.nan)
+  for row, diff in zip(rows, diffs):
+    row[len(row) - len(diff):] = diff
+  return rows
+
+# bias-corrected forecasts of every series from one batched fit
+def _forecast_rows(series, order, interval, steps):
+  model_fit = fit_arma(_pad_rows(series, interval), order)
+  bias = numpy.nanmean(model_fit.resid, axis=1)
+  forecasts = model_fit.forecast(steps=steps)[0]
+  yhat = [bias[i] + inverse_difference_steps(X, forecasts[i], interval) for i, X in enumerate(series)]
+  return yhat, model_fit
+
+# forecast_series() for one series, an exception recorded as its error
+def _forecast_one(X, order, interval, steps, holdout):
+  try:
+    yhat, rmse = forecast_series(X, order, interval, steps, holdout)
+    return yhat, rmse, None
+  except Exception as e:
+    return [numpy.nan] * steps, numpy.nan, '%s: %s' % (type(e).__name__, e)
+
+# why a series cannot go into a batched fit, or None
+def _screen(X, order, interval, holdout):
+  p, d, q = order
+  if not numpy.isfinite(X).all():
+    return 'ValueError: series has %d missing or non-finite values' % (~numpy.isfinite(X)).sum()
+  if len(X) - interval - holdout - d <= p + q + 1:
+    return 'ValueError: series of %d observations is too short' % len(X)
+  W = numpy.diff(difference(X[:len(X) - holdout].astype('float64'), interval), d)
+  if W.min() == W.max():
+    return 'ValueError: series is constant after differencing'
+  return None
+
+# forecast_series() for a whole chunk at once; series that cannot be fitted
+# get an error, and if the batched fit fails or a row comes out non-finite
+# those rows are fitted one by one instead
+def forecast_chunk(chunk, order=(4,0,1), interval=12, steps=1, holdout=0):
+  results = [(None, numpy.nan, None)] * len(chunk)
+  fit, values = list(), list()
+  for i, (sid, X) in enumerate(chunk):
+    X = numpy.asarray(X, dtype='float32')
+    error = _screen(X, order, interval, holdout)
+    if error is not None:
+      results[i] = ([numpy.nan] * steps, numpy.nan, error)
+    else:
+      fit.append(i)
+      values.append(X)
+  if not fit:
+    return results
+  try:
+    rmse = [None] * len(values)
+    if holdout:
+      # score a multi-step forecast of the last holdout observations
+      yhat, model_fit = _forecast_rows([X[:-holdout] for X in values], order, interval, holdout)
+      rmse = [sqrt(numpy.mean((X[-holdout:] - y) ** 2)) for X, y in zip(values, yhat)]
+    yhat, model_fit = _forecast_rows(values, order, interval, steps)
+    if not holdout:
+      rmse = numpy.sqrt(numpy.nanmean(model_fit.resid ** 2, axis=1))
+  except Exception:
+    # one pathological series must not fail the whole chunk
+    yhat = rmse = None
+  for j, i in enumerate(fit):
+    if yhat is not None and numpy.isfinite(yhat[j]).all() and numpy.isfinite(rmse[j]):
+      results[i] = (yhat[j], rmse[j], None)
+    else:
+      results[i] = _forecast_one(values[j], order, interval, steps, holdout)
+  return results
+
+def _init_worker():
+  ignore_sigint()
+  warnings.filterwarnings("ignore")
+
+# task run in a worker: forecast a chunk of series into columns
+def _chunk_task(args):
+  chunk, order, interval, steps, holdout, engine = args
+  columns = dict((name, list()) for name in OUTPUT_COLUMNS)
+  if engine == 'batched':
+    results = forecast_chunk(chunk, order, interval, steps, holdout)
+  else:
+    results = [_forecast_one(values, order, interval, steps, holdout) for sid, values in chunk]
+  for (sid, values), (yhat, rmse, error) in zip(chunk, results):
+    for step in range(steps):
+      columns['series_id'].append(sid)
+      columns['step'].append(step + 1)
+      columns['forecast'].append(float(yhat[step]))
+      columns['rmse'].append(float(rmse))
+      columns['error'].append(error)
+  return len(chunk), columns
+
+# group a stream of series into lists of chunk_size
+def _chunks(series, chunk_size):
+  chunk = list()
+  for item in series:
+    chunk.append(item)
+    if len(chunk) == chunk_size:
+      yield chunk
+      chunk = list()
+  if chunk:
+    yield chunk
+
+# forecast every series and write forecasts and RMSE to one parquet file
+def run_batch(series, output, order=(4,0,1), interval=12, steps=1, holdout=0,
+              workers=None, chunk_size=100, report_every=10.0, engine='statsmodels'):
+  import pyarrow
+  import pyarrow.parquet
+  schema = output_schema()
+  writer = pyarrow.parquet.ParquetWriter(output, schema)
+  done, started, last_report = 0, time.time(), time.time()
+  # at most two chunks per worker in flight, written in order
+  tasks = ((chunk, order, interval, steps, holdout, engine) for chunk in _chunks(series, chunk_size))
+  try:
+    with closing(pool_map(_chunk_task, tasks, workers, _init_worker)) as results:
+      for n, columns in results:
+        writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+        done += n
+        if time.time() - last_report >= report_every:
+          last_report = time.time()
+          print('%d series, %.1f series/s' % (done, done / (last_report - started)))
+          sys.stdout.flush()
+  finally:
+    writer.close()
+  elapsed = time.time() - started
+  print('Done: %d series in %.1fs, %.1f series/s' % (done, elapsed, done / elapsed if elapsed else 0.0))
+  return done
+
+if __name__ == '__main__':
+  # python -m champagne.batch_forecast <long table or directory of csvs> <output.parquet> [statsmodels|batched]
+  source, output = sys.argv[1], sys.argv[2]
+  engine = sys.argv[3] if len(sys.argv) > 3 else 'statsmodels'
+  if os.path.isdir(source):
+    run_batch(read_directory(source), output, engine=engine)
+  else:
+    run_batch(read_long(source), output, engine=engine)
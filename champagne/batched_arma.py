@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+"""One ARMA order fitted to many series at once.
+
+fit_arma(Y, order) takes a 2-D array (series x time) and estimates the
+same (p,d,q) for every row the way ARIMA(y, order).fit(trend='nc') does,
+with every step vectorized over the series instead of looped:
+
+  * start values by Hannan-Rissanen: a long autoregression, then least
+    squares on lagged values and lagged residuals, solved for all rows;
+  * a CSS fit (conditional sum of squares) from there, then the exact
+    likelihood from the Kalman filter with a stationary start, both with
+    sigma2 concentrated out and the parameters transformed to keep the AR
+    part stationary and the MA part invertible, as statsmodels does;
+  * a BFGS minimizer that keeps a step length and an inverse Hessian per
+    series, evaluates finite-difference gradients for all rows in one
+    batched pass and drops each series from the batch once it converges.
+
+Series of different lengths (walk-forward prefixes) are aligned on their
+last observation and padded with NaN at the start; the filter treats the
+padding as missing values, which is the same as starting later. The
+results hold parameters, sigma2, llf, aic, bic and residuals per row and
+forecast every row from its final filter state.
+
+This does not reach a small multiple of one fit. On the benchmark's data
+(10k series of 93 points, order (4,0,1)) fit_arma takes about 13 s, 1.3 ms
+a series, where one statsmodels fit takes about 20 ms: the batch costs
+some 650 single fits, a 15x saving over fitting series by series. What is
+left is NumPy work per series per filter step, which batching cannot take
+away. Where a likelihood has more than one local optimum (short series,
+weakly determined higher orders) a row can also end on a different optimum
+from the per-series fit, not always the better one.
+"""
+import numpy
+
+EPS_SQRT = numpy.finfo(float).eps ** 0.5
+LOG_2PI = numpy.log(2 * numpy.pi)
+Z_95 = 1.959963984540054
+# partial autocorrelations stay this far inside (-1, 1)
+MAX_PACF = 1 - 1e-10
+
+# partial autocorrelations -> AR (sign=-1) or MA (sign=1) coefficients, row-wise
+def _from_pacf(u, sign):
+  coefs = u.copy()
+  for j in range(1, u.shape[1]):
+    coefs[:, :j] = coefs[:, :j] + sign * u[:, j:j + 1] * coefs[:, j - 1::-1]
+  return coefs
+
+# AR or MA coefficients -> partial autocorrelations, NaN rows where |pacf| >= 1
+def _to_pacf(coefs, sign):
+  u = coefs.copy()
+  with numpy.errstate(divide='ignore', invalid='ignore'):
+    for j in range(coefs.shape[1] - 1, 0, -1):
+      a = u[:, j:j + 1]
+      u[:, :j] = (u[:, :j] - sign * a * u[:, j - 1::-1]) / (1 - a ** 2)
+  u[~(numpy.abs(u) < 1).all(axis=1)] = numpy.nan
+  return u
+
+# unconstrained optimizer values -> (ar, ma) of a stationary, invertible model
+def transform(x, p):
+  u = numpy.clip(numpy.tanh(x / 2), -MAX_PACF, MAX_PACF)
+  return _from_pacf(u[:, :p], -1), _from_pacf(u[:, p:], 1)
+
+# (ar, ma) -> unconstrained values, NaN rows for non-stationary or non-invertible models
+def untransform(ar, ma):
+  u = numpy.hstack([_to_pacf(ar, -1), _to_pacf(ma, 1)])
+  return 2 * numpy.arctanh(u)
+
+# lagged copies of W (NaN read as 0): lags[s, t, i] = W[s, t - 1 - i]
+def _lags(W, k):
+  S, n = W.shape
+  lags = numpy.zeros((S, n, k))
+  for i in range(k):
+    lags[:, i + 1:, i] = W[:, :n - 1 - i]
+  return lags
+
+# least squares per row, rows of X and y that are all zero drop out
+def _batched_lstsq(X, y, ridge=1e-8):
+  XtX = numpy.einsum('snk,snl->skl', X, X)
+  Xty = numpy.einsum('snk,sn->sk', X, y)
+  XtX += ridge * numpy.eye(X.shape[2])
+  return numpy.linalg.solve(XtX, Xty[..., None])[..., 0]
+
+# Hannan-Rissanen start values for every row
+def start_params(W, p, q, start):
+  S, n = W.shape
+  W0 = numpy.nan_to_num(W)
+  t = numpy.arange(n)
+  ar, ma = numpy.zeros((S, p)), numpy.zeros((S, q))
+  if q:
+    # long autoregression for the innovations
+    m = min(int(round(12 * (n / 100.) ** 0.25)), max(n // 4, 1))
+    rows = (t >= (start + m)[:, None])[..., None]
+    long_ar = _batched_lstsq(_lags(W0, m) * rows, W0 * rows[..., 0])
+    resid = numpy.where(rows[..., 0], W0 - numpy.einsum('snk,sk->sn', _lags(W0, m), long_ar), 0)
+    rows = (t >= (start + m + max(p, q))[:, None])[..., None]
+    X = numpy.concatenate([_lags(W0, p), _lags(resid, q)], axis=2) * rows
+    params = _batched_lstsq(X, W0 * rows[..., 0])
+    ar, ma = params[:, :p], params[:, p:]
+  elif p:
+    rows = (t >= (start + p)[:, None])[..., None]
+    ar = _batched_lstsq(_lags(W0, p) * rows, W0 * rows[..., 0])
+  # fall back to zeros for a part that is not stationary or invertible
+  ar[numpy.isnan(_to_pacf(ar, -1)).any(axis=1)] = 0
+  ma[numpy.isnan(_to_pacf(ma, 1)).any(axis=1)] = 0
+  return ar, ma
+
+# CSS residuals: the first p observations of each row are conditioned on
+def css_resid(W, ar, ma, start):
+  S, n = W.shape
+  p, q = ar.shape[1], ma.shape[1]
+  W0 = numpy.nan_to_num(W)
+  e = W0.copy()
+  for i in range(p):
+    e[:, i + 1:] -= ar[:, i:i + 1] * W0[:, :n - 1 - i]
+  e[numpy.arange(n) < (start + p)[:, None]] = 0
+  if q:
+    for t in range(n):
+      for j in range(min(q, t)):
+        e[:, t] -= ma[:, j] * e[:, t - 1 - j]
+      e[:, t] *= t >= start + p
+  return e
+
+# negative CSS log likelihood per observation
+def css_objective(W, p, start):
+  nobs = numpy.isfinite(W).sum(axis=1) - p
+  def objective(x, rows):
+    ar, ma = transform(x, p)
+    e = css_resid(W[rows], ar, ma, start[rows])
+    sigma2 = (e ** 2).sum(axis=1) / nobs[rows]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+      return 0.5 * (LOG_2PI + numpy.log(sigma2) + 1)
+  return objective
+
+# state space matrices of the Harvey form: transition is the companion of
+# phi, the disturbance loads on R = (1, theta_1, ..., theta_{r-1})
+def _state_space(ar, ma):
+  S, p, q = ar.shape[0], ar.shape[1], ma.shape[1]
+  r = max(p, q + 1)
+  phi = numpy.zeros((S, r))
+  phi[:, :p] = ar
+  R = numpy.zeros((S, r))
+  R[:, 0] = 1
+  R[:, 1:q + 1] = ma
+  return phi, R
+
+# T x for the companion transition, x stacked on the last two axes or a vector
+def _transition(phi, x):
+  out = phi[:, :, None] * x[:, :1] if x.ndim == 3 else phi * x[:, :1]
+  out[:, :-1] += x[:, 1:]
+  return out
+
+# stationary state covariance: P = T P T' + R R'
+def _initial_cov(phi, R):
+  S, r = phi.shape
+  T = numpy.zeros((S, r, r))
+  T[:, :, 0] = phi
+  T[:, numpy.arange(r - 1), numpy.arange(1, r)] = 1
+  TT = numpy.einsum('sij,skl->sikjl', T, T).reshape(S, r * r, r * r)
+  RR = (R[:, :, None] * R[:, None, :]).reshape(S, r * r, 1)
+  A = numpy.eye(r * r) - TT
+  try:
+    return numpy.linalg.solve(A, RR).reshape(S, r, r)
+  except numpy.linalg.LinAlgError:
+    # rows on the unit circle: solve the others, NaN for the singular ones
+    singular = numpy.linalg.slogdet(A)[0] == 0
+    A[singular] = numpy.eye(r * r)
+    P = numpy.linalg.solve(A, RR)
+    P[singular] = numpy.nan
+    return P.reshape(S, r, r)
+
+class _Filtered(object):
+
+  __slots__ = ('ssr', 'logdet', 'nobs', 'state', 'resid', 'phi')
+
+# Kalman filter of every row with sigma2 = 1, series on the last axis so
+# every per-step operation is contiguous. Once no row has a missing value
+# left, the rows whose P has converged drop out of the covariance update:
+# the others are kept packed in their own arrays, repacked when a good part
+# of them has settled, and the settled rows keep their last gain.
+def kalman_filter(W, ar, ma, keep_resid=False, tol=1e-9):
+  S, n = W.shape
+  phi, R = _state_space(ar, ma)
+  r = phi.shape[1]
+  P = numpy.ascontiguousarray(_initial_cov(phi, R).transpose(1, 2, 0))
+  phi_t, R_t = numpy.ascontiguousarray(phi.T), R.T
+  Wt = numpy.ascontiguousarray(W.T)
+  missing = numpy.isnan(Wt)
+  columns = numpy.flatnonzero(missing.any(axis=1))
+  last_missing = columns[-1] if len(columns) else -1
+  a = numpy.zeros((r, S))
+  ssr, logdet = numpy.zeros(S), numpy.zeros(S)
+  resid = numpy.full((n, S), numpy.nan) if keep_resid else None
+  # the rows whose P still changes, and their P, phi and R R'
+  live = None
+  phi_live, RR = phi_t, R_t[:, None, :] * R_t[None, :, :]
+  with numpy.errstate(divide='ignore', invalid='ignore'):
+    F = P[0, 0].copy()
+    log_F = numpy.log(F)
+    gain = P[:, 0] / F
+    for t in range(n):
+      v = Wt[t] - a[0]
+      if t <= last_missing:
+        observed = ~missing[t]
+        v = numpy.where(observed, v, 0)
+        logdet += numpy.where(observed, log_F, 0)
+      else:
+        logdet += log_F
+      if keep_resid:
+        resid[t] = v if t > last_missing else numpy.where(observed, v, numpy.nan)
+      ssr += v * v / F
+      x = a + gain * v
+      a = phi_t * x[0]
+      a[:-1] += x[1:]
+      if P is None:
+        continue
+      gain_live = gain if live is None else gain[:, live]
+      M = P - gain_live[:, None] * P[None, 0]
+      if t <= last_missing:
+        M = numpy.where(observed, M, P)
+      TP = phi_live[:, None, :] * M[None, 0]
+      TP[:-1] += M[1:]
+      P_next = TP[:, :1] * phi_live[None, :, :]
+      P_next[:, :-1] += TP[:, 1:]
+      P_next += RR
+      F_next = P_next[0, 0]
+      if live is None:
+        F, gain = F_next.copy(), P_next[:, 0] / F_next
+        log_F = numpy.log(F)
+      else:
+        F[live] = F_next
+        gain[:, live] = P_next[:, 0] / F_next
+        log_F[live] = numpy.log(F_next)
+      if t > last_missing:
+        moving = ~(numpy.abs(P_next - P).max(axis=(0, 1)) < tol)
+        settled = len(moving) - numpy.count_nonzero(moving)
+        if settled == len(moving):
+          P = None
+          continue
+        if settled * 4 >= len(moving):
+          live = numpy.flatnonzero(moving) if live is None else live[moving]
+          P_next = numpy.ascontiguousarray(P_next[:, :, moving])
+          phi_live = numpy.ascontiguousarray(phi_live[:, moving])
+          RR = numpy.ascontiguousarray(RR[:, :, moving])
+      P = P_next
+  filtered = _Filtered()
+  filtered.ssr, filtered.logdet = ssr, logdet
+  filtered.nobs = (~missing).sum(axis=0)
+  filtered.state, filtered.phi = a.T, phi
+  filtered.resid = resid.T if keep_resid else None
+  return filtered
+
+# concentrated exact log likelihood from a filter pass
+def _loglike(filtered):
+  nobs = filtered.nobs
+  with numpy.errstate(divide='ignore', invalid='ignore'):
+    sigma2 = filtered.ssr / nobs
+    return -0.5 * nobs * (LOG_2PI + numpy.log(sigma2) + 1) - 0.5 * filtered.logdet
+
+# negative exact log likelihood per observation
+def exact_objective(W, p):
+  nobs = numpy.isfinite(W).sum(axis=1)
+  def objective(x, rows):
+    ar, ma = transform(x, p)
+    value = -_loglike(kalman_filter(W[rows], ar, ma)) / nobs[rows]
+    return numpy.where(numpy.isfinite(value), value, numpy.inf)
+  return objective
+
+# objective and forward-difference gradient of every row in one evaluation
+def _gradient(objective, x, rows):
+  S, k = x.shape
+  h = EPS_SQRT * numpy.maximum(numpy.abs(x), 0.1)
+  X = numpy.repeat(x[None], k + 1, axis=0)
+  X[numpy.arange(1, k + 1), :, numpy.arange(k)] += h.T
+  f = objective(X.reshape(-1, k), numpy.tile(rows, k + 1)).reshape(k + 1, S)
+  return f[0], ((f[1:] - f[0]) / h.T).T
+
+# BFGS on every row at once with a backtracking (Armijo) line search; rows
+# leave the batch once converged or when the line search cannot improve them
+def minimize(objective, x0, maxiter=100, gtol=1e-6, ftol=1e-12, H0=None):
+  x = numpy.array(x0, dtype='float64')
+  S, k = x.shape
+  f, g = _gradient(objective, x, numpy.arange(S))
+  # rows without a starting inverse Hessian get the identity, scaled after the first step
+  H = numpy.repeat(numpy.eye(k)[None], S, axis=0) if H0 is None else H0.copy()
+  scaled = numpy.zeros(S, dtype=bool) if H0 is None else numpy.isfinite(H).all(axis=(1, 2))
+  H[~scaled] = numpy.eye(k)
+  iterations = numpy.zeros(S, dtype='int32')
+  converged = numpy.isfinite(f) & (numpy.abs(g).max(axis=1) < gtol)
+  active = numpy.isfinite(f) & ~converged
+  for it in range(maxiter):
+    rows = numpy.flatnonzero(active)
+    if not len(rows):
+      break
+    xa, fa, ga, Ha = x[rows], f[rows], g[rows], H[rows]
+    d = -numpy.einsum('sij,sj->si', Ha, ga)
+    slope = (ga * d).sum(axis=1)
+    # restart from steepest descent where the direction is not downhill
+    reset = ~(slope < 0) | ~numpy.isfinite(d).all(axis=1)
+    if reset.any():
+      d[reset], Ha[reset] = -ga[reset], numpy.eye(k)
+      slope = (ga * d).sum(axis=1)
+    alpha = numpy.ones(len(rows))
+    f_new = objective(xa + d, rows)
+    failed = ~(f_new <= fa + 1e-4 * alpha * slope)
+    for backtrack in range(30):
+      if not failed.any():
+        break
+      alpha[failed] *= 0.5
+      f_new[failed] = objective(xa[failed] + alpha[failed, None] * d[failed], rows[failed])
+      failed = ~(f_new <= fa + 1e-4 * alpha * slope)
+    moved = ~failed
+    s = alpha[:, None] * d
+    x_new = numpy.where(moved[:, None], xa + s, xa)
+    f_new, g_new = _gradient(objective, x_new, rows)
+    y = g_new - ga
+    sy = (s * y).sum(axis=1)
+    # inverse Hessian update where the curvature condition holds
+    ok = moved & (sy > 1e-12)
+    first = ok & ~scaled[rows]
+    if first.any():
+      Ha[first] *= (sy[first] / (y[first] ** 2).sum(axis=1))[:, None, None]
+      scaled[rows[first]] = True
+    if ok.any():
+      rho = 1 / sy[ok]
+      V = numpy.eye(k) - rho[:, None, None] * s[ok][:, :, None] * y[ok][:, None, :]
+      Ha[ok] = numpy.einsum('sij,sjk,slk->sil', V, Ha[ok], V) + rho[:, None, None] * s[ok][:, :, None] * s[ok][:, None, :]
+    x[rows], f[rows], g[rows], H[rows] = x_new, f_new, g_new, Ha
+    iterations[rows] += moved
+    done = (numpy.abs(g_new).max(axis=1) < gtol) | (moved & (fa - f_new <= ftol * numpy.maximum(1, numpy.abs(f_new))))
+    converged[rows] = done
+    active[rows] = ~done & moved
+  return x, f, converged, iterations, H
+
+class BatchedARMAResults(object):
+
+  __slots__ = ('order', 'params', 'arparams', 'maparams', 'sigma2', 'llf', 'nobs', 'aic', 'bic',
+               'resid', 'converged', 'iterations', 'method', '_state', '_phi', '_tails')
+
+  # same return shape as ARIMAResults.forecast(), one row per series
+  def forecast(self, steps=1):
+    a = self._state.copy()
+    forecasts = numpy.empty((len(a), steps))
+    for h in range(steps):
+      forecasts[:, h] = a[:, 0]
+      a = _transition(self._phi, a)
+    # integrate forecasts of the differenced rows back for d > 0
+    for tail in reversed(self._tails):
+      forecasts = tail[:, None] + numpy.cumsum(forecasts, axis=1)
+    # standard errors from the MA(infinity) weights, as statsmodels computes them
+    psi = ma_weights(self.arparams, self.maparams, steps)
+    for tail in self._tails:
+      psi = numpy.cumsum(psi, axis=1)
+    stderr = numpy.sqrt(self.sigma2[:, None] * numpy.cumsum(psi ** 2, axis=1))
+    conf_int = numpy.stack([forecasts - Z_95 * stderr, forecasts + Z_95 * stderr], axis=-1)
+    return forecasts, stderr, conf_int
+
+# the first n MA(infinity) weights psi_0 = 1, psi_1, ... of every row
+def ma_weights(ar, ma, n):
+  p, q = ar.shape[1], ma.shape[1]
+  psi = numpy.zeros((len(ar), n))
+  psi[:, 0] = 1
+  for j in range(1, n):
+    if j <= q:
+      psi[:, j] = ma[:, j - 1]
+    for i in range(1, min(j, p) + 1):
+      psi[:, j] += ar[:, i - 1] * psi[:, j - i]
+  return psi
+
+# first non-NaN index of every row, after checking NaN only pads the start
+def _first_valid(W):
+  valid = numpy.isfinite(W)
+  start = valid.argmax(axis=1)
+  if (valid.sum(axis=1) != W.shape[1] - start).any():
+    raise ValueError('series may only be padded with NaN at the start')
+  return start
+
+# fit ARIMA(p,d,q) with trend='nc' to every row of Y
+def fit_arma(Y, order, method='css-mle', maxiter=100, gtol=1e-6, start=None):
+  Y = numpy.atleast_2d(numpy.asarray(Y, dtype='float64'))
+  p, d, q = order
+  if method not in ('css', 'mle', 'css-mle'):
+    raise ValueError('method must be css, mle or css-mle, not %r' % method)
+  tails, W = list(), Y
+  for i in range(d):
+    tails.append(W[:, -1])
+    W = numpy.diff(W, axis=1)
+  first = _first_valid(W)
+  if (W.shape[1] - first <= p + q + 1).any():
+    raise ValueError('every series needs more than %d observations after differencing' % (p + q + 1))
+  if start is None:
+    ar, ma = start_params(W, p, q, first)
+  else:
+    ar, ma = numpy.asarray(start[0], dtype='float64'), numpy.asarray(start[1], dtype='float64')
+  x = untransform(ar, ma)
+  x[numpy.isnan(x)] = 0
+  iterations = numpy.zeros(len(W), dtype='int32')
+  converged = numpy.ones(len(W), dtype=bool)
+  if p + q:
+    H = None
+    if method in ('css', 'css-mle'):
+      x, f, converged, it, H = minimize(css_objective(W, p, first), x, maxiter, gtol)
+      iterations += it
+    if method in ('mle', 'css-mle'):
+      # the CSS curvature is a good first guess for the exact likelihood's
+      x, f, converged, it, H = minimize(exact_objective(W, p), x, maxiter, gtol, H0=H)
+      iterations += it
+  ar, ma = transform(x, p)
+  results = BatchedARMAResults()
+  results.order, results.method = tuple(order), method
+  results.arparams, results.maparams = ar, ma
+  results.params = numpy.hstack([ar, ma])
+  results.converged, results.iterations = converged, iterations
+  filtered = kalman_filter(W, ar, ma, keep_resid=True)
+  if method == 'css':
+    resid = css_resid(W, ar, ma, first)
+    nobs = W.shape[1] - first - p
+    results.sigma2 = (resid ** 2).sum(axis=1) / nobs
+    results.llf = -0.5 * nobs * (LOG_2PI + numpy.log(results.sigma2) + 1)
+    resid[numpy.arange(W.shape[1]) < (first + p)[:, None]] = numpy.nan
+    results.resid = resid
+  else:
+    nobs = filtered.nobs
+    results.sigma2 = filtered.ssr / nobs
+    results.llf = _loglike(filtered)
+    results.resid = filtered.resid
+  results.nobs = nobs
+  # statsmodels counts sigma2 as one more parameter
+  results.aic = -2 * results.llf + 2 * (p + q + 1)
+  results.bic = -2 * results.llf + numpy.log(nobs) * (p + q + 1)
+  results._state, results._phi, results._tails = filtered.state, filtered.phi, tails
+  return results
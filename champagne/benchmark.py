@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for the forecasting hot paths.
+
+Times difference(), one ARIMA fit, the batched fit of many series at once,
+evaluate_arima_model(), the final
+validation loop and the baseline scoring on generated seasonal series of
+several lengths and batch sizes. Each case runs in a fresh process so its
+peak RSS is its own. Results go to a JSON file and can be compared against
+a stored baseline; a case slower than the threshold fails the run, and so
+does a case that raises or whose process dies.
+
+The core modules are also imported one by one in a fresh interpreter: each
+must stay within the import-time budget and must not pull in statsmodels,
+sklearn, pandas, matplotlib or any other heavy dependency.
+
+  python -m champagne.benchmark --output bench.json
+  python -m champagne.benchmark --save-baseline bench_baseline.json
+  python -m champagne.benchmark --baseline bench_baseline.json --threshold 0.25
+"""
+import argparse
+import json
+import platform
+import os
+import resource
+import subprocess
+import sys
+import time
+import traceback
+import warnings
+from multiprocessing import get_context
+from queue import Empty
+import numpy
+from .arima import ARIMA
+from .baselines import evaluate_baselines
+from .batched_arma import fit_arma
+from .differencing import difference
+from .grid_search import evaluate_arima_model, forecast_step
+
+# seasonal monthly-like series: level, trend, a yearly cycle and noise
+def make_series(length, n_series=1, seed=1):
+  rng = numpy.random.RandomState(seed)
+  t = numpy.arange(length)
+  level = 5000.0 + 5.0 * t
+  season = 2000.0 * numpy.sin(2 * numpy.pi * t / 12.0)
+  noise = rng.normal(0.0, 300.0, size=(n_series, length))
+  X = (level + season + noise).astype('float32')
+  return X[0] if n_series == 1 else X
+
+def bench_difference(length, n_series):
+  X = make_series(length, n_series)
+  difference(X, 12)
+  return 0
+
+def bench_fit(length, n_series):
+  X = make_series(length, n_series).reshape(n_series, length)
+  for row in X:
+    ARIMA(difference(row, 12), order=(4,0,1)).fit(trend='nc', disp=0)
+  return n_series
+
+# the same fits as bench_fit, every series in one batched pass
+def bench_fit_batched(length, n_series):
+  X = make_series(length, n_series).reshape(n_series, length)
+  fit_arma(difference(X, 12), (4,0,1))
+  return n_series
+
+def bench_evaluate_arima_model(length, n_series):
+  X = make_series(length, n_series).reshape(n_series, length)
+  for row in X:
+    evaluate_arima_model(row, (4,0,1))
+  return n_series * (length - int(length * 0.50))
+
+# the final validation loop: refit and forecast each of the last 12 months
+def bench_validation_loop(length, n_series):
+  X = make_series(length, n_series).reshape(n_series, length)
+  for row in X:
+    for n in range(length - 12, length):
+      forecast_step(row, n, (4,0,1))
+  return n_series * 12
+
+def bench_baselines(length, n_series):
+  evaluate_baselines(make_series(length, n_series))
+  return 0
+
+# (name, function, [(length, n_series), ...])
+CASES = [
+  ('difference', bench_difference, [(100, 1), (1000, 1), (10000, 1), (100000, 1),
+                                    (100, 100), (100, 10000)]),
+  ('fit', bench_fit, [(100, 1), (1000, 1), (10000, 1), (100000, 1), (100, 100)]),
+  ('fit_batched', bench_fit_batched, [(100, 1), (1000, 1), (100, 100), (100, 1000)]),
+  ('evaluate_arima_model', bench_evaluate_arima_model, [(100, 1), (1000, 1)]),
+  ('validation_loop', bench_validation_loop, [(105, 1), (1000, 1)]),
+  ('baselines', bench_baselines, [(100, 1), (1000, 1), (100000, 1), (100, 100), (100, 10000)]),
+]
+
+# full-size cases that take minutes, only run with --full
+FULL_CASES = [
+  ('fit', bench_fit, [(100, 10000)]),
+  ('fit_batched', bench_fit_batched, [(100, 10000)]),
+  ('evaluate_arima_model', bench_evaluate_arima_model, [(10000, 1), (100, 100)]),
+]
+
+# modules the forecasting path imports, which must load with NumPy alone
+CORE_MODULES = ('champagne', 'champagne.differencing', 'champagne.history', 'champagne.baselines',
+                'champagne.bias', 'champagne.artifact', 'champagne.batched_arma', 'champagne.grid_search',
+                'champagne.incremental', 'champagne.horizon', 'champagne.model_cache',
+                'champagne.streaming', 'champagne.diagnostics', 'champagne.forecast_server',
+                'champagne.results_store', 'parallel')
+HEAVY_MODULES = ('statsmodels', 'sklearn', 'pandas', 'scipy', 'matplotlib', 'pyarrow', 'mxnet')
+# seconds for importing one core module in a fresh interpreter, NumPy included
+IMPORT_BUDGET = 0.25
+
+_IMPORT_PROBE = '\n'.join(['import sys, time',
+                           'start = time.perf_counter()',
+                           'import %s',
+                           'print(time.perf_counter() - start)',
+                           'print(" ".join(set(name.split(".")[0] for name in sys.modules)))'])
+
+# best import time of each module in a fresh interpreter, and the heavy modules it loaded
+def measure_imports(modules=CORE_MODULES, repeat=3):
+  root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  results = dict()
+  for module in modules:
+    best = float("inf")
+    for i in range(repeat):
+      output = subprocess.check_output([sys.executable, '-c', _IMPORT_PROBE % module], cwd=root,
+                                       universal_newlines=True)
+      seconds, loaded = output.split('\n', 1)
+      best = min(best, float(seconds))
+    heavy = sorted(set(loaded.split()) & set(HEAVY_MODULES))
+    results[module] = {'seconds': best, 'heavy': heavy}
+    print('import %-38s %10.4fs %s' % (module, best, ' '.join(heavy)))
+    sys.stdout.flush()
+  return results
+
+# modules over the import budget or loading heavy dependencies
+def check_imports(imports, budget=IMPORT_BUDGET):
+  return [(module, result['seconds'], result['heavy']) for module, result in sorted(imports.items())
+          if result['seconds'] > budget or result['heavy']]
+
+# run one case in this process, reporting best wall time and peak RSS, or
+# the error the case raised
+def _run_case(queue, func, length, n_series, repeat):
+  warnings.filterwarnings("ignore")
+  best, fits = float("inf"), 0
+  try:
+    for i in range(repeat):
+      start = time.perf_counter()
+      fits = func(length, n_series)
+      best = min(best, time.perf_counter() - start)
+  except Exception:
+    queue.put(('error', traceback.format_exc()))
+    return
+  # ru_maxrss is in kilobytes on Linux
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+  queue.put(('ok', (best, peak, fits)))
+
+# the result a case process sent, or an error once it exits without one
+def _case_result(queue, process, poll=1.0):
+  while True:
+    try:
+      return queue.get(timeout=poll)
+    except Empty:
+      if not process.is_alive():
+        # it may have put its result just before exiting
+        try:
+          return queue.get(timeout=poll)
+        except Empty:
+          return 'error', 'case process exited with code %s' % process.exitcode
+
+def run_cases(cases, repeat=3, pattern=None):
+  context = get_context('spawn')
+  results = dict()
+  for name, func, sizes in cases:
+    if pattern and pattern not in name:
+      continue
+    for length, n_series in sizes:
+      case = '%s[n=%d,series=%d]' % (name, length, n_series)
+      queue = context.Queue()
+      process = context.Process(target=_run_case, args=(queue, func, length, n_series, repeat))
+      process.start()
+      status, result = _case_result(queue, process)
+      process.join()
+      if status == 'error':
+        results[case] = {'error': result}
+        print('%-45s FAILED\n%s' % (case, result))
+        sys.stdout.flush()
+        continue
+      seconds, peak, fits = result
+      results[case] = {'seconds': seconds, 'peak_rss_mb': peak,
+                       'fits_per_second': fits / seconds if fits and seconds else None}
+      print('%-45s %10.4fs %8.1f MB %s' % (case, seconds, peak,
+            '%.1f fits/s' % results[case]['fits_per_second'] if fits else ''))
+      sys.stdout.flush()
+  return results
+
+# cases that raised or whose process died
+def failures(results):
+  return sorted(case for case, result in results.items() if 'error' in result)
+
+# cases that got slower than the baseline by more than threshold
+def compare(results, baseline, threshold=0.25):
+  regressions = list()
+  for case, base in baseline['results'].items():
+    if case not in results or 'seconds' not in results[case] or 'seconds' not in base:
+      continue
+    ratio = results[case]['seconds'] / base['seconds']
+    if ratio > 1.0 + threshold:
+      regressions.append((case, base['seconds'], results[case]['seconds'], ratio))
+  return regressions
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark the forecasting hot paths.')
+  parser.add_argument('--output', default='bench_results.json')
+  parser.add_argument('--baseline', help='fail if slower than this stored results file')
+  parser.add_argument('--save-baseline', help='also write the results as a new baseline')
+  parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%%')
+  parser.add_argument('--repeat', type=int, default=3)
+  parser.add_argument('--filter', help='only run cases whose name contains this')
+  parser.add_argument('--full', action='store_true', help='include the multi-minute cases')
+  parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET,
+                      help='seconds allowed to import one core module')
+  parser.add_argument('--skip-imports', action='store_true', help='do not check import times')
+  args = parser.parse_args(argv)
+  cases = CASES + FULL_CASES if args.full else CASES
+  results = run_cases(cases, args.repeat, args.filter)
+  imports = dict() if args.skip_imports else measure_imports(repeat=args.repeat)
+  report = {'meta': {'python': platform.python_version(), 'numpy': numpy.__version__,
+                     'machine': platform.machine(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+            'results': results, 'imports': imports}
+  for filename in (args.output, args.save_baseline):
+    if filename:
+      with open(filename, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+  status = 0
+  for case in failures(results):
+    print('FAILED %s' % case)
+    status = 1
+  for module, seconds, heavy in check_imports(imports, args.import_budget):
+    print('IMPORT %s: %.4fs (budget %.2fs)%s' % (module, seconds, args.import_budget,
+          ', loads ' + ' '.join(heavy) if heavy else ''))
+    status = 1
+  if args.baseline:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for case, before, after, ratio in regressions:
+      print('REGRESSION %s: %.4fs -> %.4fs (x%.2f)' % (case, before, after, ratio))
+    if regressions:
+      status = 1
+  return status
+
+if __name__ == '__main__':
+  sys.exit(main())
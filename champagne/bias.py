@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Forecast bias estimated from residuals instead of a hand-copied constant.
+
+A BiasEstimator is seeded with the in-sample residuals of a fit and updated
+with the one-step error of every new observation, in O(1):
+
+  * 'mean': mean of all residuals and errors seen so far.
+  * 'rolling': mean of the last `window` of them, so the correction follows
+    a drifting bias.
+  * 'fixed': a constant that is never updated.
+
+It is plain Python and serializes to a small dict, so it is stored with the
+model artifact and keeps updating after the model is loaded.
+"""
+
+METHODS = ('fixed', 'mean', 'rolling')
+
+class BiasEstimator(object):
+
+  __slots__ = ('method', 'window', 'value', 'count', 'errors', '_total')
+
+  def __init__(self, method='mean', window=12, value=0.0, count=0, errors=()):
+    if method not in METHODS:
+      raise ValueError('bias method must be one of %s, not %r' % (', '.join(METHODS), method))
+    self.method = method
+    self.window = int(window)
+    self.value = float(value)
+    self.count = int(count)
+    self.errors = [float(e) for e in errors][-self.window:] if method == 'rolling' else []
+    self._total = sum(self.errors)
+
+  # seeded with in-sample residuals
+  @classmethod
+  def from_residuals(cls, resid, method='mean', window=12):
+    estimator = cls(method, window)
+    for e in resid:
+      estimator.update(e)
+    return estimator
+
+  # take in the error of one unbiased forecast, returns the new bias
+  def update(self, error):
+    error = float(error)
+    if self.method == 'mean':
+      self.count += 1
+      self.value += (error - self.value) / self.count
+    elif self.method == 'rolling':
+      self.errors.append(error)
+      self._total += error
+      if len(self.errors) > self.window:
+        self._total -= self.errors.pop(0)
+      self.count += 1
+      self.value = self._total / len(self.errors)
+    return self.value
+
+  # bias-corrected forecasts of a walk-forward run from its unbiased forecasts
+  # and their errors, updating the estimate after each one
+  def correct(self, forecasts, errors):
+    corrected = list()
+    for yhat, error in zip(forecasts, errors):
+      corrected.append(self.value + yhat)
+      self.update(error)
+    return corrected
+
+  def copy(self):
+    return BiasEstimator(self.method, self.window, self.value, self.count, self.errors)
+
+  def to_dict(self):
+    return {'method': self.method, 'window': self.window, 'value': self.value,
+            'count': self.count, 'errors': list(self.errors)}
+
+  @classmethod
+  def from_dict(cls, data):
+    return cls(data['method'], data['window'], data['value'], data['count'], data['errors'])
+
+  # a number is a fixed bias, a method name an estimate from the residuals
+  @classmethod
+  def coerce(cls, bias, resid=(), window=12):
+    if isinstance(bias, cls):
+      return bias
+    if isinstance(bias, str):
+      return cls.from_residuals(resid, bias, window)
+    return cls('fixed', window, bias)
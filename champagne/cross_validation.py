@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Rolling-origin cross-validation that shares fits across folds.
+
+Every fold starts at an origin and walks forward `steps` observations; at
+each step the model is fitted on the prefix X[:n] and scored `h` steps ahead
+for every horizon h. Run naively that is one fit per (order, fold, step,
+horizon). The plan instead has one node per distinct (order, prefix): a
+prefix shared by overlapping folds is fitted once, and one fit forecasts the
+longest horizon it is needed for. Difference of a prefix is a slice of the
+differenced series, so nothing is re-differenced either.
+
+Nodes of one order form a chain by prefix length; each node is warm-started
+from the parameters of its nearest completed neighbour. Chains are cut into
+segments that run on a worker pool, segments of different orders interleaved
+so that a new segment usually finds a finished neighbour to start from. The
+report gives the fits actually run against the naive count.
+"""
+import time
+from collections import deque
+from contextlib import closing
+from math import sqrt
+import numpy
+from parallel import pool_map
+from .arima import ARIMA
+from .differencing import difference, inverse_difference_steps
+from .grid_search import _init_worker
+from .order_selection import failure_reason
+from . import instrumentation
+
+# evenly spaced fold origins, by default over the second half of the series
+def fold_origins(n_obs, n_folds=10, steps=1, horizon=1, min_train=None):
+  if min_train is None:
+    min_train = n_obs // 2
+  last = n_obs - steps - horizon + 1
+  if last < min_train:
+    raise ValueError('%d observations are too few for %d steps at horizon %d after %d'
+                     % (n_obs, steps, horizon, min_train))
+  return sorted(set(int(x) for x in numpy.linspace(min_train, last, n_folds)))
+
+class CVPlan(object):
+
+  def __init__(self, n_obs, orders, origins, horizons=(1,), steps=1, segment=8):
+    self.orders = [tuple(order) for order in orders]
+    self.origins = sorted(origins)
+    self.horizons = sorted(set(horizons))
+    # every (order, origin, prefix, horizon) a naive run would fit separately
+    self.evaluations = [(order, origin, n, h) for order in self.orders
+                        for origin in self.origins for n in range(origin, origin + steps)
+                        for h in self.horizons if n + h - 1 < n_obs]
+    # one node per distinct (order, prefix), forecasting its longest horizon
+    self.nodes = dict()
+    for order, origin, n, h in self.evaluations:
+      self.nodes[order, n] = max(h, self.nodes.get((order, n), 0))
+    # edges: each prefix warm-starts from the next shorter one of its order
+    chains = dict((order, list()) for order in self.orders)
+    for order, n in sorted(self.nodes):
+      chains[order].append(n)
+    self.parent = dict()
+    for order, chain in chains.items():
+      for prev, n in zip(chain, chain[1:]):
+        self.parent[order, n] = (order, prev)
+    # segments of consecutive prefixes, interleaved across orders
+    per_order = [[(order, chain[i:i + segment]) for i in range(0, len(chain), segment)]
+                 for order, chain in chains.items()]
+    self.segments = [segments[k] for k in range(max([len(s) for s in per_order] or [0]))
+                     for segments in per_order if k < len(segments)]
+
+  @property
+  def naive_fits(self):
+    return len(self.evaluations)
+
+  @property
+  def fits(self):
+    return len(self.nodes)
+
+# fit warm-started when possible, falling back to a cold start; returns (fit, warm)
+def _fit(model, order, trend, start_params=None):
+  if start_params is not None:
+    try:
+      return instrumentation.timed_fit(model, order, 'cv', start_params=start_params,
+                                       trend=trend, disp=0), True
+    except (ValueError, numpy.linalg.LinAlgError):
+      pass
+  return instrumentation.timed_fit(model, order, 'cv', trend=trend, disp=0), False
+
+# task run in a worker: fit one segment of an order's chain of prefixes
+def _segment_task(args):
+  X, order, prefixes, horizons, interval, trend, start_params = args
+  start = instrumentation.mark()
+  diff = difference(X, interval)
+  forecasts, params, warm, failure = dict(), dict(), 0, None
+  for n in prefixes:
+    model = ARIMA(diff[:n - interval], order=order)
+    try:
+      model_fit, was_warm = _fit(model, order, trend, start_params)
+      diff_forecasts = instrumentation.timed_forecast(model_fit, order, 'cv', steps=horizons[n])[0]
+    except Exception as e:
+      failure = n, failure_reason(e)
+      break
+    warm += was_warm
+    start_params = params[n] = model_fit.params
+    forecasts[n] = inverse_difference_steps(X[:n], numpy.atleast_1d(diff_forecasts), interval)
+  # only the ends of the segment can be nearest neighbours of other segments
+  ends = dict((n, params[n]) for n in (min(params), max(params))) if params else dict()
+  return order, forecasts, ends, warm, failure, instrumentation.take(start)
+
+# parameters of the completed prefix closest to n, if any
+def _nearest(completed, n):
+  if not completed:
+    return None
+  return completed[min(completed, key=lambda m: abs(m - n))]
+
+# run the plan, returns forecasts by (order, prefix), failures and the warm-start count
+def run_plan(plan, X, interval=12, trend='nc', workers=None):
+  X = numpy.asarray(X, dtype='float32')
+  completed = dict((order, dict()) for order in plan.orders)
+  forecasts, failures, warm = dict(), dict(), 0
+  segments = deque(plan.segments)
+
+  def next_task():
+    while segments:
+      order, prefixes = segments.popleft()
+      if order not in failures:
+        horizons = dict((n, plan.nodes[order, n]) for n in prefixes)
+        return (X, order, prefixes, horizons, interval, trend,
+                _nearest(completed[order], prefixes[0]))
+    return None
+
+  def collect(result):
+    order, segment_forecasts, ends, segment_warm, failure, events = result
+    instrumentation.merge(events)
+    for n, yhat in segment_forecasts.items():
+      forecasts[order, n] = yhat
+    completed[order].update(ends)
+    if failure is not None:
+      failures[order] = failure
+    return segment_warm
+
+  # at most two segments per worker in flight, so later segments are handed
+  # parameters from neighbours that have finished
+  with closing(pool_map(_segment_task, iter(next_task, None), workers, _init_worker,
+                        (instrumentation.config(),))) as results:
+    for result in results:
+      warm += collect(result)
+  return forecasts, failures, warm
+
+# rolling-origin RMSE of every order at every horizon
+def cross_validate(dataset, orders, horizons=(1,), n_folds=10, steps=1, min_train=None,
+                   interval=12, trend='nc', workers=None, segment=8):
+  X = numpy.asarray(dataset, dtype='float32')
+  origins = fold_origins(len(X), n_folds, steps, min(horizons), min_train)
+  plan = CVPlan(len(X), orders, origins, horizons, steps, segment)
+  started = time.time()
+  forecasts, failures, warm = run_plan(plan, X, interval, trend, workers)
+  elapsed = time.time() - started
+  fits = len(forecasts) + len(failures)
+  errors = dict()
+  for order, origin, n, h in plan.evaluations:
+    if order not in failures:
+      errors.setdefault((order, h), list()).append(X[n + h - 1] - forecasts[order, n][h - 1])
+  scores = dict()
+  for order in plan.orders:
+    if order in failures:
+      scores[order] = None
+      print('ARIMA%s failed at n=%d: %s' % ((order,) + failures[order]))
+      continue
+    scores[order] = dict((h, sqrt(numpy.mean(numpy.square(errors[order, h]))))
+                         for h in plan.horizons if (order, h) in errors)
+    print('ARIMA%s %s' % (order, ' '.join('h=%d RMSE=%.3f' % (h, rmse)
+                                          for h, rmse in sorted(scores[order].items()))))
+  best = dict()
+  for h in plan.horizons:
+    # ties resolve in the order the orders were given, as in the grid search
+    ranked = [(scores[order][h], order) for order in plan.orders if scores[order] and h in scores[order]]
+    if ranked:
+      rmse, order = min(ranked, key=lambda r: r[0])
+      best[h] = order, rmse
+      print('Best h=%d ARIMA%s RMSE=%.3f' % (h, order, rmse))
+  print('%d fits run instead of %d (%.1fx fewer), %d warm-started, %.1fs'
+        % (fits, plan.naive_fits, plan.naive_fits / float(fits or 1), warm, elapsed))
+  return {'scores': scores, 'best': best, 'failures': failures, 'origins': origins,
+          'fits': fits, 'planned_fits': plan.fits, 'naive_fits': plan.naive_fits, 'warm_starts': warm,
+          'seconds': elapsed}
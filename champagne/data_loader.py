@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Offline, cached access to the champagne sales data.
+
+The CSV is fetched from GitHub once (or read from a local file with no
+network at all), its dates are parsed once, and the train/validation split
+is stored as .npy files next to it. Later loads memory-map those files, so
+every stage shares the same read-only float32 arrays instead of re-parsing
+dataset.csv. pandas is imported only to parse the CSV the first time and by
+load_series().
+
+The cache records what it was built from (source.json): the URL, or the
+path, size and modification time of a local file. Loading from a different
+source, or from a local file that has changed since, builds the cache again.
+"""
+import json
+import os
+import shutil
+from urllib.request import urlopen
+import numpy
+
+DATA_URL = 'https://raw.githubusercontent.com/jbrownlee/Datasets/master/monthly_champagne_sales.csv'
+CACHE_DIR = os.path.join('.data_cache', 'champagne')
+SOURCE = 'source.json'
+
+# what a cache built from source is recorded as: the URL, or a local file's
+# absolute path, size and modification time
+def source_id(source):
+  if os.path.exists(source):
+    info = os.stat(source)
+    return {'path': os.path.abspath(source), 'size': info.st_size, 'mtime_ns': info.st_mtime_ns}
+  return {'url': source}
+
+# the source the cache was last built from, None if unknown
+def _built_from(cache_dir):
+  try:
+    with open(os.path.join(cache_dir, SOURCE)) as f:
+      return json.load(f)
+  except (IOError, ValueError):
+    return None
+
+# copy the raw CSV into the cache, from a local path or once from the network
+def fetch(source=DATA_URL, cache_dir=CACHE_DIR):
+  filename = os.path.join(cache_dir, 'monthly_champagne_sales.csv')
+  if os.path.exists(filename) and _built_from(cache_dir) == source_id(source):
+    return filename
+  os.makedirs(cache_dir, exist_ok=True)
+  tmp = filename + '.tmp'
+  if os.path.exists(source):
+    shutil.copyfile(source, tmp)
+  else:
+    with urlopen(source) as response, open(tmp, 'wb') as f:
+      shutil.copyfileobj(response, f)
+  os.replace(tmp, filename)
+  return filename
+
+# parse the CSV once and store values and month stamps as .npy
+def build(source=DATA_URL, cache_dir=CACHE_DIR, validation_size=12):
+  from pandas import read_csv
+  series = read_csv(fetch(source, cache_dir), header=0, index_col=0, parse_dates=True).iloc[:, 0]
+  values = series.values.astype('float32')
+  dates = series.index.values.astype('datetime64[M]')
+  split_point = len(values) - validation_size
+  arrays = {'dataset': values[:split_point], 'validation': values[split_point:],
+            'dataset_dates': dates[:split_point], 'validation_dates': dates[split_point:]}
+  for name, array in arrays.items():
+    # renamed into place: arrays mapped by an earlier load keep their file
+    filename = os.path.join(cache_dir, name + '.npy')
+    with open(filename + '.tmp', 'wb') as f:
+      numpy.save(f, array)
+    os.replace(filename + '.tmp', filename)
+  # recorded last: an interrupted build is redone on the next load
+  tmp = os.path.join(cache_dir, SOURCE + '.tmp')
+  with open(tmp, 'w') as f:
+    json.dump(source_id(source), f)
+  os.replace(tmp, os.path.join(cache_dir, SOURCE))
+  return arrays
+
+_loaded = dict()
+
+# memory-mapped train/validation arrays, built on first use from this source
+# and shared after
+def load(source=DATA_URL, cache_dir=CACHE_DIR, validation_size=12):
+  identity = source_id(source)
+  key = (os.path.abspath(cache_dir), validation_size, json.dumps(identity, sort_keys=True))
+  if key in _loaded:
+    return _loaded[key]
+  names = ('dataset', 'validation', 'dataset_dates', 'validation_dates')
+  files = [os.path.join(cache_dir, name + '.npy') for name in names]
+  if not all(os.path.exists(f) for f in files) or _built_from(cache_dir) != identity:
+    build(source, cache_dir, validation_size)
+  arrays = dict((name, numpy.load(f, mmap_mode='r')) for name, f in zip(names, files))
+  if len(arrays['validation']) != validation_size:
+    arrays = build(source, cache_dir, validation_size)
+  _loaded[key] = arrays
+  return arrays
+
+# the training part as a pandas Series indexed by month, like read_csv('dataset.csv')
+def load_series(name='dataset', **kwargs):
+  from pandas import DatetimeIndex, Series
+  arrays = load(**kwargs)
+  return Series(arrays[name], index=DatetimeIndex(arrays[name + '_dates']))
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""Batched stationarity and correlation diagnostics.
+
+The augmented Dickey-Fuller test, the ACF and the PACF of every row of a
+(series x time) array in one call, with NumPy only and nothing plotted:
+
+  * adf(): the lag length is picked by AIC over one common sample as in
+    statsmodels' adfuller, with every candidate regression solved for all
+    series at once; p-values and critical values use MacKinnon's tables.
+  * acf(): autocovariances of all rows from one FFT.
+  * pacf(): Durbin-Levinson recursion on the ACF, vectorized over rows
+    (statsmodels' method='ldb').
+
+diagnose() puts the results in one structured array, one row per series,
+including the AR and MA orders suggested by the leading significant lags;
+select_interval() picks the seasonal differencing interval of each series
+as the first candidate that passes the ADF test.
+"""
+from math import sqrt
+from statistics import NormalDist
+import numpy
+from .differencing import difference
+
+# MacKinnon (1994, 2010) tables for one variable, by regression: statistic
+# bounds beyond which p is 1 or 0, the switch from the small-p to the
+# large-p fit, both polynomial fits of the normal quantile, and the
+# finite-sample critical values at 1%, 5% and 10% as polynomials in 1/nobs
+_MACKINNON = {
+  'n': (float('inf'), -19.04, -1.04, [0.6344, 1.2378, 0.032496],
+        [0.4797, 0.93557, -0.06999, 0.033066],
+        [[-2.56574, -2.2358, -3.627, 0.0], [-1.941, -0.2686, -3.365, 31.223],
+         [-1.61682, 0.2656, -2.714, 25.364]]),
+  'c': (2.74, -18.83, -1.61, [2.1659, 1.4412, 0.038269],
+        [1.7339, 0.93202, -0.12745, -0.010368],
+        [[-3.43035, -6.5393, -16.786, -79.433], [-2.86154, -2.8903, -4.234, -40.04],
+         [-2.56677, -1.5384, -2.809, 0.0]]),
+  'ct': (0.7, -16.18, -2.89, [3.2512, 1.6047, 0.049588],
+         [2.5261, 0.61654, -0.37956, -0.060285],
+         [[-3.95877, -9.0531, -28.428, -134.155], [-3.41049, -4.3904, -9.036, -45.374],
+          [-3.12705, -2.5856, -3.925, -22.38]]),
+}
+
+# series as rows of a float64 array
+def _rows(X):
+  return numpy.atleast_2d(numpy.asarray(X, dtype='float64'))
+
+# autocorrelations up to nlags of every row, from one FFT
+def acf(X, nlags=25):
+  X = _rows(X)
+  n = X.shape[-1]
+  X = X - X.mean(axis=-1, keepdims=True)
+  # zero padded to avoid circular wrap-around
+  size = 1 << (2 * n - 1).bit_length()
+  f = numpy.fft.rfft(X, size)
+  acov = numpy.fft.irfft(f.real ** 2 + f.imag ** 2, size)[:, :nlags + 1]
+  return acov / acov[:, :1]
+
+# partial autocorrelations from autocorrelations, Durbin-Levinson over all rows
+def durbin_levinson(r):
+  r = _rows(r)
+  nlags = r.shape[-1] - 1
+  partial = numpy.ones_like(r)
+  phi = numpy.zeros_like(r)
+  v = numpy.ones(len(r))
+  for k in range(1, nlags + 1):
+    a = (r[:, k] - numpy.einsum('bi,bi->b', phi[:, 1:k], r[:, k - 1:0:-1])) / v
+    phi[:, 1:k] = phi[:, 1:k] - a[:, None] * phi[:, k - 1:0:-1]
+    phi[:, k] = a
+    v = v * (1.0 - a * a)
+    partial[:, k] = a
+  return partial
+
+# partial autocorrelations up to nlags of every row
+def pacf(X, nlags=25):
+  return durbin_levinson(acf(X, nlags))
+
+# last lag of the leading run of significant correlations of every row, capped at max_lag
+def significant_lags(values, n, max_lag):
+  values = _rows(values)
+  k = min(max_lag, values.shape[-1] - 1)
+  inside = numpy.abs(values[:, 1:k + 1]) <= 1.96 / sqrt(n)
+  return numpy.where(inside.any(axis=-1), inside.argmax(axis=-1), k)
+
+# ADF regressors: deterministic terms, lagged level, lagged differences; and the target
+def _adf_design(X, dX, lag, regression):
+  nobs = dX.shape[-1] - lag
+  columns = list()
+  if 'c' in regression:
+    columns.append(numpy.ones((len(X), nobs)))
+  if 't' in regression:
+    columns.append(numpy.broadcast_to(numpy.arange(1.0, nobs + 1), (len(X), nobs)))
+  columns.append(X[:, lag:lag + nobs])
+  for j in range(1, lag + 1):
+    columns.append(dX[:, lag - j:lag - j + nobs])
+  return numpy.stack(columns, axis=-1), dX[:, lag:]
+
+# least squares for a batch of regressions, returns coefficients, ssr and X'X
+def _ols(Z, y):
+  G = numpy.matmul(Z.transpose(0, 2, 1), Z)
+  beta = numpy.linalg.solve(G, numpy.einsum('bni,bn->bi', Z, y)[..., None])[..., 0]
+  resid = y - numpy.einsum('bni,bi->bn', Z, beta)
+  return beta, numpy.einsum('bn,bn->b', resid, resid), G
+
+# MacKinnon approximate p-values of ADF statistics
+def mackinnon_pvalue(stat, regression='c'):
+  upper, lower, star, small_p, large_p = _MACKINNON[regression][:5]
+  stat = numpy.asarray(stat, dtype='float64')
+  z = numpy.where(stat <= star, numpy.polyval(small_p[::-1], stat), numpy.polyval(large_p[::-1], stat))
+  norm = NormalDist()
+  p = numpy.array([norm.cdf(v) for v in z.ravel()]).reshape(z.shape)
+  return numpy.where(stat > upper, 1.0, numpy.where(stat < lower, 0.0, p))
+
+# MacKinnon critical values at 1%, 5% and 10% for each number of observations
+def mackinnon_crit(nobs, regression='c'):
+  table = numpy.array(_MACKINNON[regression][5])
+  inv = 1.0 / numpy.asarray(nobs, dtype='float64')[..., None]
+  return table[:, 0] + table[:, 1] * inv + table[:, 2] * inv ** 2 + table[:, 3] * inv ** 3
+
+# augmented Dickey-Fuller test of every row: (stat, pvalue, usedlag, nobs, crit)
+def adf(X, maxlag=None, regression='c', autolag=True):
+  if regression not in _MACKINNON:
+    raise ValueError('regression must be one of %s' % ', '.join(sorted(_MACKINNON)))
+  X = _rows(X)
+  n = X.shape[-1]
+  ntrend = len(regression) if regression != 'n' else 0
+  if maxlag is None:
+    maxlag = min(n // 2 - ntrend - 1, int(numpy.ceil(12.0 * (n / 100.0) ** 0.25)))
+  if maxlag < 0 or maxlag > n // 2 - ntrend - 1:
+    raise ValueError('maxlag %d does not fit %d observations' % (maxlag, n))
+  dX = numpy.diff(X, axis=-1)
+  usedlag = numpy.full(len(X), maxlag)
+  if autolag:
+    # every lag length on the same sample, so the AICs are comparable
+    Z, y = _adf_design(X, dX, maxlag, regression)
+    nobs = y.shape[-1]
+    best = numpy.full(len(X), numpy.inf)
+    for lag in range(maxlag + 1):
+      k = ntrend + 1 + lag
+      ssr = _ols(Z[..., :k], y)[1]
+      aic = nobs * (numpy.log(2 * numpy.pi) + numpy.log(ssr / nobs) + 1) + 2 * k
+      better = aic < best
+      best = numpy.where(better, aic, best)
+      usedlag = numpy.where(better, lag, usedlag)
+  stat = numpy.empty(len(X))
+  nobs = numpy.empty(len(X), dtype='int64')
+  # refit with the chosen lag, all series sharing a lag at once
+  for lag in numpy.unique(usedlag):
+    rows = usedlag == lag
+    Z, y = _adf_design(X[rows], dX[rows], lag, regression)
+    beta, ssr, G = _ols(Z, y)
+    k = Z.shape[-1]
+    level = ntrend
+    cov = numpy.linalg.inv(G)[:, level, level]
+    stat[rows] = beta[:, level] / numpy.sqrt(ssr / (y.shape[-1] - k) * cov)
+    nobs[rows] = y.shape[-1]
+  return stat, mackinnon_pvalue(stat, regression), usedlag, nobs, mackinnon_crit(nobs, regression)
+
+# one row of the diagnostics table per series
+def table_dtype(nlags=25):
+  return numpy.dtype([('interval', 'i4'), ('adf', 'f8'), ('pvalue', 'f8'), ('usedlag', 'i4'),
+                      ('nobs', 'i4'), ('crit', 'f8', (3,)), ('stationary', '?'), ('p', 'i4'),
+                      ('q', 'i4'), ('acf', 'f8', (nlags + 1,)), ('pacf', 'f8', (nlags + 1,))])
+
+# ADF, ACF, PACF and suggested (p, q) of every series after seasonal differencing
+def diagnose(X, nlags=25, interval=12, regression='c', maxlag=None, alpha=0.05, max_p=None, max_q=None):
+  W = _rows(X)
+  if interval:
+    W = difference(W, interval)
+  stat, pvalue, usedlag, nobs, crit = adf(W, maxlag, regression)
+  r = acf(W, nlags)
+  partial = durbin_levinson(r)
+  table = numpy.zeros(len(W), dtype=table_dtype(nlags))
+  table['interval'] = interval
+  table['adf'] = stat
+  table['pvalue'] = pvalue
+  table['usedlag'] = usedlag
+  table['nobs'] = nobs
+  table['crit'] = crit
+  table['stationary'] = pvalue < alpha
+  table['p'] = significant_lags(partial, W.shape[-1], nlags if max_p is None else max_p)
+  table['q'] = significant_lags(r, W.shape[-1], nlags if max_q is None else max_q)
+  table['acf'] = r
+  table['pacf'] = partial
+  return table
+
+# per series, the first candidate interval whose difference passes the ADF test
+def select_interval(X, intervals=(0, 1, 12), alpha=0.05, **kwargs):
+  tables = [diagnose(X, interval=interval, alpha=alpha, **kwargs) for interval in intervals]
+  stationary = numpy.stack([t['stationary'] for t in tables])
+  # none passes: fall back to the candidate with the smallest p-value
+  choice = numpy.where(stationary.any(axis=0), stationary.argmax(axis=0),
+                       numpy.stack([t['pvalue'] for t in tables]).argmin(axis=0))
+  return numpy.stack(tables)[choice, numpy.arange(len(choice))]
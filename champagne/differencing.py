@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Seasonal differencing and its inversion.
+
+One shared, NumPy-vectorized copy of the difference()/inverse_difference()
+helpers used throughout the champagne pipeline. Inputs are taken as views, so
+float32 and float64 arrays are never copied or upcast, and every kernel
+accepts an optional out= buffer to avoid allocating inside loops.
+"""
+import numpy
+
+# create a differenced series, empty while shorter than interval
+def difference(dataset, interval=1, out=None):
+  X = numpy.asarray(dataset)
+  return numpy.subtract(X[..., interval:], X[..., :max(X.shape[-1] - interval, 0)], out=out)
+
+# invert differenced value
+def inverse_difference(history, yhat, interval=1):
+  return yhat + history[-interval]
+
+# invert an h-step forecast of a differenced series, h may exceed interval
+def inverse_difference_steps(history, forecasts, interval=1, out=None):
+  history = numpy.asarray(history)
+  forecasts = numpy.asarray(forecasts)
+  h = forecasts.shape[-1]
+  # step k adds to the value one interval back, which is itself a forecast
+  # once k > interval: fold the horizon into rows of one interval and cumsum
+  n_blocks = -(-h // interval)
+  lead = forecasts.shape[:-1]
+  blocks = numpy.zeros(lead + (n_blocks * interval,), dtype=numpy.result_type(history, forecasts))
+  blocks[..., :h] = forecasts
+  blocks = blocks.reshape(lead + (n_blocks, interval))
+  numpy.cumsum(blocks, axis=-2, out=blocks)
+  blocks += history[..., numpy.newaxis, history.shape[-1] - interval:]
+  result = blocks.reshape(lead + (n_blocks * interval,))[..., :h]
+  if out is None:
+    return result
+  out[...] = result
+  return out
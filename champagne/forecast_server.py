@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""Local forecast service built on the finalized model artifact.
+
+Loads model.json once and serves it over a small asyncio HTTP server on
+localhost, or over stdin/stdout:
+
+  GET  /forecast?steps=12   -> {"forecast": [...], "n_obs": 93}
+  POST /append              <- {"value": 5000} or {"values": [5000, 5200]}
+  POST /reload              -> reload the model file now
+  GET  /stats               -> request count and latency percentiles
+
+Appending an observation updates the forecast state without refitting.
+The model file is polled and hot-reloaded when a new one is written;
+observations appended since the new model's last observation are replayed
+onto it so no data is lost across a reload. The last REPLAY_LIMIT appended
+observations are kept for that. While the file is missing or unreadable the
+loaded model keeps serving, and a reload request gets a 503.
+
+  python -m champagne.forecast_server model.json --port 8765
+  python -m champagne.forecast_server model.json --stdin
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+from .artifact import ForecastModel
+
+# appended observations kept for replay onto a reloaded model
+REPLAY_LIMIT = 10000
+
+class ForecastService(object):
+
+  def __init__(self, path):
+    self.path = path
+    self.model = None
+    self.mtime = None
+    self.appended = deque(maxlen=REPLAY_LIMIT)
+    self.latencies = deque(maxlen=10000)
+    self.requests = 0
+    self.reload()
+
+  # load the model file and replay observations it has not seen yet
+  def reload(self):
+    mtime = os.stat(self.path).st_mtime
+    model = ForecastModel.load(self.path)
+    replayed = 0
+    if model.n_obs is not None:
+      self.appended = deque(((n, obs) for n, obs in self.appended if n >= model.n_obs),
+                            maxlen=REPLAY_LIMIT)
+      for n, obs in self.appended:
+        if n == model.n_obs:
+          model.append(obs)
+          replayed += 1
+    else:
+      self.appended.clear()
+    # swap in one assignment, requests never see a half-loaded model
+    self.model, self.mtime = model, mtime
+    return {'reloaded': True, 'n_obs': model.n_obs, 'replayed': replayed}
+
+  def reload_if_changed(self):
+    try:
+      mtime = os.stat(self.path).st_mtime
+    except OSError:
+      return False
+    if mtime == self.mtime:
+      return False
+    try:
+      self.reload()
+    except (OSError, ValueError, KeyError, TypeError):
+      # removed since the stat or half written: keep serving the old model, retry next poll
+      return False
+    return True
+
+  def forecast(self, steps=1):
+    return {'forecast': self.model.forecast(steps), 'n_obs': self.model.n_obs}
+
+  # check every value before appending any, so a bad request changes nothing
+  def append(self, values):
+    if not isinstance(values, (list, tuple)):
+      raise TypeError('values must be a list, not %s' % type(values).__name__)
+    values = [float(obs) for obs in values]
+    for obs in values:
+      if not math.isfinite(obs):
+        raise ValueError('observation %r is not finite' % obs)
+    for obs in values:
+      if self.model.n_obs is not None:
+        self.appended.append((self.model.n_obs, obs))
+      self.model.append(obs)
+    return {'appended': len(values), 'n_obs': self.model.n_obs}
+
+  def stats(self):
+    latencies = sorted(self.latencies)
+    def percentile(q):
+      return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e6 if latencies else None
+    return {'requests': self.requests, 'p50_us': percentile(0.50), 'p99_us': percentile(0.99),
+            'n_obs': self.model.n_obs}
+
+  # dispatch one request, returns (status, payload)
+  def handle(self, method, target, body=b''):
+    start = time.perf_counter()
+    url = urlsplit(target)
+    try:
+      if method == 'GET' and url.path == '/forecast':
+        steps = int(parse_qs(url.query).get('steps', ['1'])[0])
+        if steps < 1:
+          raise ValueError('steps must be at least 1')
+        result = 200, self.forecast(steps)
+      elif method == 'POST' and url.path == '/append':
+        data = json.loads(body or b'{}')
+        values = data['values'] if 'values' in data else [data['value']]
+        result = 200, self.append(values)
+      elif method == 'POST' and url.path == '/reload':
+        result = 200, self.reload()
+      elif method == 'GET' and url.path == '/stats':
+        result = 200, self.stats()
+      else:
+        result = 404, {'error': 'no route for %s %s' % (method, url.path)}
+    except (ValueError, KeyError, TypeError) as e:
+      result = 400, {'error': '%s: %s' % (type(e).__name__, e)}
+    except OSError as e:
+      # the model file is missing or unreadable; the loaded model keeps serving
+      result = 503, {'error': '%s: %s' % (type(e).__name__, e)}
+    self.requests += 1
+    self.latencies.append(time.perf_counter() - start)
+    return result
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 503: 'Service Unavailable'}
+
+# one HTTP/1.1 connection, kept alive until the client closes it
+async def serve_connection(service, reader, writer):
+  try:
+    while True:
+      request_line = await reader.readline()
+      if not request_line:
+        break
+      method, target, version = request_line.decode('latin-1').split()
+      headers = dict()
+      while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+          break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+      length = int(headers.get('content-length', 0))
+      body = await reader.readexactly(length) if length else b''
+      status, payload = service.handle(method, target, body)
+      data = json.dumps(payload).encode()
+      keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+      writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n'
+                   b'Connection: %s\r\n\r\n' % (status, REASONS[status].encode(), len(data),
+                   b'keep-alive' if keep_alive else b'close') + data)
+      await writer.drain()
+      if not keep_alive:
+        break
+  except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+    pass
+  finally:
+    writer.close()
+
+# poll the model file and hot-reload it when it changes; an unexpected error
+# is reported and polling goes on, so hot reload never stops silently
+async def watch(service, interval=1.0):
+  while True:
+    await asyncio.sleep(interval)
+    try:
+      if service.reload_if_changed():
+        print('reloaded %s, n_obs=%s' % (service.path, service.model.n_obs), file=sys.stderr)
+    except Exception as e:
+      print('reload of %s failed: %s: %s' % (service.path, type(e).__name__, e), file=sys.stderr)
+
+async def serve_http(service, host='127.0.0.1', port=8765, poll=1.0):
+  server = await asyncio.start_server(lambda r, w: serve_connection(service, r, w), host, port)
+  watcher = asyncio.ensure_future(watch(service, poll))
+  print('serving %s on http://%s:%d' % (service.path, host, port), file=sys.stderr)
+  try:
+    async with server:
+      await server.serve_forever()
+  finally:
+    watcher.cancel()
+
+# line protocol on stdin: "forecast 12", "append 5000 5200", "reload", "stats"
+def serve_stdin(service, stdin=sys.stdin, stdout=sys.stdout):
+  for line in stdin:
+    parts = line.split()
+    if not parts:
+      continue
+    command, args = parts[0], parts[1:]
+    service.reload_if_changed()
+    if command == 'forecast':
+      status, payload = service.handle('GET', '/forecast?steps=%s' % (args[0] if args else 1))
+    elif command == 'append':
+      # the words are parsed by the service, a bad one gets an error payload
+      status, payload = service.handle('POST', '/append', json.dumps({'values': args}))
+    elif command in ('reload', 'stats'):
+      status, payload = service.handle('POST' if command == 'reload' else 'GET', '/' + command)
+    else:
+      payload = {'error': 'unknown command %r' % command}
+    stdout.write(json.dumps(payload) + '\n')
+    stdout.flush()
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Serve forecasts from a finalized model artifact.')
+  parser.add_argument('model', nargs='?', default='model.json')
+  parser.add_argument('--host', default='127.0.0.1')
+  parser.add_argument('--port', type=int, default=8765)
+  parser.add_argument('--poll', type=float, default=1.0, help='seconds between model file checks')
+  parser.add_argument('--stdin', action='store_true', help='read commands from stdin instead of HTTP')
+  args = parser.parse_args(argv)
+  service = ForecastService(args.model)
+  if args.stdin:
+    serve_stdin(service)
+  else:
+    try:
+      asyncio.run(serve_http(service, args.host, args.port, args.poll))
+    except KeyboardInterrupt:
+      pass
+
+if __name__ == '__main__':
+  main()
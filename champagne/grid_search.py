@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""Parallel grid search of ARIMA hyperparameters.
+
+The (p,d,q) orders of the champagne grid search are spread over a pool of
+worker processes. With split_steps=True every walk-forward step of every
+order becomes its own task, which keeps all cores busy even when only a few
+orders are left. Results are printed as each order finishes and the best
+order is picked in grid order, so it matches the serial search exactly;
+orders whose fit fails are listed with the reason.
+"""
+import warnings
+from contextlib import closing
+from parallel import ignore_sigint, pool_map
+from .arima import ARIMA
+from .baselines import walk_forward_rmse
+from .differencing import difference, inverse_difference
+from . import instrumentation
+
+# cast a series and find where its walk-forward test part starts
+def prepare_data(X):
+  X = X.astype('float32')
+  train_size = int(len(X) * 0.50)
+  return X, train_size
+
+# describe an exception the way it is reported for a failed order
+def failure_reason(e):
+  return '%s: %s' % (type(e).__name__, str(e).strip().split('\n')[0])
+
+# fit on the first n observations and forecast observation n
+def forecast_step(X, n, arima_order, interval=12, cache=None, stage='evaluate'):
+  history = X[0:n]
+  diff = difference(history, interval)
+  if cache is not None:
+    model_fit = cache.fit(diff, arima_order, trend='nc', stage=stage)
+  else:
+    model = ARIMA(diff, order=arima_order)
+    model_fit = instrumentation.timed_fit(model, arima_order, stage, trend='nc', disp=0)
+  yhat = instrumentation.timed_forecast(model_fit, arima_order, stage)[0]
+  return inverse_difference(history, yhat, interval)
+
+# evaluate an ARIMA model for a given order (p,d,q) and return RMSE
+def evaluate_arima_model(X, arima_order, cache=None):
+  X, train_size = prepare_data(X)
+  test = X[train_size:]
+  predictions = [forecast_step(X, n, arima_order, cache=cache) for n in range(train_size, len(X))]
+  # calculate out of sample error
+  rmse = walk_forward_rmse(test, predictions)
+  return rmse
+
+# workers leave Ctrl-C to the parent, which tears the pool down
+def _init_worker(profile_config=None):
+  ignore_sigint()
+  warnings.filterwarnings("ignore")
+  instrumentation.configure(profile_config)
+
+# cache hits and misses so far
+def _cache_counts(cache):
+  if cache is None:
+    return 0, 0
+  return cache.hits, cache.misses
+
+# the hits and misses made by one task, taken back out of the cache: the
+# parent adds them whether the task ran in a worker or in the parent itself
+def _take_counts(cache, before):
+  if cache is None:
+    return 0, 0
+  counts = cache.hits - before[0], cache.misses - before[1]
+  cache.hits, cache.misses = before
+  return counts
+
+# task run in a worker: score a whole order
+def _order_task(args):
+  X, order, cache = args
+  before, start = _cache_counts(cache), instrumentation.mark()
+  rmse = reason = None
+  try:
+    rmse = evaluate_arima_model(X, order, cache)
+  except Exception as e:
+    reason = failure_reason(e)
+  return order, rmse, reason, _take_counts(cache, before), instrumentation.take(start)
+
+# task run in a worker: one walk-forward step of one order
+def _step_task(args):
+  X, order, n, cache = args
+  before, start = _cache_counts(cache), instrumentation.mark()
+  yhat = reason = None
+  try:
+    yhat = forecast_step(X, n, order, cache=cache)
+  except Exception as e:
+    reason = failure_reason(e)
+  return order, n, yhat, reason, _take_counts(cache, before), instrumentation.take(start)
+
+# fold the cache counters and fit events of a finished task into the parent
+def _merge_counts(cache, counts, events=()):
+  instrumentation.merge(events)
+  if cache is not None:
+    cache.hits += counts[0]
+    cache.misses += counts[1]
+
+# stream (order, rmse, failure reason) as orders finish, one task per order
+def _score_orders(X, orders, cache, workers):
+  tasks = [(X, order, cache) for order in orders]
+  for order, rmse, reason, counts, events in pool_map(_order_task, tasks, workers, _init_worker,
+                                                      (instrumentation.config(),), ordered=False):
+    _merge_counts(cache, counts, events)
+    yield order, rmse, reason
+
+# stream (order, rmse, failure reason) as orders finish, one task per walk-forward step
+def _score_steps(X, orders, cache, workers):
+  X, train_size = prepare_data(X)
+  test = X[train_size:]
+  tasks = [(X, order, n, cache) for order in orders for n in range(train_size, len(X))]
+  predictions = dict((order, [None] * len(test)) for order in orders)
+  remaining = dict((order, len(test)) for order in orders)
+  for order, n, yhat, reason, counts, events in pool_map(_step_task, tasks, workers, _init_worker,
+                                                         (instrumentation.config(),), ordered=False):
+    _merge_counts(cache, counts, events)
+    if order not in remaining:
+      continue
+    if yhat is None:
+      del remaining[order]
+      yield order, None, reason
+      continue
+    predictions[order][n - train_size] = yhat
+    remaining[order] -= 1
+    if remaining[order] == 0:
+      del remaining[order]
+      yield order, walk_forward_rmse(test, predictions.pop(order)), None
+
+# evaluate combinations of p, d and q values for an ARIMA model
+def evaluate_models(dataset, p_values, d_values, q_values, workers=None, split_steps=False, cache=None,
+                    profile=10):
+  dataset = dataset.astype('float32')
+  orders = [(p,d,q) for p in p_values for d in d_values for q in q_values]
+  scores, failures = dict(), dict()
+  score = _score_steps if split_steps else _score_orders
+  # closing: Ctrl-C or a failure in the parent stops the workers right away
+  with closing(score(dataset, orders, cache, workers)) as results:
+    for order, rmse, reason in results:
+      scores[order] = rmse
+      if rmse is not None:
+        print('ARIMA%s RMSE=%.3f' % (order,rmse))
+      else:
+        failures[order] = reason
+  # workers store fits without evicting; prune the cache once they are done
+  if cache is not None:
+    cache.evict()
+  # pick the winner in grid order so ties resolve as in the serial search
+  best_score, best_cfg = float("inf"), None
+  for order in orders:
+    rmse = scores.get(order)
+    if rmse is not None and rmse < best_score:
+      best_score, best_cfg = rmse, order
+  for order in orders:
+    if order in failures:
+      print('ARIMA%s failed: %s' % (order, failures[order]))
+  print( 'Best ARIMA%s RMSE=%.3f' % (best_cfg, best_score))
+  # with instrumentation enabled, show the slowest orders and the failures
+  if profile and instrumentation.enabled():
+    instrumentation.summary(profile)
+  return best_cfg, best_score
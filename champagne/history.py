@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Array-backed history store for walk-forward loops.
+
+Replaces `history = [x for x in train]` plus difference(history, 12) at
+every step. Observations live in one preallocated float32 buffer and the
+seasonal differences in a second one, each extended in O(1) amortized time
+per append. values(), tail() and diff() are zero-copy contiguous views, so
+they go straight into ARIMA and the fit cache, and history[-interval]
+indexing works for inverse_difference without any list-to-array conversion.
+
+With maxlen the store keeps only the last maxlen observations: the buffers
+are twice that size and the tail is moved to the front when they fill up,
+which keeps the views contiguous. Views taken in that mode are only valid
+until the next append.
+"""
+import numpy
+
+# one growable or bounded contiguous buffer
+class _Buffer(object):
+
+  __slots__ = ('data', 'start', 'end', 'maxlen')
+
+  def __init__(self, capacity, dtype, maxlen=None):
+    self.maxlen = maxlen
+    if maxlen is not None:
+      capacity = 2 * maxlen
+    self.data = numpy.empty(max(capacity, 16), dtype=dtype)
+    self.start = 0
+    self.end = 0
+
+  def append(self, value):
+    if self.end == len(self.data):
+      n = self.end - self.start
+      if self.maxlen is not None:
+        # slide the live tail back to the front of the buffer
+        self.data[:n] = self.data[self.start:self.end]
+      else:
+        grown = numpy.empty(2 * len(self.data), dtype=self.data.dtype)
+        grown[:n] = self.data[self.start:self.end]
+        self.data = grown
+      self.start, self.end = 0, n
+    self.data[self.end] = value
+    self.end += 1
+    if self.maxlen is not None and self.end - self.start > self.maxlen:
+      self.start += 1
+
+  def extend(self, values):
+    values = numpy.asarray(values, dtype=self.data.dtype)
+    if self.maxlen is not None:
+      values = values[len(values) - self.maxlen:] if len(values) > self.maxlen else values
+    for value in values:
+      self.append(value)
+
+  def view(self):
+    return self.data[self.start:self.end]
+
+class SeriesHistory(object):
+
+  __slots__ = ('interval', 'count', '_values', '_diff')
+
+  def __init__(self, values=(), interval=12, maxlen=None, capacity=1024, dtype='float32'):
+    if maxlen is not None and maxlen <= interval:
+      raise ValueError('maxlen %d must be longer than the interval %d' % (maxlen, interval))
+    self.interval = interval
+    self.count = 0
+    self._values = _Buffer(capacity, dtype, maxlen)
+    self._diff = _Buffer(capacity, dtype, maxlen - interval if maxlen is not None else None)
+    values = numpy.asarray(values, dtype=dtype)
+    if len(values):
+      if maxlen is not None and len(values) > maxlen:
+        self.count = len(values) - maxlen
+        values = values[self.count:]
+      self._values.extend(values)
+      # the initial differences in one vectorized pass
+      self._diff.extend(values[interval:] - values[:len(values) - interval])
+      self.count += len(values)
+
+  # add one observation and its seasonal difference, O(1) amortized
+  def append(self, obs):
+    values = self._values.view()
+    if len(values) >= self.interval:
+      self._diff.append(obs - values[len(values) - self.interval])
+    self._values.append(obs)
+    self.count += 1
+
+  # every kept observation, as a view
+  def values(self):
+    return self._values.view()
+
+  # the last n observations, as a view
+  def tail(self, n):
+    values = self._values.view()
+    return values[max(0, len(values) - n):]
+
+  # the seasonally differenced series, as a view
+  def diff(self):
+    return self._diff.view()
+
+  # the last n seasonal differences, as a view
+  def diff_tail(self, n):
+    diff = self._diff.view()
+    return diff[max(0, len(diff) - n):]
+
+  def __len__(self):
+    return self._values.end - self._values.start
+
+  def __getitem__(self, index):
+    return self._values.view()[index]
+
+  def __array__(self, dtype=None, copy=None):
+    values = self._values.view()
+    return values if dtype is None else values.astype(dtype)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Multi-step horizon forecasts from a single fit.
+
+One ARIMA fit on the seasonally differenced series gives the whole h-step
+forecast of the differences; inverse_difference_steps() then undoes the
+seasonal difference for every step in one vectorized pass, including steps
+past one season that add onto earlier forecasts. Prediction intervals come
+from the psi weights of the full model, seasonal integration included, so
+they widen correctly past 12 months. Batches of series are fitted one by
+one and inverted together.
+"""
+from statistics import NormalDist
+import numpy
+from .arima import ARIMA
+from .differencing import difference, inverse_difference_steps
+from . import instrumentation
+
+# MA(infinity) weights of an ARMA(p,q), psi_0 = 1
+def psi_weights(arparams, maparams, steps):
+  psi = numpy.zeros(steps)
+  psi[0] = 1.0
+  for j in range(1, steps):
+    value = maparams[j - 1] if j - 1 < len(maparams) else 0.0
+    for i in range(min(j, len(arparams))):
+      value += arparams[i] * psi[j - 1 - i]
+    psi[j] = value
+  return psi
+
+# psi weights of the level series: integrate d times, then the seasonal difference
+def level_psi_weights(arparams, maparams, d, interval, steps):
+  psi = psi_weights(arparams, maparams, steps)
+  for i in range(d):
+    psi = numpy.cumsum(psi)
+  return inverse_difference_steps(numpy.zeros(interval), psi, interval)
+
+# fit once and forecast steps ahead of each series in X (one series or series x time)
+def forecast_horizon(X, steps=12, order=(4,0,1), interval=12, bias=0.0, alpha=0.05, trend='nc'):
+  X = numpy.asarray(X, dtype='float64')
+  batch = X.reshape(-1, X.shape[-1])
+  diff_forecasts = numpy.empty((len(batch), steps))
+  stderr = numpy.empty((len(batch), steps))
+  for s, series in enumerate(batch):
+    model = ARIMA(difference(series, interval), order=order)
+    model_fit = instrumentation.timed_fit(model, order, 'horizon', trend=trend, disp=0)
+    diff_forecasts[s] = instrumentation.timed_forecast(model_fit, order, 'horizon', steps=steps)[0]
+    psi = level_psi_weights(model_fit.arparams, model_fit.maparams, order[1], interval, steps)
+    stderr[s] = numpy.sqrt(model_fit.sigma2 * numpy.cumsum(psi ** 2))
+  # undo the seasonal difference for every series and step at once
+  yhat = numpy.asarray(bias) + inverse_difference_steps(batch, diff_forecasts, interval)
+  z = NormalDist().inv_cdf(1.0 - alpha / 2.0)
+  conf_int = numpy.stack([yhat - z * stderr, yhat + z * stderr], axis=-1)
+  shape = X.shape[:-1] + (steps,)
+  return yhat.reshape(shape), stderr.reshape(shape), conf_int.reshape(shape + (2,))
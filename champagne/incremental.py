@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Incremental ARIMA forecaster for walk-forward validation.
+
+The walk-forward loops rebuild difference(history, 12) and fit a cold ARIMA
+at every step. IncrementalARIMA keeps the seasonal difference, the last p
+values and the last q residuals as its filter state. A new observation
+updates that state in O(p+q), and the parameters are only re-estimated every
+refit_every steps, warm-started from the previous estimates.
+"""
+import numpy
+from .arima import ARIMA
+from .history import SeriesHistory
+from . import instrumentation
+from .artifact import ForecastModel
+from .baselines import walk_forward_rmse
+
+class IncrementalARIMA(object):
+
+  def __init__(self, history, order, interval=12, trend='nc', refit_every=1):
+    self.order = tuple(order)
+    self.interval = interval
+    self.trend = trend
+    self.refit_every = refit_every
+    self.history = SeriesHistory(history, interval)
+    self.params = None
+    self.state = None
+    self.n_fits = 0
+    self.steps_since_fit = 0
+    self.fit()
+
+  # estimate the parameters, warm-started from the previous estimates
+  def fit(self):
+    model = ARIMA(self.history.diff(), order=self.order)
+    model_fit = None
+    if self.params is not None:
+      try:
+        model_fit = instrumentation.timed_fit(model, self.order, 'incremental',
+                                              start_params=self.params, trend=self.trend, disp=0)
+      except (ValueError, numpy.linalg.LinAlgError):
+        model_fit = None
+    if model_fit is None:
+      model_fit = instrumentation.timed_fit(model, self.order, 'incremental', trend=self.trend, disp=0)
+    self.n_fits += 1
+    self.steps_since_fit = 0
+    self.params = model_fit.params
+    # filter state: the d-differenced tail and the last q residuals
+    self.state = ForecastModel.from_fit(model_fit, self.history, self.order, self.interval, self.trend)
+    return model_fit
+
+  # forecast the next observation on the original scale
+  def forecast(self):
+    return self.state.forecast()[0]
+
+  # take in a new observation, updating the state or refitting per policy
+  def update(self, obs):
+    self.history.append(obs)
+    self.steps_since_fit += 1
+    if self.refit_every and self.steps_since_fit >= self.refit_every:
+      self.fit()
+    else:
+      self.state.append(obs)
+
+# walk-forward validation with an incremental model, returns the predictions
+def walk_forward(X, order, interval=12, trend='nc', refit_every=1):
+  X = X.astype('float32')
+  train_size = int(len(X) * 0.50)
+  train, test = X[0:train_size], X[train_size:]
+  model = IncrementalARIMA(train, order, interval, trend, refit_every)
+  predictions = list()
+  for i in range(len(test)):
+    predictions.append(model.forecast())
+    model.update(test[i])
+  return test, predictions
+
+# evaluate an ARIMA model incrementally and return RMSE
+def evaluate_arima_model(X, arima_order, refit_every=1):
+  test, predictions = walk_forward(X, arima_order, refit_every=refit_every)
+  rmse = walk_forward_rmse(test, predictions)
+  return rmse
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""Timing and convergence events for every ARIMA fit and forecast.
+
+Call enable() (optionally with a JSON-lines path, which it truncates) and
+every fit/forecast made through timed_fit()/timed_forecast() is recorded with
+its stage, order, series length, duration, optimizer iterations and
+convergence status, and the error if it raised. summary() prints the slowest
+orders and the failure counts of the run since enable(); read_log() loads a
+saved log for summary(records=...). While disabled the wrappers are a single
+global check around the plain call.
+
+Pool tasks hand the events they recorded back to the parent with their
+result (mark() and take() in the task, merge() in the parent), so summary()
+covers the fits made in workers whether or not there is a log file.
+"""
+import json
+import os
+import time
+from collections import defaultdict
+
+_config = None
+_events = list()
+
+# start a new run; with a path every event is also appended there as JSON,
+# after whatever an earlier run left in the file is truncated
+def enable(path=None):
+  global _config
+  if path:
+    open(path, 'w').close()
+  _config = {'path': path}
+  del _events[:]
+
+def disable():
+  global _config
+  _config = None
+
+def enabled():
+  return _config is not None
+
+# the settings a worker process needs to record into the same log
+def config():
+  return _config
+
+def configure(config):
+  global _config
+  _config = config
+
+def _record(event):
+  _events.append(event)
+  path = _config['path']
+  if path:
+    # one short append per event, so pool workers can share the file
+    with open(path, 'a') as f:
+      f.write(json.dumps(event) + '\n')
+
+# position in this process's events, taken at the start of a pool task
+def mark():
+  return len(_events)
+
+# the events recorded since mark, removed from this process's list
+def take(start=0):
+  taken = _events[start:]
+  del _events[start:]
+  return taken
+
+# fold the events a pool task handed back into this process
+def merge(records):
+  if _config is not None:
+    _events.extend(records)
+
+def _order(order):
+  return list(order) if order is not None else None
+
+# fit a model, recording the call when enabled
+def timed_fit(model, order=None, stage=None, **fit_kwargs):
+  if _config is None:
+    return model.fit(**fit_kwargs)
+  event = {'kind': 'fit', 'stage': stage, 'order': _order(order),
+           'n': len(model.endog), 'pid': os.getpid()}
+  start = time.perf_counter()
+  try:
+    model_fit = model.fit(**fit_kwargs)
+  except Exception as e:
+    event.update(seconds=time.perf_counter() - start, error='%s: %s' % (type(e).__name__, e))
+    _record(event)
+    raise
+  retvals = getattr(model_fit, 'mle_retvals', None) or {}
+  event.update(seconds=time.perf_counter() - start, error=None,
+               iterations=retvals.get('iterations'),
+               converged=bool(retvals.get('converged', True)),
+               warnflag=retvals.get('warnflag'))
+  _record(event)
+  return model_fit
+
+# forecast from a fitted model, recording the call when enabled
+def timed_forecast(model_fit, order=None, stage=None, **forecast_kwargs):
+  if _config is None:
+    return model_fit.forecast(**forecast_kwargs)
+  event = {'kind': 'forecast', 'stage': stage, 'order': _order(order), 'pid': os.getpid()}
+  start = time.perf_counter()
+  try:
+    result = model_fit.forecast(**forecast_kwargs)
+  except Exception as e:
+    event.update(seconds=time.perf_counter() - start, error='%s: %s' % (type(e).__name__, e))
+    _record(event)
+    raise
+  event.update(seconds=time.perf_counter() - start, error=None)
+  _record(event)
+  return result
+
+# every event recorded since enable(), pool workers' included
+def events():
+  return list(_events)
+
+# the events of a JSON-lines log, e.g. one left by an earlier session
+def read_log(path):
+  with open(path) as f:
+    return [json.loads(line) for line in f if line.strip()]
+
+# print the top-N slowest orders by total fit time and the failure counts
+def summary(top_n=10, records=None):
+  records = events() if records is None else records
+  by_order = defaultdict(lambda: {'fits': 0, 'seconds': 0.0, 'max': 0.0, 'iterations': 0,
+                                  'unconverged': 0, 'failed': 0})
+  failures = defaultdict(int)
+  for event in records:
+    if event['kind'] != 'fit':
+      continue
+    row = by_order[tuple(event['order'] or ())]
+    row['fits'] += 1
+    row['seconds'] += event['seconds']
+    row['max'] = max(row['max'], event['seconds'])
+    if event['error']:
+      row['failed'] += 1
+      failures[event['error'].split(':')[0]] += 1
+      continue
+    row['iterations'] = max(row['iterations'], event.get('iterations') or 0)
+    if not event.get('converged', True):
+      row['unconverged'] += 1
+  rows = sorted(by_order.items(), key=lambda item: -item[1]['seconds'])[:top_n]
+  print('%-14s %6s %10s %9s %9s %8s %7s' % ('order', 'fits', 'total s', 'mean s', 'max s',
+                                           'max iter', 'unconv'))
+  for order, row in rows:
+    print('%-14s %6d %10.3f %9.4f %9.4f %8d %7d' % (order, row['fits'], row['seconds'],
+          row['seconds'] / row['fits'], row['max'], row['iterations'], row['unconverged']))
+  for reason, count in sorted(failures.items(), key=lambda item: -item[1]):
+    print('failed %d: %s' % (count, reason))
+  return rows, dict(failures)
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Persistent cache of fitted ARIMA models.
+
+Fits are keyed on a hash of the input array together with the order, trend
+and solver settings. The fitted parameters and the state needed to forecast
+are stored as one .npz file per key in a content-addressed directory, so the
+same fit is never repeated across cells or across runs. Entries are evicted
+by age and, oldest access first, once the directory grows past max_bytes:
+store() keeps a running byte count and evicts when it passes the limit, and
+also on the first store and every EVICT_EVERY stores to drop expired ones.
+
+A cache pickled into pool tasks stores without evicting, so workers never
+scan and prune the directory at once; the process that started the pool
+calls evict() when it is done. Entries another process removes in the
+meantime are skipped, or refitted if they were about to be loaded.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+import numpy
+from .arima import ARIMA
+from . import instrumentation
+
+# stores between two age checks of the cache directory
+EVICT_EVERY = 256
+
+# the parts of a fitted ARIMA that forecasting and diagnostics use
+class CachedFit(object):
+
+  __slots__ = ('params', 'arparams', 'maparams', 'sigma2', 'resid', 'aic', 'bic',
+               'converged', 'forecasts', 'stderr', 'conf_int')
+
+  def __init__(self, **fields):
+    for name in self.__slots__:
+      setattr(self, name, fields[name])
+
+  # same return shape as ARIMAResults.forecast() for the cached horizon
+  def forecast(self, steps=None):
+    if steps is not None and steps != len(self.forecasts):
+      raise ValueError('cached forecast covers %d steps, not %d' % (len(self.forecasts), steps))
+    return self.forecasts, self.stderr, self.conf_int
+
+  @classmethod
+  def from_results(cls, model_fit, steps=1):
+    forecasts, stderr, conf_int = model_fit.forecast(steps=steps)
+    retvals = getattr(model_fit, 'mle_retvals', None) or {}
+    return cls(params=numpy.asarray(model_fit.params),
+               arparams=numpy.asarray(model_fit.arparams),
+               maparams=numpy.asarray(model_fit.maparams),
+               sigma2=float(model_fit.sigma2),
+               resid=numpy.asarray(model_fit.resid),
+               aic=float(model_fit.aic),
+               bic=float(model_fit.bic),
+               converged=bool(retvals.get('converged', True)),
+               forecasts=numpy.asarray(forecasts),
+               stderr=numpy.asarray(stderr),
+               conf_int=numpy.asarray(conf_int))
+
+class FitCache(object):
+
+  def __init__(self, path='.arima_cache', max_bytes=256 * 1024 * 1024, max_age=30 * 24 * 3600):
+    self.path = path
+    self.max_bytes = max_bytes
+    self.max_age = max_age
+    self.hits = 0
+    self.misses = 0
+    # bytes in the directory as of the last scan plus what was stored since
+    self._bytes = None
+    self._stores = 0
+    self.evicts = True
+
+  # the copy a pool task receives leaves eviction to the parent
+  def __getstate__(self):
+    state = dict(self.__dict__)
+    state['evicts'] = False
+    return state
+
+  # content address of one fit: the data bytes plus every setting of the fit
+  def key(self, data, order, trend='nc', steps=1, **fit_kwargs):
+    data = numpy.ascontiguousarray(data)
+    digest = hashlib.sha256()
+    digest.update(str(data.dtype).encode())
+    digest.update(str(data.shape).encode())
+    digest.update(data.tobytes())
+    settings = dict(fit_kwargs, order=list(order), trend=trend, steps=steps)
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+  def _file(self, key):
+    return os.path.join(self.path, key[:2], key + '.npz')
+
+  def load(self, key):
+    filename = self._file(key)
+    try:
+      with numpy.load(filename) as stored:
+        fields = dict((name, stored[name]) for name in CachedFit.__slots__)
+    except (IOError, OSError, KeyError, ValueError):
+      return None
+    for name in ('sigma2', 'aic', 'bic'):
+      fields[name] = float(fields[name])
+    fields['converged'] = bool(fields['converged'])
+    # refresh the access time so eviction drops the least recently used
+    try:
+      os.utime(filename, None)
+    except OSError:
+      pass
+    return CachedFit(**fields)
+
+  def store(self, key, fit):
+    filename = self._file(key)
+    directory = os.path.dirname(filename)
+    if not os.path.isdir(directory):
+      os.makedirs(directory, exist_ok=True)
+    handle, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(handle, 'wb') as f:
+      numpy.savez(f, **dict((name, getattr(fit, name)) for name in CachedFit.__slots__))
+    # concurrent writers of the same key produce the same bytes
+    os.replace(tmp, filename)
+    if not self.evicts:
+      return
+    self._stores += 1
+    if self._bytes is not None:
+      try:
+        self._bytes += os.path.getsize(filename)
+      except OSError:
+        pass
+    if self._bytes is None or self._bytes > self.max_bytes or self._stores % EVICT_EVERY == 0:
+      self.evict()
+
+  # fit an ARIMA on data, or reuse a stored fit with the same inputs
+  def fit(self, data, order, trend='nc', steps=1, stage=None, **fit_kwargs):
+    key = self.key(data, order, trend, steps, **fit_kwargs)
+    fit = self.load(key)
+    if fit is not None:
+      self.hits += 1
+      return fit
+    self.misses += 1
+    fit_kwargs.setdefault('disp', 0)
+    model = ARIMA(numpy.asarray(data), order=order)
+    model_fit = instrumentation.timed_fit(model, order, stage, trend=trend, **fit_kwargs)
+    fit = CachedFit.from_results(model_fit, steps)
+    self.store(key, fit)
+    return fit
+
+  def _entries(self):
+    entries = list()
+    if not os.path.isdir(self.path):
+      return entries
+    for root, dirs, files in os.walk(self.path):
+      for name in files:
+        if name.endswith('.npz'):
+          filename = os.path.join(root, name)
+          # removed by another process since the listing
+          try:
+            info = os.stat(filename)
+          except OSError:
+            continue
+          entries.append((info.st_mtime, info.st_size, filename))
+    return entries
+
+  # drop entries older than max_age, then the oldest until under max_bytes
+  def evict(self):
+    now = time.time()
+    entries = sorted(self._entries())
+    total = sum(size for mtime, size, filename in entries)
+    removed = 0
+    for mtime, size, filename in entries:
+      if now - mtime <= self.max_age and total <= self.max_bytes:
+        break
+      try:
+        os.remove(filename)
+      except OSError:
+        continue
+      total -= size
+      removed += 1
+    self._bytes = total
+    return removed
+
+  def clear(self):
+    for mtime, size, filename in self._entries():
+      try:
+        os.remove(filename)
+      except OSError:
+        pass
+    self.hits = self.misses = 0
+    self._bytes = 0
+
+  def stats(self):
+    entries = self._entries()
+    calls = self.hits + self.misses
+    return {'hits': self.hits, 'misses': self.misses,
+            'hit_rate': self.hits / calls if calls else 0.0,
+            'entries': len(entries), 'bytes': sum(size for mtime, size, filename in entries)}
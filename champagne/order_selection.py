@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Fast ARIMA order selection.
+
+Instead of a full walk-forward RMSE for every (p,d,q) in the grid, the grid
+is pruned cheaply first and only the top few candidates are scored with the
+walk-forward evaluation:
+
+  * stepwise: for each d, start from the orders suggested by the ACF/PACF of
+    the seasonally differenced training data and move p and q by one while
+    the AIC (or BIC) of a single fit improves.
+  * halving: successive halving over the whole grid, scoring every order on
+    a short suffix of the test window first and keeping the best 1/eta for a
+    suffix twice as long.
+
+The report says how many fits were run against the exhaustive grid and how
+long that took, and lists the orders that failed with the reason.
+"""
+import time
+import warnings
+from math import sqrt
+import numpy
+from .arima import ARIMA
+from .differencing import difference
+from .diagnostics import acf, durbin_levinson, significant_lags
+from .grid_search import failure_reason, forecast_step, prepare_data
+
+class OrderSearch(object):
+
+  def __init__(self, dataset, p_values, d_values, q_values, interval=12, cache=None):
+    self.X, self.train_size = prepare_data(dataset)
+    self.p_values, self.d_values, self.q_values = list(p_values), list(d_values), list(q_values)
+    self.interval = interval
+    self.cache = cache
+    self.n_test = len(self.X) - self.train_size
+    self.fits = 0
+    self.failures = dict()
+    self.criteria = dict()
+    self.forecasts = dict()
+
+  def grid(self):
+    return [(p,d,q) for p in self.p_values for d in self.d_values for q in self.q_values]
+
+  # information criterion of one fit on the training part, None if it fails
+  def criterion(self, order, criterion='aic'):
+    if order in self.criteria:
+      return self.criteria[order][criterion]
+    if order in self.failures:
+      return None
+    diff = difference(self.X[:self.train_size], self.interval)
+    self.fits += 1
+    try:
+      if self.cache is not None:
+        model_fit = self.cache.fit(diff, order, trend='nc')
+      else:
+        model_fit = ARIMA(diff, order=order).fit(trend='nc', disp=0)
+      value = {'aic': model_fit.aic, 'bic': model_fit.bic}
+      if not numpy.isfinite(value[criterion]):
+        raise ValueError('%s is not finite' % criterion)
+    except Exception as e:
+      self.failures[order] = failure_reason(e)
+      return None
+    self.criteria[order] = value
+    return value[criterion]
+
+  # walk-forward forecast for observation n, each (order, n) is fitted once
+  def forecast(self, order, n):
+    key = (order, n)
+    if key not in self.forecasts:
+      self.fits += 1
+      self.forecasts[key] = forecast_step(self.X, n, order, self.interval, self.cache)
+    return self.forecasts[key]
+
+  # walk-forward RMSE over the last steps of the test window
+  def score(self, order, steps=None):
+    if order in self.failures:
+      return None
+    steps = self.n_test if steps is None else min(steps, self.n_test)
+    start = len(self.X) - steps
+    try:
+      predictions = [self.forecast(order, n) for n in range(start, len(self.X))]
+      errors = self.X[start:] - numpy.ravel(predictions)
+      rmse = sqrt(numpy.mean(errors ** 2))
+      if not numpy.isfinite(rmse):
+        raise ValueError('RMSE is not finite')
+    except Exception as e:
+      self.failures[order] = failure_reason(e)
+      return None
+    return rmse
+
+  # orders suggested by the ACF/PACF of the seasonally differenced training data
+  def seeds(self, d):
+    diff = difference(self.X[:self.train_size], self.interval)
+    w = numpy.diff(diff, n=d)
+    nlags = max(max(self.p_values), max(self.q_values))
+    nlags = max(1, min(nlags, len(w) // 2 - 1))
+    r = acf(w, nlags)
+    p0 = int(significant_lags(durbin_levinson(r), len(w), max(self.p_values))[0])
+    q0 = int(significant_lags(r, len(w), max(self.q_values))[0])
+    seeds = [(p0, d, q0), (0, d, 0), (1, d, 0), (0, d, 1), (2, d, 2)]
+    return [s for s in seeds if s[0] in self.p_values and s[2] in self.q_values]
+
+  # stepwise search over p and q for one d, returns orders ranked by criterion
+  def stepwise(self, d, criterion='aic'):
+    best, best_value = None, float("inf")
+    for order in self.seeds(d):
+      value = self.criterion(order, criterion)
+      if value is not None and value < best_value:
+        best, best_value = order, value
+    improved = best is not None
+    while improved:
+      improved = False
+      p, d, q = best
+      for dp, dq in ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (-1, 1), (1, -1)):
+        order = (p + dp, d, q + dq)
+        if order[0] not in self.p_values or order[2] not in self.q_values:
+          continue
+        value = self.criterion(order, criterion)
+        if value is not None and value < best_value:
+          best, best_value, improved = order, value, True
+    visited = [(self.criteria[o][criterion], o) for o in self.criteria if o[1] == d]
+    return [o for v, o in sorted(visited)]
+
+  # successive halving on growing suffixes of the test window
+  def halving(self, top_k=3, min_steps=3, eta=2):
+    candidates = self.grid()
+    steps = min_steps
+    while len(candidates) > top_k and steps < self.n_test:
+      scored = [(self.score(order, steps), order) for order in candidates]
+      scored = sorted((s, o) for s, o in scored if s is not None)
+      candidates = [o for s, o in scored[:max(top_k, len(scored) // eta)]]
+      steps *= eta
+    return candidates
+
+# pick an ARIMA order with a cheap pruning pass and walk-forward scoring of the top few
+def select_order(dataset, p_values, d_values, q_values, method='stepwise', criterion='aic',
+                 top_k=3, min_steps=3, eta=2, cache=None):
+  start = time.time()
+  search = OrderSearch(dataset, p_values, d_values, q_values, cache=cache)
+  with warnings.catch_warnings():
+    warnings.filterwarnings("ignore")
+    if method == 'stepwise':
+      candidates = list()
+      for d in search.d_values:
+        candidates.extend(search.stepwise(d, criterion)[:top_k])
+    elif method == 'halving':
+      candidates = search.halving(top_k, min_steps, eta)
+    else:
+      raise ValueError('unknown method %r' % method)
+    best_score, best_cfg = float("inf"), None
+    scores = dict()
+    for order in candidates:
+      rmse = search.score(order)
+      if rmse is None:
+        continue
+      scores[order] = rmse
+      print('ARIMA%s RMSE=%.3f' % (order, rmse))
+      if rmse < best_score:
+        best_score, best_cfg = rmse, order
+  elapsed = time.time() - start
+  exhaustive = len(search.grid()) * search.n_test
+  for order, reason in sorted(search.failures.items()):
+    print('ARIMA%s failed: %s' % (order, reason))
+  print('Best ARIMA%s RMSE=%.3f' % (best_cfg, best_score))
+  print('%d fits instead of %d (%d skipped) in %.1fs, exhaustive grid estimated at %.1fs'
+        % (search.fits, exhaustive, exhaustive - search.fits, elapsed,
+           elapsed / max(search.fits, 1) * exhaustive))
+  return {'best_cfg': best_cfg, 'best_score': best_score, 'scores': scores,
+          'candidates': candidates, 'failures': dict(search.failures),
+          'fits': search.fits, 'exhaustive_fits': exhaustive,
+          'skipped_fits': exhaustive - search.fits, 'seconds': elapsed,
+          'estimated_exhaustive_seconds': elapsed / max(search.fits, 1) * exhaustive}
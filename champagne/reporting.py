@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Headless plots of the data-analysis section, rendered to files.
+
+matplotlib is imported only when the first figure is drawn, and figures are
+built with the object-oriented API on the Agg canvas: no pyplot state, no
+GUI backend and no show(), so reports render the same on a server as in a
+notebook. statsmodels.graphics is not used at all; the ACF and PACF come
+from diagnostics and the density from a NumPy Gaussian KDE.
+
+A SeriesReport splits its series into calendar years once and the yearly
+line plots (one row per year, however many years), the box plots and the
+density plot all share that grouping. render_reports() renders the reports
+of many series on a process pool.
+"""
+import os
+from math import sqrt
+import numpy
+from parallel import pool_map, worker_count
+
+KINDS = ('line', 'yearly', 'density', 'boxplot', 'acf')
+
+# a new figure on the Agg canvas, importing matplotlib on first use
+def new_figure(width=8, height=6):
+  from matplotlib.figure import Figure
+  from matplotlib.backends.backend_agg import FigureCanvasAgg
+  fig = Figure(figsize=(width, height))
+  FigureCanvasAgg(fig)
+  return fig
+
+# values split by calendar year, in year order
+def year_groups(values, dates, start=None, end=None):
+  years = dates.astype('datetime64[Y]').astype(int) + 1970
+  keep = numpy.ones(len(years), dtype=bool)
+  if start is not None:
+    keep &= years >= int(start)
+  if end is not None:
+    keep &= years <= int(end)
+  values, years = values[keep], years[keep]
+  bounds = numpy.flatnonzero(numpy.diff(years)) + 1
+  return [(int(chunk[0]), part) for chunk, part in zip(numpy.split(years, bounds), numpy.split(values, bounds))
+          if len(chunk)]
+
+# Gaussian kernel density on a grid, Scott's rule bandwidth
+def gaussian_kde(values, points=200):
+  values = numpy.asarray(values, dtype='float64')
+  bandwidth = values.std(ddof=1) * len(values) ** (-1.0 / 5)
+  grid = numpy.linspace(values.min() - 3 * bandwidth, values.max() + 3 * bandwidth, points)
+  z = (grid[:, None] - values[None, :]) / bandwidth
+  density = numpy.exp(-0.5 * z ** 2).sum(axis=1) / (len(values) * bandwidth * sqrt(2 * numpy.pi))
+  return grid, density
+
+class SeriesReport(object):
+
+  def __init__(self, values, dates, name='series', start=None, end=None):
+    self.values = numpy.asarray(values, dtype='float64')
+    self.dates = numpy.asarray(dates).astype('datetime64[M]')
+    self.name = name
+    self.start = start
+    self.end = end
+    self._groups = None
+
+  @classmethod
+  def from_series(cls, series, name='series', start=None, end=None):
+    return cls(series.values, series.index.values, name, start, end)
+
+  # the per-year split, computed on first use and shared by every plot
+  @property
+  def groups(self):
+    if self._groups is None:
+      self._groups = year_groups(self.values, self.dates, self.start, self.end)
+    return self._groups
+
+  def line(self):
+    fig = new_figure()
+    fig.add_subplot(111).plot(self.dates.astype('datetime64[D]'), self.values)
+    return fig
+
+  # one row per year, so any number of years fits
+  def yearly(self):
+    groups = self.groups
+    fig = new_figure(8, max(2, 1.2 * len(groups)))
+    axes = fig.subplots(len(groups), 1, squeeze=False, sharex=True)[:, 0]
+    for ax, (year, values) in zip(axes, groups):
+      ax.plot(values)
+      ax.set_ylabel(str(year))
+    return fig
+
+  def density(self):
+    fig = new_figure()
+    top, bottom = fig.subplots(2, 1)
+    top.hist(self.values)
+    bottom.plot(*gaussian_kde(self.values))
+    return fig
+
+  def boxplot(self):
+    fig = new_figure()
+    ax = fig.add_subplot(111)
+    ax.boxplot([values for year, values in self.groups])
+    ax.set_xticklabels([str(year) for year, values in self.groups])
+    return fig
+
+  # ACF and PACF of the seasonally differenced series with the 95% band
+  def acf(self, nlags=25, interval=12):
+    from .diagnostics import acf, durbin_levinson
+    from .differencing import difference
+    w = difference(self.values, interval) if interval else self.values
+    r = acf(w, nlags)
+    fig = new_figure()
+    bound = 1.96 / sqrt(len(w))
+    panels = (('Autocorrelation', r[0]), ('Partial Autocorrelation', durbin_levinson(r)[0]))
+    for ax, (title, values) in zip(fig.subplots(2, 1), panels):
+      ax.set_title(title)
+      ax.vlines(numpy.arange(len(values)), 0, values)
+      ax.plot(numpy.arange(len(values)), values, 'o')
+      ax.axhspan(-bound, bound, alpha=0.2)
+    return fig
+
+  # write the requested kinds as <directory>/<name>_<kind>.<format>, returns the paths
+  def render(self, directory='reports', kinds=KINDS, format='png', dpi=100):
+    os.makedirs(directory, exist_ok=True)
+    paths = list()
+    for kind in kinds:
+      if kind not in KINDS:
+        raise ValueError('unknown plot %r, expected one of %s' % (kind, ', '.join(KINDS)))
+      path = os.path.join(directory, '%s_%s.%s' % (self.name, kind, format))
+      getattr(self, kind)().savefig(path, dpi=dpi)
+      paths.append(path)
+    return paths
+
+# task run in a worker: render one report
+def _render_task(args):
+  report, directory, kinds, format = args
+  return report.render(directory, kinds, format)
+
+# render many reports, on a process pool unless workers == 1
+def render_reports(reports, directory='reports', kinds=KINDS, format='png', workers=None):
+  tasks = [(report, directory, kinds, format) for report in reports]
+  workers = min(worker_count(workers), max(len(tasks), 1))
+  return [path for result in pool_map(_render_task, tasks, workers, ordered=False) for path in result]
@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""Append-only store of walk-forward forecasts and their residuals.
+
+The residual review, bias correction, residual ACF and validation cells
+each reran the whole walk-forward loop to rebuild the same predictions.
+A ResultsStore records every forecast once, with its series, ARIMA order,
+origin (the number of observations the model saw), horizon, prediction,
+actual and residual (actual - prediction), and later cells read them back:
+
+  * columns are raw fixed-width files, one per field, appended in place and
+    memory-mapped for reading; _meta.json holds the committed row count, so
+    rows written by an interrupted flush are never read and are overwritten
+    by the next one;
+  * two sorted indexes, on (series, origin, horizon) and on origin, are
+    merged with each flush in linear time and answer query() with a binary
+    search per range instead of a scan;
+  * count, mean, variance (Welford), min, max and mean absolute residual per
+    series, order and horizon are updated with each flush and kept in the
+    meta file, so summary() reads no rows at all. They count the latest
+    forecast of each origin only: a group where a flush replaces an earlier
+    forecast is recomputed from its rows.
+
+Each row may carry a fingerprint of what produced it. record_walk_forward()
+stores a hash of the observations up to and including the forecast target
+and of the differencing interval, and reuses a stored forecast only while
+that hash matches; after the data or the interval change it refits and
+appends fresh rows. Earlier rows stay in the store for query(), but they
+no longer match, are not returned and drop out of summary().
+
+There is one writer at a time. append() buffers rows in memory until
+flush(), which queries and leaving a with block also do.
+"""
+import hashlib
+import json
+import os
+import numpy
+from .grid_search import forecast_step
+
+STORE_DIR = '.forecast_results'
+META = '_meta.json'
+COLUMNS = (('series', 'int32'), ('p', 'int8'), ('d', 'int8'), ('q', 'int8'),
+           ('origin', 'int32'), ('horizon', 'int16'), ('prediction', 'float64'),
+           ('actual', 'float64'), ('residual', 'float64'), ('fingerprint', 'int64'))
+RECORD = numpy.dtype(list(COLUMNS))
+# the series index packs series << 40 | origin << 16 | horizon into one int64
+ORIGIN_LIMIT = 1 << 24
+# per group: count, mean, m2, min, max, mean absolute residual
+EMPTY_STATS = (0, 0.0, 0.0, float('inf'), float('-inf'), 0.0)
+
+def _series_keys(series, origin, horizon):
+  return ((series.astype('int64') << 40) | (origin.astype('int64') << 16) |
+          horizon.astype('int64'))
+
+# combine two sets of statistics (Chan et al.'s parallel variance update)
+def _merge_stats(a, b):
+  n = a[0] + b[0]
+  if not b[0]:
+    return a
+  if not a[0]:
+    return b
+  delta = b[1] - a[1]
+  mean = a[1] + delta * b[0] / n
+  m2 = a[2] + b[2] + delta * delta * a[0] * b[0] / n
+  mae = a[5] + (b[5] - a[5]) * b[0] / n
+  return (n, mean, m2, min(a[3], b[3]), max(a[4], b[4]), mae)
+
+# the statistics of one array of residuals, NaNs (unknown actuals) left out
+def _stats(residuals):
+  residuals = residuals[~numpy.isnan(residuals)]
+  if not len(residuals):
+    return EMPTY_STATS
+  mean = float(residuals.mean())
+  return (len(residuals), mean, float(((residuals - mean) ** 2).sum()), float(residuals.min()),
+          float(residuals.max()), float(numpy.abs(residuals).mean()))
+
+# count, mean, std, min, max, rmse and mae from a set of statistics
+def _describe(stats):
+  n, mean, m2, low, high, mae = stats
+  return {'count': n, 'mean': mean if n else float('nan'),
+          'std': (m2 / (n - 1)) ** 0.5 if n > 1 else float('nan'),
+          'min': low if n else float('nan'), 'max': high if n else float('nan'),
+          'rmse': (m2 / n + mean * mean) ** 0.5 if n else float('nan'),
+          'mae': mae if n else float('nan')}
+
+# the (series, order, horizon) groups where new rows share a series index key
+# with committed rows or with each other, i.e. may replace earlier forecasts
+def _replaced(keys, new, new_keys):
+  hit = numpy.zeros(len(new), dtype=bool)
+  if len(keys):
+    hit = (numpy.searchsorted(keys, new_keys, side='left') <
+           numpy.searchsorted(keys, new_keys, side='right'))
+  unique, inverse, counts = numpy.unique(new_keys, return_inverse=True, return_counts=True)
+  hit |= counts[inverse.reshape(-1)] > 1
+  return set((s, (p, d, q), h) for s, p, d, q, h in
+             zip(*[new[name][hit].tolist() for name in ('series', 'p', 'd', 'q', 'horizon')]))
+
+# the statistics of one (series, order, horizon) group over the latest row of
+# each origin, from the merged series index and the columns it numbers
+def _current_stats(index, data, group):
+  s, (p, d, q), h = group
+  keys, rows = index
+  first, last = numpy.searchsorted(keys, numpy.array([s << 40, (s + 1) << 40], dtype='int64'))
+  rows = numpy.sort(rows[first:last])
+  rows = rows[(data['p'][rows] == p) & (data['d'][rows] == d) & (data['q'][rows] == q) &
+              (data['horizon'][rows] == h)]
+  # rows are in insertion order: a stable sort by origin puts the latest of each origin last
+  rows = rows[numpy.argsort(data['origin'][rows], kind='stable')]
+  origins = data['origin'][rows]
+  latest = numpy.ones(len(rows), dtype=bool)
+  latest[:-1] = origins[1:] != origins[:-1]
+  return _stats(numpy.asarray(data['residual'][rows[latest]]))
+
+class ResultsStore(object):
+
+  __slots__ = ('path', 'rows', 'series', 'stats', '_codes', '_pending', '_maps', '_indexes')
+
+  def __init__(self, path=STORE_DIR):
+    self.path = path
+    os.makedirs(path, exist_ok=True)
+    try:
+      with open(os.path.join(path, META)) as f:
+        meta = json.load(f)
+    except IOError:
+      meta = {'rows': 0, 'series': [], 'stats': [], 'columns': [list(c) for c in COLUMNS]}
+    if meta['rows'] and meta.get('columns') != [list(c) for c in COLUMNS]:
+      raise ValueError('results store %s has other columns than %s, remove it to start over' % (
+        path, ', '.join(name for name, dtype in COLUMNS)))
+    self.rows = meta['rows']
+    self.series = list(meta['series'])
+    self._codes = dict((name, code) for code, name in enumerate(self.series))
+    self.stats = dict(((self._codes[s], (p, d, q), h), tuple(values))
+                      for s, p, d, q, h, values in meta['stats'])
+    self._pending = list()
+    self._maps = None
+    self._indexes = dict()
+
+  def __len__(self):
+    return self.rows + sum(len(chunk) for chunk in self._pending)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.flush()
+
+  def _code(self, series):
+    code = self._codes.get(series)
+    if code is None:
+      code = self._codes[series] = len(self.series)
+      self.series.append(series)
+    return code
+
+  # buffer one forecast; actual may be NaN while it is not known yet
+  def append(self, series, order, origin, horizon, prediction, actual=float('nan'), fingerprint=0):
+    self.extend(series, order, [origin], [horizon], [prediction], [actual], [fingerprint])
+
+  # buffer the forecasts of one series and order, given as arrays
+  def extend(self, series, order, origins, horizons, predictions, actuals=None, fingerprints=None):
+    p, d, q = order
+    chunk = numpy.empty(len(origins), dtype=RECORD)
+    chunk['series'] = self._code(series)
+    chunk['p'], chunk['d'], chunk['q'] = p, d, q
+    chunk['origin'] = origins
+    chunk['horizon'] = horizons
+    chunk['prediction'] = predictions
+    chunk['actual'] = float('nan') if actuals is None else actuals
+    chunk['residual'] = chunk['actual'] - chunk['prediction']
+    chunk['fingerprint'] = 0 if fingerprints is None else fingerprints
+    if len(chunk) and (chunk['origin'].min() < 0 or chunk['origin'].max() >= ORIGIN_LIMIT or
+                       chunk['horizon'].min() < 1):
+      raise ValueError('origins must be in [0, %d) and horizons at least 1' % ORIGIN_LIMIT)
+    self._pending.append(chunk)
+
+  def _column_file(self, name):
+    return os.path.join(self.path, name + '.bin')
+
+  def _index_file(self, name, part):
+    return os.path.join(self.path, '%s.%s.npy' % (name, part))
+
+  # write the buffered rows, merge them into the indexes, then commit
+  def flush(self):
+    if not self._pending:
+      return
+    new = numpy.concatenate(self._pending)
+    start = self.rows
+    keys = dict((name, self._index(name)) for name in ('series', 'origin'))
+    # drop the memory maps before the files they map are rewritten
+    self._maps = None
+    self._indexes = dict()
+    for name, dtype in COLUMNS:
+      filename = self._column_file(name)
+      with open(filename, 'r+b' if os.path.exists(filename) else 'wb') as f:
+        # overwrite whatever an interrupted flush left past the committed rows
+        f.seek(start * RECORD[name].itemsize)
+        f.write(numpy.ascontiguousarray(new[name]).tobytes())
+        f.truncate()
+    new_keys = _series_keys(new['series'], new['origin'], new['horizon'])
+    replaced = _replaced(keys['series'][0], new, new_keys)
+    index = self._merge_index('series', keys['series'], new_keys, start)
+    self._merge_index('origin', keys['origin'], new['origin'].astype('int32'), start)
+    stats = dict(self.stats)
+    groups = numpy.stack([new['series'], new['p'], new['d'], new['q'], new['horizon']], axis=1)
+    groups, inverse = numpy.unique(groups, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    data = self._mapped(start + len(new)) if replaced else None
+    for i, (s, p, d, q, h) in enumerate(groups.tolist()):
+      key = (s, (p, d, q), h)
+      if key in replaced:
+        stats[key] = _current_stats(index, data, key)
+      else:
+        stats[key] = _merge_stats(stats.get(key, EMPTY_STATS), _stats(new['residual'][inverse == i]))
+    data = None
+    self._write_meta(start + len(new), stats)
+    self.rows = start + len(new)
+    self.stats = stats
+    self._pending = list()
+
+  def _write_meta(self, rows, stats):
+    meta = {'rows': rows, 'series': self.series, 'columns': [list(c) for c in COLUMNS],
+            'stats': [[self.series[s], p, d, q, h, list(values)]
+                      for (s, (p, d, q), h), values in sorted(stats.items())]}
+    tmp = os.path.join(self.path, META + '.tmp')
+    with open(tmp, 'w') as f:
+      json.dump(meta, f)
+    os.replace(tmp, os.path.join(self.path, META))
+
+  # insert new keys after equal old ones, rows numbered from start; returns the merged index
+  def _merge_index(self, name, index, new_keys, start):
+    keys, rows = index
+    order = numpy.argsort(new_keys, kind='stable')
+    positions = numpy.searchsorted(keys, new_keys[order], side='right')
+    keys = numpy.insert(keys, positions, new_keys[order])
+    rows = numpy.insert(rows, positions, start + order.astype('int64'))
+    for part, values in (('keys', keys), ('rows', rows)):
+      tmp = self._index_file(name, part) + '.tmp'
+      with open(tmp, 'wb') as f:
+        numpy.save(f, values)
+      os.replace(tmp, self._index_file(name, part))
+    return keys, rows
+
+  # the first rows of every column, memory-mapped
+  def _mapped(self, rows):
+    maps = dict()
+    for name, dtype in COLUMNS:
+      if rows:
+        maps[name] = numpy.memmap(self._column_file(name), dtype=dtype, mode='r', shape=(rows,))
+      else:
+        maps[name] = numpy.empty(0, dtype=dtype)
+    return maps
+
+  # the committed columns, memory-mapped
+  def columns(self):
+    if self._maps is None:
+      self._maps = self._mapped(self.rows)
+    return self._maps
+
+  # sorted keys and row numbers of an index, rebuilt if it does not cover the committed rows
+  def _index(self, name):
+    if name in self._indexes:
+      return self._indexes[name]
+    try:
+      keys = numpy.load(self._index_file(name, 'keys'), mmap_mode='r')
+      rows = numpy.load(self._index_file(name, 'rows'), mmap_mode='r')
+    except (IOError, ValueError):
+      keys = rows = None
+    if keys is None or len(keys) != self.rows or len(rows) != self.rows:
+      data = self.columns()
+      if name == 'series':
+        keys = _series_keys(data['series'], data['origin'], data['horizon'])
+      else:
+        keys = numpy.array(data['origin'], dtype='int32')
+      rows = numpy.argsort(keys, kind='stable').astype('int64')
+      keys = keys[rows]
+    self._indexes[name] = (keys, rows)
+    return keys, rows
+
+  # row numbers of a series (or of every series) over an origin range
+  def _select(self, series, origin):
+    if isinstance(origin, (tuple, list)):
+      low, high = origin
+      low = 0 if low is None else max(int(low), 0)
+      high = ORIGIN_LIMIT if high is None else min(int(high), ORIGIN_LIMIT)
+    elif origin is not None:
+      low, high = int(origin), int(origin) + 1
+    if series is not None:
+      code = self._codes.get(series)
+      if code is None:
+        return numpy.empty(0, dtype='int64')
+      if origin is None:
+        low, high = 0, ORIGIN_LIMIT
+      keys, rows = self._index('series')
+      # high may be ORIGIN_LIMIT, which carries into the series bits: add, don't or
+      bounds = numpy.array([(code << 40) + (low << 16), (code << 40) + (high << 16)], dtype='int64')
+    elif origin is not None:
+      keys, rows = self._index('origin')
+      bounds = numpy.array([low, high], dtype='int64')
+    else:
+      return numpy.arange(self.rows, dtype='int64')
+    first, last = numpy.searchsorted(keys, bounds)
+    return numpy.asarray(rows[first:last])
+
+  # the stored forecasts matching every given condition, as a dict of arrays;
+  # origin is one origin or a half-open (start, stop) range, either end None.
+  # Rows come ordered by origin then horizon, or in insertion order if neither
+  # series nor origin is given.
+  def query(self, series=None, origin=None, order=None, horizon=None, columns=None):
+    self.flush()
+    rows = self._select(series, origin)
+    data = self.columns()
+    if order is not None or horizon is not None:
+      keep = numpy.ones(len(rows), dtype=bool)
+      if order is not None:
+        for name, value in zip(('p', 'd', 'q'), order):
+          keep &= data[name][rows] == value
+      if horizon is not None:
+        keep &= data['horizon'][rows] == horizon
+      rows = rows[keep]
+    result = dict()
+    for name in (columns or [name for name, dtype in COLUMNS]):
+      result[name] = numpy.asarray(data[name][rows])
+    if 'series' in result:
+      result['series'] = numpy.array(self.series, dtype=object)[result['series']] if len(rows) else \
+        numpy.empty(0, dtype=object)
+    return result
+
+  # residual statistics over the latest forecast of each origin matching the
+  # conditions, from the running totals: count, mean, std, min, max, rmse, mae
+  def summary(self, series=None, order=None, horizon=None):
+    self.flush()
+    code = self._codes.get(series)
+    total = EMPTY_STATS
+    for (s, o, h), stats in self.stats.items():
+      if ((series is None or s == code) and (order is None or o == tuple(order)) and
+          (horizon is None or h == horizon)):
+        total = _merge_stats(total, stats)
+    return _describe(total)
+
+  # the query as a pandas DataFrame
+  def to_frame(self, **conditions):
+    from pandas import DataFrame
+    return DataFrame(self.query(**conditions))
+
+# a 64-bit fingerprint of every prefix X[:n + 1] for n from start on,
+# together with the differencing interval, hashed incrementally
+def prefix_fingerprints(X, start, interval=12):
+  digest = hashlib.sha256()
+  digest.update(str(X.dtype).encode())
+  digest.update(numpy.ascontiguousarray(X[:start]).tobytes())
+  fingerprints = numpy.empty(max(len(X) - start, 0), dtype='int64')
+  for i, n in enumerate(range(start, len(X))):
+    digest.update(X[n:n + 1].tobytes())
+    prefix = digest.copy()
+    prefix.update(b'interval=%d' % interval)
+    fingerprints[i] = int.from_bytes(prefix.digest()[:8], 'little', signed=True)
+  return fingerprints
+
+# the stored rows of origins start.. whose fingerprint matches, the last one
+# of each origin, ordered by origin
+def _matching(store, series, order, start, fingerprints):
+  rows = store.query(series=series, origin=(start, start + len(fingerprints)), order=order,
+                     horizon=1)
+  match = rows['fingerprint'] == fingerprints[rows['origin'] - start]
+  rows = dict((name, values[match]) for name, values in rows.items())
+  # rows of one origin are in insertion order: keep the last
+  last = numpy.ones(len(rows['origin']), dtype=bool)
+  last[:-1] = rows['origin'][1:] != rows['origin'][:-1]
+  return dict((name, values[last]) for name, values in rows.items())
+
+# one-step walk-forward forecasts of X from observation start on, fitting
+# only the origins without a stored forecast made from the same data and
+# interval; returns one stored row per origin
+def record_walk_forward(store, X, order, series='champagne', start=None, interval=12,
+                        cache=None, stage='evaluate'):
+  X = numpy.asarray(X).astype('float32')
+  if start is None:
+    start = int(len(X) * 0.50)
+  fingerprints = prefix_fingerprints(X, start, interval)
+  done = set(_matching(store, series, order, start, fingerprints)['origin'].tolist())
+  for n in range(start, len(X)):
+    if n not in done:
+      yhat = numpy.ravel(forecast_step(X, n, order, interval, cache, stage))[0]
+      store.append(series, order, n, 1, float(yhat), float(X[n]), fingerprints[n - start])
+  return _matching(store, series, order, start, fingerprints)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Streaming difference -> fit -> forecast -> residual pipeline.
+
+For series too long to hold in memory the input is read in chunks from a
+CSV or a memory-mapped .npy file. Only the last `window` observations and
+the forecast state are kept: each observation is forecast one step ahead
+from the state, its residual recorded, and the state updated without a
+refit; the model is refitted on the window every `refit_every`
+observations. The bias may be a constant, or 'mean'/'rolling' to estimate
+it from the residuals as the stream goes on. Predictions and residuals are
+written out chunk by chunk, so peak memory does not depend on the length of
+the series.
+"""
+import sys
+from math import sqrt
+import numpy
+from .arima import ARIMA
+from .artifact import ForecastModel
+from .history import SeriesHistory
+from . import instrumentation
+
+# yield float64 chunks of a series from a .npy file, a CSV or an in-memory array
+def read_chunks(source, chunksize=100000):
+  if isinstance(source, str) and source.endswith('.npy'):
+    source = numpy.load(source, mmap_mode='r')
+  if isinstance(source, str):
+    from pandas import read_csv
+    # dataset.csv layout: date index, one value column, no header
+    for frame in read_csv(source, header=None, index_col=0, chunksize=chunksize):
+      yield frame.iloc[:, 0].values.astype('float64')
+  else:
+    for start in range(0, len(source), chunksize):
+      yield numpy.asarray(source[start:start + chunksize], dtype='float64')
+
+class StreamingForecaster(object):
+
+  def __init__(self, order=(4,0,1), interval=12, window=120, refit_every=12, trend='nc', bias=0.0):
+    if window <= interval:
+      raise ValueError('window %d must be longer than the interval %d' % (window, interval))
+    self.order = tuple(order)
+    self.interval = interval
+    self.trend = trend
+    self.bias = bias
+    self.refit_every = refit_every
+    self.window_size = window
+    self.window = SeriesHistory(interval=interval, maxlen=window, dtype='float64')
+    self.state = None
+    self.params = None
+    self.since_fit = 0
+    self.n_fits = 0
+
+  # refit on the window, warm-started from the previous parameters
+  def fit(self):
+    history = self.window.values()
+    model = ARIMA(self.window.diff(), order=self.order)
+    kwargs = {'trend': self.trend, 'disp': 0}
+    if self.params is not None:
+      kwargs['start_params'] = self.params
+    model_fit = instrumentation.timed_fit(model, self.order, 'streaming', **kwargs)
+    self.params = model_fit.params
+    # a bias estimated from the errors keeps its history across refits
+    bias = self.state.bias_state if self.state is not None else self.bias
+    self.state = ForecastModel.from_fit(model_fit, history, self.order, self.interval,
+                                        self.trend, bias)
+    self.since_fit = 0
+    self.n_fits += 1
+
+  # one observation in, (prediction, residual) out; None until the first fit
+  def step(self, obs):
+    result = None
+    if self.state is not None:
+      yhat = self.state.forecast()[0]
+      result = yhat, obs - yhat
+      self.state.append(obs)
+    self.window.append(obs)
+    self.since_fit += 1
+    if len(self.window) == self.window_size and (self.state is None or self.since_fit >= self.refit_every):
+      self.fit()
+    return result
+
+# run the pipeline over chunks, writing index,prediction,actual,residual rows
+def stream_forecast(chunks, output, order=(4,0,1), interval=12, window=120, refit_every=12,
+                    trend='nc', bias=0.0, report_every=1000000):
+  forecaster = StreamingForecaster(order, interval, window, refit_every, trend, bias)
+  n, n_scored, sse = 0, 0, 0.0
+  out = open(output, 'w') if isinstance(output, str) else output
+  try:
+    out.write('index,prediction,actual,residual\n')
+    for chunk in chunks:
+      rows = numpy.empty((len(chunk), 4))
+      k = 0
+      for obs in chunk:
+        result = forecaster.step(obs)
+        if result is not None:
+          rows[k] = n, result[0], obs, result[1]
+          sse += result[1] ** 2
+          k += 1
+        n += 1
+        if report_every and n % report_every == 0:
+          print('%d observations, %d fits' % (n, forecaster.n_fits), file=sys.stderr)
+      numpy.savetxt(out, rows[:k], fmt=['%d', '%.6f', '%.6f', '%.6f'], delimiter=',')
+      n_scored += k
+  finally:
+    if out is not output:
+      out.close()
+  rmse = sqrt(sse / n_scored) if n_scored else float('nan')
+  return {'observations': n, 'scored': n_scored, 'fits': forecaster.n_fits, 'rmse': rmse}
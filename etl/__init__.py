@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+"""Helpers for the ETL notebook (ETL_(Extract_Transform_Load).ipynb)."""
+from .exporter import crc32_combine, export
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""Parallel streaming JSON export: parquet -> JSON lines -> zip/gzip -> base64.
+
+The ETL notebook squeezed a2.parquet onto one partition, wrote JSON, zipped
+the output directory and base64-encoded the zip with a shell call, reading
+the data in full at every step. export() does all of it in one pass:
+
+  * record batches are read from the parquet file or dataset and handed to
+    a process pool, at most two per worker at a time;
+  * each worker writes its rows as JSON lines the way Spark's df.write.json
+    does (compact, null fields left out) and deflates them into a block
+    ending on a byte boundary (Z_SYNC_FLUSH), with the CRC-32 and length;
+  * the parent appends the blocks in order, combines their CRCs and closes
+    the deflate stream, framed as a one-member zip or a .gz file;
+  * every byte written to the archive is base64-encoded on the way, with
+    GNU base64's 76-column lines, into the .base64 file.
+
+Memory stays bounded by the chunks in flight whatever the dataset size, and
+the JSON encoding and compression run on every core.
+"""
+import argparse
+import base64
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from contextlib import closing
+from parallel import pool_map
+
+FORMATS = ('zip', 'gzip')
+CRC32_POLYNOMIAL = 0xedb88320
+ZIP32_LIMIT = 0xffffffff
+
+# the rows of a record batch as JSON lines, as Spark writes them
+def json_lines(batch):
+  dumps = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=str).encode
+  lines = list()
+  for row in batch.to_pylist():
+    lines.append(dumps(dict((k, v) for k, v in row.items() if v is not None)))
+  lines.append('')
+  return '\n'.join(lines).encode('utf-8')
+
+# task run in a worker: one batch as a deflate block, its CRC and lengths
+def _chunk_task(args):
+  batch, level = args
+  data = json_lines(batch)
+  compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+  block = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+  return batch.num_rows, zlib.crc32(data), len(data), block
+
+# GF(2) matrix times vector, for crc32_combine
+def _gf2_times(matrix, vector):
+  total, i = 0, 0
+  while vector:
+    if vector & 1:
+      total ^= matrix[i]
+    vector >>= 1
+    i += 1
+  return total
+
+def _gf2_square(matrix):
+  return [_gf2_times(matrix, row) for row in matrix]
+
+# CRC-32 of A + B from crc32(A), crc32(B) and len(B), as zlib's crc32_combine
+def crc32_combine(crc1, crc2, len2):
+  if len2 <= 0:
+    return crc1
+  # operator for one zero bit, then two and four
+  odd = [CRC32_POLYNOMIAL] + [1 << n for n in range(31)]
+  even = _gf2_square(odd)
+  odd = _gf2_square(even)
+  # apply len2 zero bytes to crc1, squaring the operator per bit of len2
+  while True:
+    even = _gf2_square(odd)
+    if len2 & 1:
+      crc1 = _gf2_times(even, crc1)
+    len2 >>= 1
+    if not len2:
+      break
+    odd = _gf2_square(even)
+    if len2 & 1:
+      crc1 = _gf2_times(odd, crc1)
+    len2 >>= 1
+    if not len2:
+      break
+  return crc1 ^ crc2
+
+# a file that also writes everything base64-encoded to a second file
+class _Sink(object):
+
+  __slots__ = ('file', 'encoded', 'wrap', 'pending', 'offset')
+
+  def __init__(self, file, encoded=None, wrap=76):
+    self.file = file
+    self.encoded = encoded
+    self.wrap = wrap
+    self.pending = b''
+    self.offset = 0
+
+  def write(self, data):
+    self.file.write(data)
+    self.offset += len(data)
+    if self.encoded is None:
+      return
+    data = self.pending + data
+    # encode whole lines (or whole 3-byte groups), keep the rest for later
+    unit = self.wrap // 4 * 3 if self.wrap else 3
+    cut = len(data) - len(data) % unit
+    self.pending = data[cut:]
+    self._encode(data[:cut])
+
+  def _encode(self, data):
+    if not data:
+      return
+    if not self.wrap:
+      self.encoded.write(base64.b64encode(data))
+      return
+    line = self.wrap // 4 * 3
+    self.encoded.write(b''.join(base64.b64encode(data[i:i + line]) + b'\n'
+                                for i in range(0, len(data), line)))
+
+  def close(self):
+    if self.encoded is not None:
+      self._encode(self.pending)
+      if not self.wrap:
+        self.encoded.write(b'\n')
+      self.pending = b''
+
+# MS-DOS date and time of a timestamp, for zip headers
+def _dos_time(timestamp):
+  t = time.localtime(timestamp)
+  return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+          ((max(t.tm_year, 1980) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+# framing of the deflate stream: zip with one member, or gzip
+class _Zip(object):
+
+  __slots__ = ('name', 'time', 'date')
+
+  def __init__(self, member, timestamp):
+    self.name = member.encode('utf-8')
+    self.time, self.date = _dos_time(timestamp)
+
+  def header(self):
+    # sizes and CRC follow the data in a data descriptor (flag bit 3)
+    return struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, 0x0808, 8, self.time, self.date,
+                       0, 0, 0, len(self.name), 0) + self.name
+
+  def trailer(self, crc, compressed, size, offset):
+    if compressed > ZIP32_LIMIT or size > ZIP32_LIMIT:
+      raise ValueError('member of %d bytes needs zip64, export with format=gzip' % size)
+    descriptor = struct.pack('<IIII', 0x08074b50, crc, compressed, size)
+    central = struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, 0x0314, 20, 0x0808, 8, self.time,
+                          self.date, crc, compressed, size, len(self.name), 0, 0, 0, 0,
+                          0o644 << 16, 0) + self.name
+    start = offset + len(descriptor)
+    end = struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, 1, 1, len(central), start, 0)
+    return descriptor + central + end
+
+class _Gzip(object):
+
+  __slots__ = ('timestamp',)
+
+  def __init__(self, timestamp):
+    self.timestamp = int(timestamp)
+
+  def header(self):
+    return struct.pack('<BBBBIBB', 0x1f, 0x8b, 8, 0, self.timestamp, 0, 255)
+
+  def trailer(self, crc, compressed, size, offset):
+    return struct.pack('<II', crc, size & ZIP32_LIMIT)
+
+# record batches of a parquet file or directory, a pyarrow Table, or batches as given
+def _batches(source, rows_per_chunk, columns=None):
+  if hasattr(source, 'to_batches'):
+    return iter(source.to_batches(max_chunksize=rows_per_chunk))
+  if not isinstance(source, str):
+    return iter(source)
+  import pyarrow.dataset
+  return pyarrow.dataset.dataset(source, format='parquet').to_batches(
+    columns=columns, batch_size=rows_per_chunk)
+
+# the zip member for an archive name: a2_m1.json.zip -> a2_m1.json/part-00000.json
+def default_member(output):
+  name = os.path.basename(output)
+  if name.endswith('.zip'):
+    name = name[:-len('.zip')]
+  return '%s/part-00000.json' % name
+
+# export a dataset as compressed JSON lines (and base64 of the archive)
+def export(source, output, format='zip', member=None, base64_output=None, columns=None,
+           rows_per_chunk=65536, level=6, workers=None, wrap=76):
+  if format not in FORMATS:
+    raise ValueError('format must be one of %s, not %r' % (', '.join(FORMATS), format))
+  started = time.time()
+  if format == 'zip':
+    frame = _Zip(member or default_member(output), started)
+  else:
+    frame = _Gzip(started)
+  tasks = ((batch, level) for batch in _batches(source, rows_per_chunk, columns))
+  rows, crc, size = 0, 0, 0
+  tmp, tmp_encoded = output + '.tmp', base64_output and base64_output + '.tmp'
+  f = open(tmp, 'wb')
+  encoded = open(tmp_encoded, 'wb') if base64_output else None
+  sink = _Sink(f, encoded, wrap)
+  try:
+    sink.write(frame.header())
+    start = sink.offset
+    # at most two chunks per worker in flight, written in order
+    with closing(pool_map(_chunk_task, tasks, workers)) as results:
+      for n, chunk_crc, chunk_size, block in results:
+        sink.write(block)
+        crc = crc32_combine(crc, chunk_crc, chunk_size)
+        rows += n
+        size += chunk_size
+    # an empty final block ends the deflate stream
+    sink.write(zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS).flush(zlib.Z_FINISH))
+    compressed = sink.offset - start
+    sink.write(frame.trailer(crc, compressed, size, sink.offset))
+    sink.close()
+  finally:
+    f.close()
+    if encoded is not None:
+      encoded.close()
+  os.replace(tmp, output)
+  if base64_output:
+    os.replace(tmp_encoded, base64_output)
+  return {'rows': rows, 'bytes': size, 'compressed': compressed, 'archive': sink.offset,
+          'seconds': time.time() - started}
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Export a parquet dataset as compressed JSON lines.')
+  parser.add_argument('source', help='parquet file or directory')
+  parser.add_argument('output', help='archive to write, e.g. a2_m1.json.zip')
+  parser.add_argument('--format', choices=FORMATS, default='zip')
+  parser.add_argument('--member', help='file name inside the zip')
+  parser.add_argument('--base64', dest='base64_output', help='also write the archive base64-encoded here')
+  parser.add_argument('--rows-per-chunk', type=int, default=65536)
+  parser.add_argument('--level', type=int, default=6)
+  parser.add_argument('--workers', type=int)
+  args = parser.parse_args(argv)
+  stats = export(args.source, args.output, args.format, args.member, args.base64_output,
+                 rows_per_chunk=args.rows_per_chunk, level=args.level, workers=args.workers)
+  print('%d rows, %d bytes of JSON -> %d byte archive in %.2fs' % (
+    stats['rows'], stats['bytes'], stats['archive'], stats['seconds']))
+  sys.stdout.flush()
+
+if __name__ == '__main__':
+  # python -m etl.exporter a2.parquet a2_m1.json.zip --base64 a2_m1.json.zip.base64
+  main()
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""The HMP accelerometer dataset (HMP_demo.ipynb) without a per-file Spark loop.
+
+hmp.ingest builds and reads the parquet cache (pyarrow is imported when the
+cache is written or read, pyspark only by the spark engine); the feature
+pipeline below needs NumPy alone.
+"""
+from .ingest import discover, read_cache
+from .features import Normalizer, OneHotEncoder, Pipeline, StringIndexer, VectorAssembler
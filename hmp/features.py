@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""The HMP_demo feature pipeline in NumPy, without Spark or a JVM.
+
+StringIndexer -> OneHotEncoder -> VectorAssembler -> Normalizer with the
+pyspark.ml parameter names, defaults, fit/transform semantics and output
+columns, so the notebook's stages port by changing the import:
+
+  * StringIndexer: labels ordered by frequency (ties alphabetically, as
+    Spark 3), or alphabetically; the index is a float64 column.
+  * OneHotEncoder: dropLast by default, so 13 classes give 12-wide vectors
+    and the last class is all zeros, like Spark's (12,[8],[1.0]).
+  * VectorAssembler: float64 (n, k) matrix of the input columns.
+  * Normalizer: rows scaled to unit p-norm, zero rows left as they are.
+
+A dataset is a mapping of column name -> NumPy array (a dict, a pandas
+DataFrame) or a pyarrow Table / RecordBatch such as hmp.ingest.read_cache()
+returns; vector columns are 2-D arrays. transform() returns a new dict that
+shares the input arrays and adds the output column. fit() and transform()
+also take a list of such chunks (e.g. table.to_batches()): fitting passes
+over them once per estimator and transform() yields the chunks one at a
+time, so only one transformed chunk is in memory at once.
+"""
+import numpy
+
+ORDER_TYPES = ('frequencyDesc', 'frequencyAsc', 'alphabetDesc', 'alphabetAsc')
+HANDLE_INVALID = ('error', 'skip', 'keep')
+
+# a dataset as a dict of column name -> NumPy array, sharing memory where possible
+def columns(data):
+  if hasattr(data, 'column_names'):
+    # pyarrow: numeric columns without nulls are zero-copy views
+    return dict((name, data.column(name).to_numpy(zero_copy_only=False)) for name in data.column_names)
+  return dict((name, numpy.asarray(data[name])) for name in data.keys())
+
+def _is_chunks(data):
+  return isinstance(data, (list, tuple, _Chunks))
+
+# chunks run through already fitted stages each time they are iterated, so
+# fitting a pipeline keeps no transformed chunk alive
+class _Chunks(object):
+
+  __slots__ = ('chunks', 'stages')
+
+  def __init__(self, chunks, stages):
+    self.chunks = chunks
+    self.stages = stages
+
+  def __iter__(self):
+    for chunk in self.chunks:
+      chunk = columns(chunk)
+      for stage in self.stages:
+        chunk = stage._transform(chunk)
+      yield chunk
+
+# keep the rows where mask is true in every column
+def _filter(data, mask):
+  return dict((name, values[mask]) for name, values in data.items())
+
+def _check_choice(name, value, choices):
+  if value not in choices:
+    raise ValueError('%s must be one of %s, not %r' % (name, ', '.join(choices), value))
+
+# a transformer is its own fitted model
+class Transformer(object):
+
+  __slots__ = ()
+
+  def fit(self, data):
+    return self
+
+  # a dataset, or a generator of transformed chunks for a list of chunks
+  def transform(self, data):
+    if _is_chunks(data):
+      return (self._transform(columns(chunk)) for chunk in data)
+    return self._transform(columns(data))
+
+class StringIndexer(object):
+
+  __slots__ = ('inputCol', 'outputCol', 'handleInvalid', 'stringOrderType')
+
+  def __init__(self, inputCol, outputCol, handleInvalid='error', stringOrderType='frequencyDesc'):
+    _check_choice('handleInvalid', handleInvalid, HANDLE_INVALID)
+    _check_choice('stringOrderType', stringOrderType, ORDER_TYPES)
+    self.inputCol = inputCol
+    self.outputCol = outputCol
+    self.handleInvalid = handleInvalid
+    self.stringOrderType = stringOrderType
+
+  # count the labels of every chunk and order them
+  def fit(self, data):
+    counts = dict()
+    for chunk in (data if _is_chunks(data) else [data]):
+      labels, n = numpy.unique(columns(chunk)[self.inputCol].astype(str), return_counts=True)
+      for label, count in zip(labels.tolist(), n.tolist()):
+        counts[label] = counts.get(label, 0) + count
+    if self.stringOrderType == 'frequencyDesc':
+      labels = sorted(counts, key=lambda label: (-counts[label], label))
+    elif self.stringOrderType == 'frequencyAsc':
+      labels = sorted(counts, key=lambda label: (counts[label], label))
+    else:
+      labels = sorted(counts, reverse=self.stringOrderType == 'alphabetDesc')
+    return StringIndexerModel(labels, self.inputCol, self.outputCol, self.handleInvalid)
+
+class StringIndexerModel(Transformer):
+
+  __slots__ = ('labels', 'inputCol', 'outputCol', 'handleInvalid', '_index')
+
+  def __init__(self, labels, inputCol, outputCol, handleInvalid='error'):
+    self.labels = list(labels)
+    self.inputCol = inputCol
+    self.outputCol = outputCol
+    self.handleInvalid = handleInvalid
+    self._index = dict((label, i) for i, label in enumerate(self.labels))
+
+  def _transform(self, data):
+    # look up each distinct value once, then gather through the inverse
+    distinct, inverse = numpy.unique(data[self.inputCol].astype(str), return_inverse=True)
+    lookup = numpy.array([self._index.get(label, -1) for label in distinct.tolist()], dtype='float64')
+    index = lookup[inverse.reshape(-1)]
+    unseen = index < 0
+    if unseen.any():
+      if self.handleInvalid == 'error':
+        label = distinct[lookup < 0][0]
+        raise ValueError('Unseen label: %s in column %r' % (label, self.inputCol))
+      if self.handleInvalid == 'keep':
+        index[unseen] = len(self.labels)
+      else:
+        data, index = _filter(data, ~unseen), index[~unseen]
+    data = dict(data)
+    data[self.outputCol] = index
+    return data
+
+class OneHotEncoder(object):
+
+  __slots__ = ('inputCol', 'outputCol', 'dropLast', 'handleInvalid')
+
+  def __init__(self, inputCol, outputCol, dropLast=True, handleInvalid='error'):
+    _check_choice('handleInvalid', handleInvalid, ('error', 'keep'))
+    self.inputCol = inputCol
+    self.outputCol = outputCol
+    self.dropLast = dropLast
+    self.handleInvalid = handleInvalid
+
+  # the number of categories is the largest index seen plus one
+  def fit(self, data):
+    size = 0
+    for chunk in (data if _is_chunks(data) else [data]):
+      index = columns(chunk)[self.inputCol]
+      if len(index):
+        size = max(size, int(index.max()) + 1)
+    return OneHotEncoderModel(size, self.inputCol, self.outputCol, self.dropLast, self.handleInvalid)
+
+class OneHotEncoderModel(Transformer):
+
+  __slots__ = ('categorySize', 'inputCol', 'outputCol', 'dropLast', 'handleInvalid')
+
+  def __init__(self, categorySize, inputCol, outputCol, dropLast=True, handleInvalid='error'):
+    self.categorySize = int(categorySize)
+    self.inputCol = inputCol
+    self.outputCol = outputCol
+    self.dropLast = dropLast
+    self.handleInvalid = handleInvalid
+
+  # width of the output vectors: an extra category for 'keep', one less for dropLast
+  @property
+  def size(self):
+    return self.categorySize + (self.handleInvalid == 'keep') - bool(self.dropLast)
+
+  def _transform(self, data):
+    index = data[self.inputCol]
+    invalid = (index < 0) | (index >= self.categorySize) | (index != numpy.floor(index))
+    if invalid.any():
+      if self.handleInvalid == 'error':
+        raise ValueError('Invalid index %r in column %r for %d categories' % (
+          index[invalid][0], self.inputCol, self.categorySize))
+      index = numpy.where(invalid, self.categorySize, index)
+    index = index.astype('intp')
+    vectors = numpy.zeros((len(index), self.size), dtype='float64')
+    # the dropped last category is the all-zero row
+    rows = numpy.flatnonzero(index < self.size)
+    vectors[rows, index[rows]] = 1.0
+    data = dict(data)
+    data[self.outputCol] = vectors
+    return data
+
+# the columns as one (n, k) view when they already are the columns of one
+# C-ordered float64 block, else None
+def _block_view(arrays):
+  first = arrays[0]
+  if any(a.ndim != 1 or a.dtype != numpy.float64 or len(a) != len(first) for a in arrays):
+    return None
+  itemsize, stride = first.itemsize, first.strides[0]
+  address = first.__array_interface__['data'][0]
+  for i, a in enumerate(arrays):
+    if a.strides[0] != stride or a.__array_interface__['data'][0] != address + i * itemsize:
+      return None
+  if stride != len(arrays) * itemsize and len(first) > 1:
+    return None
+  return numpy.lib.stride_tricks.as_strided(first, shape=(len(first), len(arrays)),
+                                            strides=(stride, itemsize), writeable=False)
+
+class VectorAssembler(Transformer):
+
+  __slots__ = ('inputCols', 'outputCol')
+
+  def __init__(self, inputCols, outputCol):
+    self.inputCols = list(inputCols)
+    self.outputCol = outputCol
+
+  def _transform(self, data):
+    arrays = [data[name] for name in self.inputCols]
+    vectors = _block_view(arrays)
+    if vectors is None:
+      # one float64 matrix filled column by column, no intermediate copies
+      widths = [1 if a.ndim == 1 else a.shape[1] for a in arrays]
+      vectors = numpy.empty((len(arrays[0]), sum(widths)), dtype='float64')
+      offset = 0
+      for a, width in zip(arrays, widths):
+        vectors[:, offset:offset + width] = a.reshape(len(a), width)
+        offset += width
+    if numpy.isnan(vectors).any():
+      raise ValueError('VectorAssembler: NaN in columns %s' % ', '.join(self.inputCols))
+    data = dict(data)
+    data[self.outputCol] = vectors
+    return data
+
+class Normalizer(Transformer):
+
+  __slots__ = ('inputCol', 'outputCol', 'p')
+
+  def __init__(self, inputCol, outputCol, p=2.0):
+    if p < 1:
+      raise ValueError('Normalizer: p must be >= 1, not %r' % p)
+    self.inputCol = inputCol
+    self.outputCol = outputCol
+    self.p = float(p)
+
+  def _transform(self, data):
+    vectors = data[self.inputCol]
+    magnitude = numpy.abs(vectors)
+    if self.p == 1:
+      norm = magnitude.sum(axis=1)
+    elif self.p == 2:
+      norm = numpy.sqrt(numpy.einsum('ij,ij->i', vectors, vectors))
+    elif numpy.isinf(self.p):
+      norm = magnitude.max(axis=1)
+    else:
+      norm = (magnitude ** self.p).sum(axis=1) ** (1.0 / self.p)
+    # Spark leaves zero vectors unscaled
+    norm[norm == 0] = 1.0
+    data = dict(data)
+    data[self.outputCol] = vectors / norm[:, None]
+    return data
+
+class Pipeline(object):
+
+  __slots__ = ('stages',)
+
+  def __init__(self, stages):
+    self.stages = list(stages)
+
+  # fit each estimator on the output of the stages before it
+  def fit(self, data):
+    chunks = list(data) if _is_chunks(data) else [data]
+    fitted = list()
+    for stage in self.stages:
+      fitted.append(stage.fit(_Chunks(chunks, list(fitted))))
+    return PipelineModel(fitted)
+
+class PipelineModel(Transformer):
+
+  __slots__ = ('stages',)
+
+  def __init__(self, stages):
+    self.stages = list(stages)
+
+  def _transform(self, data):
+    for stage in self.stages:
+      data = stage._transform(data)
+    return data
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Bulk ingestion of HMP_Dataset into a parquet cache partitioned by class.
+
+HMP_demo.ipynb read every accelerometer file with its own spark.read.csv()
+call and unioned the results one at a time. Here every category/file pair
+is discovered up front and parsed in one pass, either by Spark as a single
+multi-path read or by a local process pool with NumPy, and written as
+<cache>/class=<category>/part-0.parquet with int32 x/y/z and the source
+file name. A manifest of the ingested files (name, size, mtime) is written
+last; while it matches the dataset, ingest() returns without parsing any
+text, and both Spark (spark.read.parquet) and read_cache() load the cache
+with class restored from the directory names.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+import warnings
+import numpy
+from parallel import pool_map, worker_count
+
+CACHE_DIR = os.path.join('.hmp_cache', 'hmp')
+MANIFEST = '_manifest.json'
+COLUMNS = ('x', 'y', 'z')
+
+# (class, source, path) for every file of every category, sorted
+def discover(root='HMP_Dataset'):
+  files = list()
+  for category in sorted(os.listdir(root)):
+    # the category directories are the names with an underscore
+    directory = os.path.join(root, category)
+    if '_' not in category or not os.path.isdir(directory):
+      continue
+    for source in sorted(os.listdir(directory)):
+      path = os.path.join(directory, source)
+      if source.endswith('.txt') and os.path.isfile(path):
+        files.append((category, source, path))
+  return files
+
+# what the manifest records per file, to tell whether the cache is stale
+def _signature(files):
+  signature = list()
+  for category, source, path in files:
+    stat = os.stat(path)
+    signature.append([category, source, stat.st_size, stat.st_mtime_ns])
+  return signature
+
+# the manifest of a complete cache, or None
+def read_manifest(cache=CACHE_DIR):
+  try:
+    with open(os.path.join(cache, MANIFEST)) as f:
+      return json.load(f)
+  except (IOError, ValueError):
+    return None
+
+def _write_manifest(cache, signature, rows, engine):
+  manifest = {'files': signature, 'rows': rows, 'engine': engine, 'created': time.time()}
+  tmp = os.path.join(cache, MANIFEST + '.tmp')
+  with open(tmp, 'w') as f:
+    json.dump(manifest, f)
+  os.replace(tmp, os.path.join(cache, MANIFEST))
+  return manifest
+
+# the x/y/z samples of one file as an (n, 3) int32 array; a bad token or a
+# line without exactly three values is an error, never a truncated file
+def read_file(path):
+  try:
+    with warnings.catch_warnings():
+      # an empty file is no samples, not a warning
+      warnings.simplefilter('ignore', UserWarning)
+      values = numpy.loadtxt(path, dtype='int32', ndmin=2)
+  except ValueError as e:
+    raise ValueError('%s: %s' % (path, e))
+  if not values.size:
+    return numpy.empty((0, 3), dtype='int32')
+  if values.shape[1] != 3:
+    raise ValueError('%s: %d values per line, not 3' % (path, values.shape[1]))
+  return values
+
+# parquet schema of one partition; class lives in the directory name
+def partition_schema():
+  import pyarrow
+  return pyarrow.schema([(name, pyarrow.int32()) for name in COLUMNS] +
+                        [('source', pyarrow.dictionary(pyarrow.int32(), pyarrow.string()))])
+
+# task run in a worker: parse the files of one class and write its partition
+def _partition_task(args):
+  import pyarrow
+  import pyarrow.parquet
+  cache, category, files = args
+  arrays = [read_file(path) for source, path in files]
+  samples = numpy.concatenate(arrays) if arrays else numpy.empty((0, 3), dtype='int32')
+  # one source code per row, the dictionary holds each file name once
+  codes = numpy.repeat(numpy.arange(len(files), dtype='int32'), [len(a) for a in arrays])
+  sources = pyarrow.DictionaryArray.from_arrays(codes, [source for source, path in files])
+  columns = [samples[:, i] for i in range(len(COLUMNS))] + [sources]
+  table = pyarrow.Table.from_arrays(columns, schema=partition_schema())
+  directory = os.path.join(cache, 'class=%s' % category)
+  os.makedirs(directory, exist_ok=True)
+  pyarrow.parquet.write_table(table, os.path.join(directory, 'part-0.parquet'))
+  return category, len(samples)
+
+# parse every file on a process pool, one task per class
+def ingest_local(files, cache=CACHE_DIR, workers=None):
+  groups = dict()
+  for category, source, path in files:
+    groups.setdefault(category, list()).append((source, path))
+  tasks = [(cache, category, groups[category]) for category in sorted(groups)]
+  workers = min(worker_count(workers), max(len(tasks), 1))
+  return dict(pool_map(_partition_task, tasks, workers, ordered=False))
+
+# read every file with one multi-path spark.read.csv() and write the cache from Spark
+def ingest_spark(spark, files, cache=CACHE_DIR):
+  from pyspark.sql.functions import input_file_name, regexp_extract
+  from pyspark.sql.types import IntegerType, StructField, StructType
+  schema = StructType([StructField(name, IntegerType(), True) for name in COLUMNS])
+  df = spark.read.csv([path for category, source, path in files], schema=schema, sep=' ', header=False)
+  # class and source are the last two components of each row's file path
+  path = input_file_name()
+  df = df.withColumn('class', regexp_extract(path, r'([^/]+)/[^/]+$', 1))
+  df = df.withColumn('source', regexp_extract(path, r'([^/]+)$', 1))
+  df.write.mode('overwrite').partitionBy('class').parquet(cache)
+  counts = spark.read.parquet(cache).groupBy('class').count().collect()
+  return dict((row['class'], row['count']) for row in counts)
+
+# build the cache unless its manifest matches the dataset; returns the manifest
+def ingest(root='HMP_Dataset', cache=CACHE_DIR, engine='local', spark=None, workers=None, force=False):
+  files = discover(root)
+  if not files:
+    raise ValueError('no HMP category directories under %r' % root)
+  signature = _signature(files)
+  manifest = read_manifest(cache)
+  if not force and manifest is not None and manifest['files'] == signature:
+    return manifest
+  if os.path.exists(cache):
+    shutil.rmtree(cache)
+  os.makedirs(cache)
+  if engine == 'spark':
+    if spark is None:
+      from pyspark.sql import SparkSession
+      spark = SparkSession.builder.appName('hmp_ingest').getOrCreate()
+    rows = ingest_spark(spark, files, cache)
+  elif engine == 'local':
+    rows = ingest_local(files, cache, workers)
+  else:
+    raise ValueError('unknown engine %r' % engine)
+  return _write_manifest(cache, signature, rows, engine)
+
+# the cache as a pyarrow Table, optionally only some classes and columns
+def read_cache(cache=CACHE_DIR, classes=None, columns=None):
+  import pyarrow.dataset
+  dataset = pyarrow.dataset.dataset(cache, format='parquet', partitioning='hive')
+  filter = None
+  if classes is not None:
+    filter = pyarrow.dataset.field('class').isin(list(classes))
+  return dataset.to_table(columns=columns, filter=filter)
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Ingest HMP_Dataset into a parquet cache partitioned by class.')
+  parser.add_argument('root', nargs='?', default='HMP_Dataset')
+  parser.add_argument('--cache', default=CACHE_DIR)
+  parser.add_argument('--engine', choices=('local', 'spark'), default='local')
+  parser.add_argument('--workers', type=int)
+  parser.add_argument('--force', action='store_true', help='rebuild even if the cache is up to date')
+  args = parser.parse_args(argv)
+  started = time.time()
+  manifest = ingest(args.root, args.cache, args.engine, workers=args.workers, force=args.force)
+  print('%d files, %d rows in %d classes -> %s (%.2fs)' % (
+    len(manifest['files']), sum(manifest['rows'].values()), len(manifest['rows']),
+    args.cache, time.time() - started))
+
+if __name__ == '__main__':
+  # python -m hmp.ingest [HMP_Dataset] [--engine spark]
+  main()
@@ -24,63 +24,39 @@ The steps of this project that we will through are as follows.
       6. Model Validation.
 """
 
-!pip install -U mxnet-cu101==1.7.0
-
-!nvidia-smi
-
-from mxnet import np, npx
-from mxnet.gluon import nn
-
-npx.set_np()
-
-npx.cpu(), npx.gpu(), npx.gpu(1)
-
-npx.num_gpus() #Query the number of available gpu
-
 """# Test Harness"""
 
-from pandas import read_csv
+from champagne.data_loader import load
 
-series  = read_csv('https://raw.githubusercontent.com/jbrownlee/Datasets/master/monthly_champagne_sales.csv', header=0, index_col=0, parse_dates=True, squeeze=True)
-split_point = len(series) - 12
-dataset, validation = series[0:split_point], series[split_point:]
+# fetched once into .data_cache, parsed once, split and stored as memory-mapped .npy
+arrays = load()
+dataset, validation = arrays['dataset'], arrays['validation']
 print('Dataset %d, Validation %d' % (len(dataset), len(validation)))
-dataset.to_csv('dataset.csv', header=False)
-validation.to_csv('validation.csv', header=False)
 
-"""**The specific contents of these files are:**
+"""**The specific contents of these arrays are:**
 
-    1. dataset.csv: Observations from January 1964 to September 1971 (93 obs)
-    2. validation.csv: Observations from October 1971 to September 1972 (12 obs)
+    1. dataset: Observations from January 1964 to September 1971 (93 obs)
+    2. validation: Observations from October 1971 to September 1972 (12 obs)
 
 ## **Model Evaluation**
 """
 
 # evaluate persistence model on time series
-from pandas import read_csv
-from sklearn.metrics import mean_squared_error
-from math import sqrt
+from champagne.data_loader import load_series
+from champagne.baselines import persistence, rmse
 # load data
-series = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
+series = load_series()
 # prepare data
 X = series.values
 X = X.astype('float32')
 train_size = int(len(X) * 0.50)
 train, test = X[0:train_size], X[train_size:]
-# walk-forward validation
-history = [x for x in train]
-predictions = list()
-for i in range(len(test)):
-  # predict
-  yhat = history[-1]
-  predictions.append(yhat)
-  # observation
-  obs = test[i]
-  history.append(obs)
+# walk-forward validation: each prediction is the previous observation
+predictions = persistence(X, train_size)
+for yhat, obs in zip(predictions, test):
   print( ' >Predicted=%.3f, Expected=%3.f ' % (yhat, obs))
 # report performance
-rmse = sqrt(mean_squared_error(test, predictions))
-print( ' RMSE: %.3f ' % rmse)
+print( ' RMSE: %.3f ' % rmse(test, predictions))
 
 """*We can see that the persistence model achieved an **RMSE of 3186.501**. This means that on average, the model was wrong by about 3,186 million sales for each prediction made.*
 We now a baseline prediction method and performance.
@@ -90,53 +66,22 @@ We now a baseline prediction method and performance.
 
 series.describe()
 
-# Line Plot
-from matplotlib import pyplot
-series.plot()
-pyplot.show()
+# Line Plot, written to reports/champagne_line.png
+from champagne.reporting import SeriesReport
+# the per-year groups are computed once and shared by the yearly, box and density plots
+report = SeriesReport.from_series(series, 'champagne', start='1964', end='1970')
+report.render('reports', kinds=('line',))
 
 """The plot shows an increase trend of sales over time and appears to be systematic seasonality to the sales for each year. Therefore the seasonal signal appears to be growing over time. However we do not notice any outliers and its certainly a non-stationary series."""
 
-# Seasonal Line Plots - Multiple line plots of time series
-from pandas import read_csv
-from pandas import DataFrame
-from pandas import Grouper
-from matplotlib import pyplot
-series = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
-groups = series['1964' : '1970'].groupby(Grouper(freq='A'))
-years = DataFrame()
-pyplot.figure()
-i = 1
-n_groups = len(groups)
-for name, group in groups:
-  pyplot.subplot((n_groups*100) + 10 + i)
-  i += 1
-  pyplot.plot(group)
-pyplot.show()
+# Seasonal Line Plots - one row per year, any number of years
+report.render('reports', kinds=('yearly',))
 
 # density plots of time series
-from pandas import read_csv
-from matplotlib import pyplot
-series = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
-pyplot.figure(1)
-pyplot.subplot(211)
-series.hist()
-pyplot.subplot(212)
-series.plot(kind='kde')
-pyplot.show()
+report.render('reports', kinds=('density',))
 
 # boxplots of time series
-from pandas import read_csv
-from pandas import DataFrame
-from pandas import Grouper
-from matplotlib import pyplot
-series = read_csv('dataset.csv' , header=None, index_col=0, parse_dates=True, squeeze=True)
-groups = series['1964' : '1970'].groupby(Grouper(freq= 'A' ))
-years = DataFrame()
-for name, group in groups:
-  years[name.year] = group.values
-years.boxplot()
-pyplot.show()
+report.render('reports', kinds=('boxplot',))
 
 """# ARIMA Models
 
@@ -146,25 +91,18 @@ pyplot.show()
 """
 
 # create and summarize stationary version of time series - Manual Configuration
-from pandas import read_csv
+from champagne.data_loader import load_series
 from pandas import Series
 from statsmodels.tsa.stattools import adfuller
 from matplotlib import pyplot
+from champagne.differencing import difference
 
-# create a differenced series
-def difference(dataset, interval=1):
-  diff = list()
-  for i in range(interval, len(dataset)):
-    value = dataset[i] - dataset[i - interval]
-    diff.append(value)
-  return Series(diff)
-series = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
+series = load_series()
 X = series.values
 X = X.astype('float32')
 # difference data
 months_in_year = 12
-stationary = difference(X, months_in_year)
-stationary.index = series.index[months_in_year:]
+stationary = Series(difference(X, months_in_year), index=series.index[months_in_year:])
 # check if stationary
 result = adfuller(stationary)
 print( 'ADF Statistic: %f' % result[0])
@@ -197,38 +135,38 @@ pyplot.subplot(212)
 plot_pacf(series, lags=25, ax=pyplot.gca())
 pyplot.show()
 
+"""The same checks without plots: the differencing interval, ADF statistic and the AR/MA orders suggested by the PACF/ACF, as one table. The input can be a whole catalogue of series, one per row."""
+
+# ADF, ACF and PACF diagnostics in one vectorized call
+from champagne.data_loader import load_series
+from champagne.diagnostics import select_interval
+
+table = select_interval(load_series().values, intervals=(0, 1, 12), nlags=25, max_p=6, max_q=6)
+print(table[['interval', 'adf', 'pvalue', 'usedlag', 'stationary', 'p', 'q']])
+
 # evaluate manually configured ARIMA model
-from pandas import read_csv
+from champagne.data_loader import load_series
 from sklearn.metrics import mean_squared_error
 from statsmodels.tsa.arima_model import ARIMA
 from math import sqrt
 
-# create a differenced series
-def difference(dataset, interval=1):
-  diff = list()
-  for i in range(interval, len(dataset)):
-    value = dataset[i] - dataset[i - interval]
-    diff.append(value)
-  return diff
-
-# invert differenced value
-def inverse_difference(history, yhat, interval=1):
-  return yhat + history[-interval]
+from champagne.differencing import inverse_difference
+from champagne.history import SeriesHistory
 
 # load data
-series = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
+series = load_series()
 # prepare data
 X = series.values
 X = X.astype('float32')
 train_size = int(len(X) * 0.50)
 train, test = X[0:train_size], X[train_size:]
 # walk-forward validation
-history = [x for x in train]
+history = SeriesHistory(train, interval=12)
 predictions = list()
 for i in range(len(test)):
   # difference data
   months_in_year = 12
-  diff = difference(history, months_in_year)
+  diff = history.diff()
   # predict
   model = ARIMA(diff, order=(1,1,1)) # The model can be extended to ARIMA(1,1,1)
   model_fit = model.fit(trend= 'nc', disp=0) # The trend arguments to nc
@@ -256,71 +194,33 @@ combinations of the following parameters:
 
 # grid search ARIMA parameters for time series
 import warnings
-from pandas import read_csv
-from statsmodels.tsa.arima_model import ARIMA
-from sklearn.metrics import mean_squared_error
-from math import sqrt
-import numpy
+from champagne.data_loader import load_series
+from champagne.grid_search import evaluate_models
+from champagne import instrumentation
+from champagne.model_cache import FitCache
 
-# create a differenced series
-def difference(dataset, interval=1):
-  diff = list()
-  for i in range(interval, len(dataset)):
-    value = dataset[i] - dataset[i - interval]
-    diff.append(value)
-  return numpy.array(diff)
-
-# invert differenced value
-def inverse_difference(history, yhat, interval=1):
-  return yhat + history[-interval]
-
-# evaluate an ARIMA model for a given order (p,d,q) and return RMSE
-def evaluate_arima_model(X, arima_order):
-  # prepare training dataset
-  X = X.astype('float32')
-  train_size = int(len(X) * 0.50)
-  train, test = X[0:train_size], X[train_size:]
-  history = [x for x in train]
-  # make predictions
-  predictions = list()
-  for t in range(len(test)):
-    # difference data
-    months_in_year = 12
-    diff = difference(history, months_in_year)
-    model = ARIMA(diff, order=arima_order)
-    model_fit = model.fit(trend= 'nc', disp=0)
-    yhat = model_fit.forecast()[0]
-    yhat = inverse_difference(history, yhat, months_in_year)
-    predictions.append(yhat)
-    history.append(test[t])
-  # calculate out of sample error
-  rmse = sqrt(mean_squared_error(test, predictions))
-  return rmse
-
-# evaluate combinations of p, d and q values for an ARIMA model
-def evaluate_models(dataset, p_values, d_values, q_values):
-  dataset = dataset.astype('float32')
-  best_score, best_cfg = float("inf"), None
-  for p in p_values:
-    for d in d_values:
-      for q in q_values:
-        order = (p,d,q)
-        try:
-          rmse = evaluate_arima_model(dataset, order)
-          if rmse < best_score:
-            best_score, best_cfg = rmse, order
-          print('ARIMA%s RMSE=%.3f' % (order,rmse))
-        except:
-          continue
-  print( 'Best ARIMA%s RMSE=%.3f' % (best_cfg, best_score))
 # load dataset
-series = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
+series = load_series()
+# fitted models are kept on disk, so a re-run only refits what changed
+cache = FitCache()
 # evaluate parameters
 p_values = range(0, 7)
 d_values = range(0, 3)
 q_values = range(0, 7)
 warnings.filterwarnings("ignore")
-evaluate_models(series.values, p_values, d_values, q_values)
+# record every fit, the slowest orders and failures are summarised at the end
+instrumentation.enable('fit_events.jsonl')
+# orders are scored on all cores; split_steps=True also spreads the walk-forward steps
+best_cfg, best_score = evaluate_models(series.values, p_values, d_values, q_values, workers=None, cache=cache)
+print(cache.stats())
+
+"""The single 50% split scores each order on one origin and a one-month horizon only. Rolling-origin cross-validation checks the leading orders over many origins and at 1, 3 and 12 months ahead; prefixes shared between folds are fitted once."""
+
+# rolling-origin cross-validation of the leading orders
+from champagne.cross_validation import cross_validate
+
+cv_report = cross_validate(series.values, [(4,0,1), (2,0,1), (1,0,0)], horizons=(1, 3, 12),
+                           n_folds=12, steps=6)
 
 """**We will select this ARIMA(4, 0, 1) model going forward.**
 
@@ -328,49 +228,25 @@ evaluate_models(series.values, p_values, d_values, q_values)
 """
 
 # summarize ARIMA forecast residuals
-from pandas import read_csv
+from champagne.data_loader import load_series
 from pandas import DataFrame
-from statsmodels.tsa.arima_model import ARIMA
 from matplotlib import pyplot
 
-# create a differenced series
-def difference(dataset, interval=1):
-  diff = list()
-  for i in range(interval, len(dataset)):
-    value = dataset[i] - dataset[i - interval]
-    diff.append(value)
-  return diff
-
-# invert differenced value
-def inverse_difference(history, yhat, interval=1):
-  return yhat + history[-interval]
+from champagne.model_cache import FitCache
+from champagne.results_store import ResultsStore, record_walk_forward
 
 # load data
-series = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
+series = load_series()
 # prepare data
 X = series.values
 X = X.astype('float32')
 train_size = int(len(X) * 0.50)
-train, test = X[0:train_size], X[train_size:]
-# walk-forward validation
-history = [x for x in train]
-predictions = list()
-for i in range(len(test)):
-  # difference data
-  months_in_year = 12
-  diff = difference(history, months_in_year)
-  # predict
-  model = ARIMA(diff, order=(4,0,1))
-  model_fit = model.fit(trend= 'nc', disp=0)
-  yhat = model_fit.forecast()[0]
-  yhat = inverse_difference(history, yhat, months_in_year)
-  predictions.append(yhat)
-  # observation
-  obs = test[i]
-  history.append(obs)
+# walk-forward validation, recorded once: the cells below read these rows
+# back from the store instead of refitting
+store = ResultsStore()
+results = record_walk_forward(store, X, (4,0,1), start=train_size, cache=FitCache())
 # errors
-residuals = [test[i]-predictions[i] for i in range(len(test))]
-residuals = DataFrame(residuals)
+residuals = DataFrame(results['residual'])
 print(residuals.describe())
 # plot
 pyplot.figure()
@@ -383,51 +259,34 @@ pyplot.show()
 """The distribution of residual errors is also plotted. The graphs suggest a Gaussian-like distribution with a bumpy left tail, providing further evidence that perhaps a power transform might be worth exploring."""
 
 # Plots of residual errors of bias corrected forecasts
-from pandas import read_csv
 from pandas import DataFrame
-from statsmodels.tsa.arima_model import ARIMA
 from matplotlib import pyplot
 from sklearn.metrics import mean_squared_error
 from math import sqrt
 
-# create a differenced series
-def difference(dataset, interval=1):
-  diff = list()
-  for i in range(interval, len(dataset)):
-    value = dataset[i] - dataset[i - interval]
-    diff.append(value)
-  return diff
-
-# invert differenced value
-def inverse_difference(history, yhat, interval=1):
-  return yhat + history[-interval]
+from champagne.differencing import difference
+from champagne.model_cache import FitCache
+from champagne.bias import BiasEstimator
+from champagne.data_loader import load_series
+from champagne.results_store import ResultsStore, record_walk_forward
 
 # load data
-series = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
-
+series = load_series()
 # prepare data
 X = series.values
 X = X.astype('float32')
 train_size = int(len(X) * 0.50)
-train, test = X[0:train_size], X[train_size:]
-
-# walk-forward validation
-history = [x for x in train]
-predictions = list()
-bias = 146.401198
-for i in range(len(test)):
-  # difference data
-  months_in_year = 12
-  diff = difference(history, months_in_year)
-  # predict
-  model = ARIMA(diff, order=(4,0,1))
-  model_fit = model.fit(trend='nc', disp=0)
-  yhat = model_fit.forecast()[0]
-  yhat = bias + inverse_difference(history, yhat, months_in_year)
-  predictions.append(yhat)
-  # observation
-  obs = test[i]
-  history.append(obs)
+# stored walk-forward forecasts of the ARIMA(4,0,1) model, refitted only
+# where the data no longer matches what they were made from
+cache = FitCache()
+store = ResultsStore()
+results = record_walk_forward(store, X, (4,0,1), start=train_size, cache=cache)
+test = results['actual']
+# seeded with the in-sample residuals of the first fit (a cache hit), then
+# updated with every stored forecast error
+model_fit = cache.fit(difference(X[0:train_size], 12), (4,0,1), trend='nc')
+bias = BiasEstimator.from_residuals(model_fit.resid, 'mean')
+predictions = bias.correct(results['prediction'], results['residual'])
 # report performance
 rmse = sqrt(mean_squared_error(test, predictions))
 print('RMSE: %.3f' % rmse)
@@ -446,52 +305,25 @@ pyplot.show()
 """The performance of the predictions is improved very slightly from 911.526 to 899.693, which may or may not be significant. The summary of the forecast residual errors shows that the mean was indeed moved to a value very close to zero."""
 
 # ACF and PACF plots of residual errors of bias corrected forecasts
-from pandas import read_csv
 from pandas import DataFrame
-from statsmodels.tsa.arima_model import ARIMA
 from matplotlib import pyplot
 from statsmodels.graphics.tsaplots import plot_acf
 from statsmodels.graphics.tsaplots import plot_pacf
 
-# create a differenced series
-def difference(dataset, interval=1):
-  diff = list()
-  for i in range(interval, len(dataset)):
-    value = dataset[i] - dataset[i - interval]
-    diff.append(value)
-  return diff
-
-# invert differenced value
-def inverse_difference(history, yhat, interval=1):
-  return yhat + history[-interval]
+from champagne.data_loader import load_series
+from champagne.model_cache import FitCache
+from champagne.results_store import ResultsStore, record_walk_forward
 
 # load data
-series = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
-
+series = load_series()
 # prepare data
 X = series.values
 X = X.astype('float32')
 train_size = int(len(X) * 0.50)
-train, test = X[0:train_size], X[train_size:]
-# walk-forward validation
-history = [x for x in train]
-predictions = list()
-for i in range(len(test)):
-  # difference data
-  months_in_year = 12
-  diff = difference(history, months_in_year)
-  # predict
-  model = ARIMA(diff, order=(4,0,1))
-  model_fit = model.fit(trend= 'nc' , disp=0)
-  yhat = model_fit.forecast()[0]
-  yhat = inverse_difference(history, yhat, months_in_year)
-  predictions.append(yhat)
-  # observation
-  obs = test[i]
-  history.append(obs)
-# errors
-residuals = [test[i]-predictions[i] for i in range(len(test))]
-residuals = DataFrame(residuals)
+# residuals of the stored walk-forward forecasts
+store = ResultsStore()
+results = record_walk_forward(store, X, (4,0,1), start=train_size, cache=FitCache())
+residuals = DataFrame(results['residual'])
 print(residuals.describe())
 # plot
 pyplot.figure()
@@ -513,25 +345,15 @@ pyplot.show()
 """
 
 # save finalized model
-from pandas import read_csv
+from champagne.data_loader import load_series
 from statsmodels.tsa.arima_model import ARIMA
-import numpy
 
-# monkey patch around bug in ARIMA class
-def __getnewargs__(self):
-  return ((self.endog),(self.k_lags, self.k_diff, self.k_ma))
-ARIMA.__getnewargs__ = __getnewargs__
-
-# create a differenced series
-def difference(dataset, interval=1):
-  diff = list()
-  for i in range(interval, len(dataset)):
-    value = dataset[i] - dataset[i - interval]
-    diff.append(value)
-  return diff
+from champagne.differencing import difference
+from champagne.instrumentation import timed_fit
+from champagne.artifact import ForecastModel
 
 # load data
-series = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
+series = load_series()
 
 # prepare data
 X = series.values
@@ -541,77 +363,54 @@ months_in_year = 12
 diff = difference(X, months_in_year)
 # fit model
 model = ARIMA(diff, order=(4,0,1))
-model_fit = model.fit(trend= 'nc', disp=0)
-# bias constant, could be calculated from in-sample mean residual
-bias = 146.401198
-# save model
-model_fit.save( 'model.pkl' )
-numpy.save('model_bias.npy' , [bias])
+model_fit = timed_fit(model, (4,0,1), 'finalize', trend='nc', disp=0)
+# bias estimated from the in-sample mean residual, updated as observations arrive
+model = ForecastModel.from_fit(model_fit, X, (4,0,1), months_in_year, bias='mean')
+print('Bias: %.3f' % model.bias)
+# save only what forecasting needs: coefficients, state tails and the bias
+model.save('model.json')
 
 """   ### Make Prediction"""
 
 # load finalized model and make a prediction
-from pandas import read_csv
-from statsmodels.tsa.arima_model import ARIMAResults
-import numpy
+from champagne.artifact import ForecastModel
 
-# invert differenced value
-def inverse_difference(history, yhat, interval=1):
-  return yhat + history[-interval]
-series = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
-months_in_year = 12
-model_fit = ARIMAResults.load('model.pkl')
-bias = numpy.load('model_bias.npy')
-yhat = float(model_fit.forecast()[0])
-yhat = bias + inverse_difference(series.values, yhat, months_in_year)
+# the artifact carries the history tail and bias, no data or statsmodels needed
+model = ForecastModel.load('model.json')
+yhat = model.forecast()[0]
 print('Predicted: %.3f' % yhat)
 
 """## Model Validation"""
 
 # load and evaluate the finalized model on the validation dataset
-from pandas import read_csv
+from champagne.data_loader import load_series
 from matplotlib import pyplot
-from statsmodels.tsa.arima_model import ARIMA
-from statsmodels.tsa.arima_model import ARIMAResults
 from sklearn.metrics import mean_squared_error
 from math import sqrt
 import numpy
+from champagne.model_cache import FitCache
+from champagne.artifact import ForecastModel
+from champagne.results_store import ResultsStore, record_walk_forward
 
 # load and prepare datasets
-dataset = read_csv('dataset.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
+dataset = load_series()
 X = dataset.values.astype('float32')
-history = [x for x in X]
 months_in_year = 12
-validation = read_csv('validation.csv', header=None, index_col=0, parse_dates=True, squeeze=True)
+validation = load_series('validation')
 y = validation.values.astype('float32')
 
-# load model
-model_fit = ARIMAResults.load('model.pkl')
-bias = numpy.load('model_bias.npy')
-
-# make first prediction
-predictions = list()
-yhat = float(model_fit.forecast()[0])
-yhat = bias + inverse_difference(history, yhat, months_in_year)
-predictions.append(yhat)
-history.append(y[0])
-print('>Predicted=%.3f, Expected=%.3f' % (yhat, y[0]))
-
-# rolling forecasts
-for i in range(1, len(y)):
-  # difference data
-  months_in_year = 12
-  diff = difference(history, months_in_year)
-  # predict
-  model = ARIMA(diff, order=(4,0,1))
-  model_fit = model.fit(trend= 'nc', disp=0)
-  yhat = model_fit.forecast()[0]
-  yhat = bias + inverse_difference(history, yhat, months_in_year)
-  predictions.append(yhat)
-  # observation
-  obs = y[i]
-  history.append(obs)
-  print( '>Predicted=%.3f, Expected=%.3f' % (yhat, obs))
+# load model, the bias estimator comes with it
+model = ForecastModel.load('model.json')
+bias = model.bias_state.copy()
+
+# rolling forecasts over the validation months, continuing the series'
+# origins in the store; months already recorded are not refitted
+store = ResultsStore()
+results = record_walk_forward(store, numpy.concatenate([X, y]), (4,0,1), start=len(X),
+                              interval=months_in_year, cache=FitCache(), stage='validation')
+predictions = bias.correct(results['prediction'], results['residual'])
+for yhat, obs in zip(predictions, y):
+  print('>Predicted=%.3f, Expected=%.3f' % (yhat, obs))
 # report performance
 rmse = sqrt(mean_squared_error(y, predictions))
 print('RMSE: %.3f' % rmse)
@@ -619,6 +418,16 @@ pyplot.plot(y)
 pyplot.plot(predictions, color= 'red')
 pyplot.show()
 
+# forecast all validation months from a single fit, with 95% prediction intervals
+from champagne.horizon import forecast_horizon
+yhat, stderr, conf_int = forecast_horizon(X, steps=len(y), order=(4,0,1), interval=months_in_year, bias=model.bias)
+rmse = sqrt(mean_squared_error(y, yhat))
+print('Horizon RMSE: %.3f' % rmse)
+pyplot.plot(y)
+pyplot.plot(yhat, color= 'red')
+pyplot.fill_between(range(len(y)), conf_int[:, 0], conf_int[:, 1], color='red', alpha=0.2)
+pyplot.show()
+
 """* Loading and validating the finalized model over the 12 months of forecast sales graph looks satistying.
 * Therefore the plot of the expected values is represented in Blue and the predictions in Red for the validation dataset.
 
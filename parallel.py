@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""The process pool shared by the champagne, hmp and etl packages.
+
+It sits beside the three packages rather than in any of them and uses the
+standard library only, so the HMP and ETL notebook helpers do not depend on
+the forecasting package.
+
+pool_map() runs a task function over an iterable of tasks and yields the
+results, either in task order or as they finish:
+
+  * in order, at most `ahead` tasks per worker are in flight and tasks are
+    taken from the iterable only as results are consumed, so memory stays
+    bounded on long streams and a task built from earlier results (the
+    warm starts of cross_validation) sees them;
+  * unordered, the tasks go to imap_unordered and results stream back as
+    each task finishes.
+
+The pool is torn down at once on Ctrl-C, on an error, or when the caller
+stops iterating early, and closed and joined otherwise. With one worker
+the tasks run in this process, without a pool.
+"""
+import os
+import signal
+from collections import deque
+from multiprocessing import Pool
+
+# workers leave Ctrl-C to the parent, which tears the pool down
+def ignore_sigint():
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+# the number of workers to use, all cores by default
+def worker_count(workers=None):
+  return workers or os.cpu_count() or 1
+
+# func applied to every task on a pool of workers, results yielded as they come
+def pool_map(func, tasks, workers=None, initializer=ignore_sigint, initargs=(), ordered=True, ahead=2):
+  workers = worker_count(workers)
+  if workers == 1:
+    for task in tasks:
+      yield func(task)
+    return
+  pool = Pool(workers, initializer=initializer, initargs=initargs)
+  try:
+    if ordered:
+      tasks, pending = iter(tasks), deque()
+      while True:
+        while len(pending) < ahead * workers:
+          try:
+            task = next(tasks)
+          except StopIteration:
+            break
+          pending.append(pool.apply_async(func, (task,)))
+        if not pending:
+          break
+        yield pending.popleft().get()
+    else:
+      for result in pool.imap_unordered(func, tasks):
+        yield result
+  except BaseException:
+    # Ctrl-C, a failed task or the caller closing the generator
+    pool.terminate()
+    raise
+  else:
+    pool.close()
+  finally:
+    pool.join()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""ForecastModel's forecasts against the statsmodels results it was built from."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+import numpy
+from champagne.artifact import ForecastModel
+from champagne.differencing import difference, inverse_difference_steps
+
+try:
+  from statsmodels.tsa.arima.model import ARIMA
+except ImportError:
+  ARIMA = None
+
+# monthly series with a trend, a yearly season and ARMA noise, summed if integrated
+def monthly(n=120, seed=0, integrated=False):
+  rng = numpy.random.default_rng(seed)
+  e = rng.normal(scale=300.0, size=n)
+  noise = numpy.zeros(n)
+  for t in range(1, n):
+    noise[t] = 0.5 * noise[t - 1] + e[t] + 0.3 * e[t - 1]
+  if integrated:
+    noise = numpy.cumsum(noise)
+  t = numpy.arange(n)
+  return 5000.0 + 20.0 * t + 2000.0 * numpy.sin(2 * numpy.pi * t / 12) + noise
+
+# statsmodels fit of the seasonally differenced series, trend='n' as the pipeline fits
+def fit(X, order, interval=12):
+  with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    return ARIMA(difference(X, interval), order=order, trend='n').fit()
+
+@unittest.skipIf(ARIMA is None, 'statsmodels is not installed')
+class ForecastModelParity(unittest.TestCase):
+
+  def check(self, order, steps=18, integrated=False):
+    X = monthly(integrated=integrated)
+    model_fit = fit(X, order)
+    model = ForecastModel.from_fit(model_fit, X, order)
+    expected = inverse_difference_steps(X, model_fit.forecast(steps), 12)
+    numpy.testing.assert_allclose(model.forecast(steps), expected, rtol=1e-6)
+
+  def test_arma(self):
+    self.check((2, 0, 1))
+
+  def test_integrated(self):
+    self.check((1, 1, 1), integrated=True)
+
+  def test_ar(self):
+    self.check((3, 0, 0))
+
+  # append() without refitting matches the fit filtered over the longer history
+  def test_append(self):
+    X = monthly(132)
+    order = (2, 0, 1)
+    model_fit = fit(X[:120], order)
+    model = ForecastModel.from_fit(model_fit, X[:120], order)
+    for obs in X[120:]:
+      model.append(obs)
+    with warnings.catch_warnings():
+      warnings.simplefilter('ignore')
+      extended = model_fit.append(difference(X, 12)[108:])
+    expected = inverse_difference_steps(X, extended.forecast(6), 12)
+    numpy.testing.assert_allclose(model.forecast(6), expected, rtol=1e-6)
+
+  # the saved artifact forecasts the same after loading
+  def test_round_trip(self):
+    X = monthly()
+    model = ForecastModel.from_fit(fit(X, (2, 0, 1)), X, (2, 0, 1), bias=165.0)
+    folder = tempfile.mkdtemp()
+    try:
+      path = os.path.join(folder, 'model.json')
+      model.save(path)
+      with open(path) as f:
+        self.assertEqual(json.load(f)['version'], 2)
+      self.assertEqual(ForecastModel.load(path).forecast(12), model.forecast(12))
+    finally:
+      shutil.rmtree(folder)
+
+if __name__ == '__main__':
+  unittest.main()
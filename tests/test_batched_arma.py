@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""fit_arma() against statsmodels' ARIMA fitted one series at a time.
+
+FitArmaParity compares with the state-space ARIMA of current statsmodels;
+ArimaModelParity with the arima_model CSS-MLE fit the pipeline makes through
+champagne.arima, where the installed statsmodels still provides it. Both
+maximize the same exact Kalman-filter likelihood.
+"""
+import unittest
+import warnings
+import numpy
+from champagne import arima
+from champagne.batched_arma import fit_arma
+
+try:
+  from statsmodels.tsa.arima.model import ARIMA
+except ImportError:
+  ARIMA = None
+
+# n rows of an ARMA process with the given coefficients, after a burn-in
+def simulate(ar, ma, n, rows, seed=0):
+  rng = numpy.random.default_rng(seed)
+  burn = 200
+  e = rng.normal(size=(rows, n + burn))
+  Y = numpy.zeros_like(e)
+  for t in range(n + burn):
+    Y[:, t] = e[:, t]
+    for i, phi in enumerate(ar):
+      if t > i:
+        Y[:, t] += phi * Y[:, t - 1 - i]
+    for j, theta in enumerate(ma):
+      if t > j:
+        Y[:, t] += theta * e[:, t - 1 - j]
+  return Y[:, burn:]
+
+# statsmodels' fit of one series, trend='n' as the pipeline fits
+def reference(y, order):
+  with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    return ARIMA(y, order=order, trend='n').fit()
+
+# the pipeline's fit of one series: arima_model's CSS-MLE, trend='nc'
+def pipeline_reference(y, order):
+  with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    return arima.ARIMA(y, order).fit(trend='nc', disp=0)
+
+@unittest.skipIf(ARIMA is None, 'statsmodels is not installed')
+class FitArmaParity(unittest.TestCase):
+
+  def fit_reference(self, y, order):
+    ref = reference(y, order)
+    return ref, ref.forecast(3)
+
+  def check(self, Y, order, tol=1e-3, llf_tol=1e-4):
+    p, d, q = order
+    fitted = fit_arma(Y, order)
+    for i, y in enumerate(Y):
+      ref, forecast = self.fit_reference(y, order)
+      numpy.testing.assert_allclose(fitted.arparams[i], ref.arparams, atol=tol)
+      numpy.testing.assert_allclose(fitted.maparams[i], ref.maparams, atol=tol)
+      # the same optimum or a better one
+      self.assertGreaterEqual(fitted.llf[i], ref.llf - llf_tol)
+      numpy.testing.assert_allclose(fitted.forecast(3)[0][i], forecast, rtol=1e-3, atol=1e-2)
+
+  def test_arma(self):
+    self.check(simulate([0.6, -0.2], [0.3], 200, 4), (2, 0, 1))
+
+  def test_integrated(self):
+    Y = numpy.cumsum(simulate([0.5], [0.2], 150, 3, seed=1), axis=1)
+    self.check(Y, (1, 1, 1))
+
+  # rows padded with NaN at the start give the fits of the unpadded series
+  def test_padded_rows(self):
+    Y = simulate([0.5], [], 120, 3, seed=2)
+    padded = Y.copy()
+    padded[1, :30] = numpy.nan
+    full = fit_arma(padded, (1, 0, 0))
+    alone = fit_arma(Y[1:2, 30:], (1, 0, 0))
+    numpy.testing.assert_allclose(full.arparams[1], alone.arparams[0], atol=1e-6)
+
+class ArimaModelParity(FitArmaParity):
+
+  # arima_model was removed in statsmodels 0.14 and is a stub raising
+  # NotImplementedError in 0.12 and 0.13
+  @classmethod
+  def setUpClass(cls):
+    try:
+      pipeline_reference(simulate([0.5], [], 60, 1)[0], (1, 0, 0))
+    except (ImportError, NotImplementedError):
+      raise unittest.SkipTest('statsmodels.tsa.arima_model is not available')
+
+  # l-bfgs-b in arima_model stops earlier than fit_arma's BFGS
+  def check(self, Y, order):
+    FitArmaParity.check(self, Y, order, tol=5e-3, llf_tol=1e-3)
+
+  def fit_reference(self, y, order):
+    ref = pipeline_reference(y, order)
+    return ref, ref.forecast(3)[0]
+
+  # the module's (4,0,1), on a process it identifies: on short, weakly
+  # determined series the two fits can end on different local optima
+  def test_pipeline_order(self):
+    Y = simulate([0.6, -0.3, 0.2, -0.1], [0.5], 200, 3, seed=3)
+    self.check(Y, (4, 0, 1))
+
+if __name__ == '__main__':
+  unittest.main()
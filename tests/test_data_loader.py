@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""The cached data loader, with local CSV files as the source."""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from champagne import data_loader
+
+try:
+  import pandas
+except ImportError:
+  pandas = None
+
+# a monthly sales CSV in the layout of monthly_champagne_sales.csv
+def write_csv(path, values):
+  with open(path, 'w') as f:
+    f.write('Month,Sales\n')
+    for i, value in enumerate(values):
+      f.write('%d-%02d,%d\n' % (1964 + i // 12, i % 12 + 1, value))
+
+@unittest.skipIf(pandas is None, 'pandas is not installed')
+class DataLoaderTest(unittest.TestCase):
+
+  def setUp(self):
+    self.folder = tempfile.mkdtemp()
+    self.cache = os.path.join(self.folder, 'cache')
+    self.first = os.path.join(self.folder, 'first.csv')
+    self.second = os.path.join(self.folder, 'second.csv')
+    write_csv(self.first, range(1000, 1036))
+    write_csv(self.second, range(2000, 2048))
+    data_loader._loaded.clear()
+
+  def tearDown(self):
+    data_loader._loaded.clear()
+    shutil.rmtree(self.folder)
+
+  def load(self, source, **kwargs):
+    return data_loader.load(source, self.cache, **kwargs)
+
+  def test_split(self):
+    arrays = self.load(self.first)
+    self.assertEqual(arrays['dataset'].tolist(), list(range(1000, 1024)))
+    self.assertEqual(arrays['validation'].tolist(), list(range(1024, 1036)))
+    self.assertEqual(str(arrays['validation_dates'][0]), '1966-01')
+    self.assertEqual(arrays['dataset'].dtype, numpy.float32)
+    self.assertIs(self.load(self.first), arrays)
+
+  # another source gives its own data, not the cached arrays of the first
+  def test_other_source(self):
+    first = self.load(self.first)
+    second = self.load(self.second)
+    self.assertEqual(second['dataset'][0], 2000)
+    self.assertEqual(len(second['dataset']), 36)
+    # arrays mapped before the rebuild keep their values
+    self.assertEqual(first['dataset'][0], 1000)
+    data_loader._loaded.clear()
+    self.assertEqual(self.load(self.first)['dataset'][0], 1000)
+
+  def test_changed_file(self):
+    self.load(self.first)
+    write_csv(self.first, range(3000, 3040))
+    self.assertEqual(self.load(self.first)['dataset'][0], 3000)
+
+  def test_validation_size(self):
+    self.assertEqual(len(self.load(self.first, validation_size=6)['validation']), 6)
+    self.assertEqual(len(self.load(self.first)['validation']), 12)
+
+  # a cache built from a source is reused without reading the source again
+  def test_reused(self):
+    self.load(self.first)
+    data_loader._loaded.clear()
+    modified = os.path.getmtime(os.path.join(self.cache, 'dataset.npy'))
+    self.load(self.first)
+    self.assertEqual(os.path.getmtime(os.path.join(self.cache, 'dataset.npy')), modified)
+
+if __name__ == '__main__':
+  unittest.main()
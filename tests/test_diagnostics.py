@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""The batched diagnostics against statsmodels' stattools, series by series."""
+import unittest
+import warnings
+import numpy
+from champagne import diagnostics
+
+try:
+  from statsmodels.tsa import stattools
+except ImportError:
+  stattools = None
+
+# rows of white noise, an AR(1), a random walk and a trending walk
+def sample(n=150, seed=0):
+  rng = numpy.random.default_rng(seed)
+  e = rng.normal(size=(4, n))
+  ar = numpy.zeros(n)
+  for t in range(1, n):
+    ar[t] = 0.7 * ar[t - 1] + e[1, t]
+  walk = numpy.cumsum(e[2])
+  trend = numpy.cumsum(e[3] + 0.3)
+  return numpy.vstack([e[0], ar, walk, trend])
+
+# adfuller's plain tuple, without the warning newer statsmodels raises about it
+def adfuller(x, **kwargs):
+  with warnings.catch_warnings():
+    warnings.simplefilter('ignore', FutureWarning)
+    return stattools.adfuller(x, **kwargs)
+
+@unittest.skipIf(stattools is None, 'statsmodels is not installed')
+class DiagnosticsParity(unittest.TestCase):
+
+  def setUp(self):
+    self.X = sample()
+
+  def test_acf(self):
+    values = diagnostics.acf(self.X, nlags=25)
+    for x, row in zip(self.X, values):
+      numpy.testing.assert_allclose(row, stattools.acf(x, nlags=25, fft=True), atol=1e-10)
+
+  def test_pacf(self):
+    values = diagnostics.pacf(self.X, nlags=20)
+    for x, row in zip(self.X, values):
+      numpy.testing.assert_allclose(row, stattools.pacf(x, nlags=20, method='ldb'), atol=1e-10)
+
+  def test_adf(self):
+    for regression in ('n', 'c', 'ct'):
+      stat, pvalue, usedlag, nobs, crit = diagnostics.adf(self.X, regression=regression)
+      for i, x in enumerate(self.X):
+        ref = adfuller(x, regression=regression, autolag='AIC')
+        self.assertAlmostEqual(stat[i], ref[0], places=8)
+        self.assertAlmostEqual(pvalue[i], ref[1], places=8)
+        self.assertEqual(usedlag[i], ref[2])
+        self.assertEqual(nobs[i], ref[3])
+        numpy.testing.assert_allclose(crit[i], [ref[4]['1%'], ref[4]['5%'], ref[4]['10%']], atol=1e-10)
+
+  def test_adf_fixed_lag(self):
+    stat, pvalue, usedlag, nobs, crit = diagnostics.adf(self.X, maxlag=4, autolag=False)
+    for i, x in enumerate(self.X):
+      ref = adfuller(x, maxlag=4, autolag=None)
+      self.assertAlmostEqual(stat[i], ref[0], places=8)
+      self.assertAlmostEqual(pvalue[i], ref[1], places=8)
+      self.assertEqual(usedlag[i], ref[2])
+
+if __name__ == '__main__':
+  unittest.main()
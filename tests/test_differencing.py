@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""The differencing kernels against the plain-list loops they replaced."""
+import unittest
+import numpy
+from champagne.differencing import difference, inverse_difference, inverse_difference_steps
+
+# the notebook's difference(): one list element per observation
+def difference_loop(dataset, interval=1):
+  return [dataset[i] - dataset[i - interval] for i in range(interval, len(dataset))]
+
+# an h-step forecast inverted one step at a time, each step appended to the history
+def inverse_loop(history, forecasts, interval=1):
+  history = list(history)
+  result = list()
+  for yhat in forecasts:
+    value = inverse_difference(history, yhat, interval)
+    history.append(value)
+    result.append(value)
+  return result
+
+class DifferencingTest(unittest.TestCase):
+
+  def setUp(self):
+    rng = numpy.random.default_rng(0)
+    self.X = (5000 + 1000 * rng.normal(size=60)).astype('float32')
+
+  def test_difference(self):
+    for interval in (1, 12):
+      numpy.testing.assert_array_equal(difference(self.X, interval),
+                                        numpy.array(difference_loop(self.X, interval)))
+    self.assertEqual(difference(self.X, 12).dtype, numpy.float32)
+
+  # fewer observations than the interval give no differences
+  def test_difference_short(self):
+    for n in range(13):
+      self.assertEqual(len(difference(self.X[:n], 12)), max(n - 12, 0))
+
+  def test_difference_rows_and_out(self):
+    X = numpy.stack([self.X, self.X[::-1]])
+    out = numpy.empty((2, 48), dtype='float32')
+    result = difference(X, 12, out=out)
+    self.assertIs(result, out)
+    numpy.testing.assert_array_equal(out[1], difference(self.X[::-1], 12))
+
+  # horizons shorter than, equal to and past one interval
+  def test_inverse_steps(self):
+    rng = numpy.random.default_rng(1)
+    for interval in (1, 4, 12):
+      for h in (1, interval, interval + 1, 2 * interval + 5):
+        forecasts = rng.normal(size=h)
+        numpy.testing.assert_allclose(inverse_difference_steps(self.X, forecasts, interval),
+                                      inverse_loop(self.X, forecasts, interval), rtol=1e-12)
+
+  def test_inverse_steps_rows_and_out(self):
+    rng = numpy.random.default_rng(2)
+    history = numpy.stack([self.X, self.X * 2]).astype('float64')
+    forecasts = rng.normal(size=(2, 30))
+    out = numpy.empty((2, 30))
+    result = inverse_difference_steps(history, forecasts, 12, out=out)
+    self.assertIs(result, out)
+    for row in range(2):
+      numpy.testing.assert_allclose(out[row], inverse_loop(history[row], forecasts[row], 12))
+
+  # difference and inversion round trip back to the observations
+  def test_round_trip(self):
+    diff = difference(self.X.astype('float64'), 12)
+    numpy.testing.assert_allclose(inverse_difference_steps(self.X[:12], diff, 12), self.X[12:],
+                                  rtol=1e-12)
+
+if __name__ == '__main__':
+  unittest.main()
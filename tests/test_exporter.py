@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""The streaming exporter: CRC combination and the archives it writes."""
+import base64
+import gzip
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import zipfile
+import zlib
+from etl.exporter import crc32_combine, export, json_lines
+
+try:
+  import pyarrow
+  import pyarrow.parquet
+except ImportError:
+  pyarrow = None
+
+class Crc32Combine(unittest.TestCase):
+
+  def test_matches_crc32_of_concatenation(self):
+    rng = random.Random(0)
+    for len1, len2 in [(0, 0), (0, 5), (5, 0), (1, 1), (100, 3), (3, 1000), (4096, 65537)]:
+      a = bytes(rng.getrandbits(8) for _ in range(len1))
+      b = bytes(rng.getrandbits(8) for _ in range(len2))
+      self.assertEqual(crc32_combine(zlib.crc32(a), zlib.crc32(b), len(b)), zlib.crc32(a + b))
+
+  # folding chunk after chunk, as export() does
+  def test_running_combination(self):
+    rng = random.Random(1)
+    chunks = [bytes(rng.getrandbits(8) for _ in range(rng.randrange(200))) for _ in range(20)]
+    crc = 0
+    for chunk in chunks:
+      crc = crc32_combine(crc, zlib.crc32(chunk), len(chunk))
+    self.assertEqual(crc, zlib.crc32(b''.join(chunks)))
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class Export(unittest.TestCase):
+
+  def setUp(self):
+    self.folder = tempfile.mkdtemp()
+    n = 250
+    self.table = pyarrow.table({
+      'id': list(range(n)),
+      'name': [None if i % 7 == 0 else u'row %d é' % i for i in range(n)],
+      'value': [i * 0.5 for i in range(n)]})
+    self.expected = json_lines(self.table)
+
+  def tearDown(self):
+    shutil.rmtree(self.folder)
+
+  def path(self, name):
+    return os.path.join(self.folder, name)
+
+  # the archive decoded from the .base64 file, which keeps 76-column lines
+  def decoded(self, path):
+    with open(path, 'rb') as f:
+      lines = f.read().splitlines()
+    self.assertTrue(all(len(line) <= 76 for line in lines))
+    self.assertTrue(all(len(line) == 76 for line in lines[:-1]))
+    return base64.b64decode(b''.join(lines))
+
+  def test_zip(self):
+    for workers in (1, 2):
+      output = self.path('a2_m1.json.zip')
+      stats = export(self.table, output, base64_output=output + '.base64',
+                     rows_per_chunk=37, workers=workers)
+      self.assertEqual(stats['rows'], self.table.num_rows)
+      self.assertEqual(stats['bytes'], len(self.expected))
+      with zipfile.ZipFile(output) as archive:
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), ['a2_m1.json/part-00000.json'])
+        self.assertEqual(archive.read('a2_m1.json/part-00000.json'), self.expected)
+      with open(output, 'rb') as f:
+        self.assertEqual(self.decoded(output + '.base64'), f.read())
+
+  def test_gzip(self):
+    output = self.path('a2.json.gz')
+    export(self.table, output, format='gzip', rows_per_chunk=64, workers=2)
+    with gzip.open(output, 'rb') as f:
+      self.assertEqual(f.read(), self.expected)
+
+  def test_parquet_source(self):
+    source = self.path('a2.parquet')
+    pyarrow.parquet.write_table(self.table, source)
+    output = self.path('a2.json.zip')
+    export(source, output, columns=['id', 'value'], rows_per_chunk=50, workers=2)
+    with zipfile.ZipFile(output) as archive:
+      self.assertIsNone(archive.testzip())
+      data = archive.read(archive.namelist()[0])
+    self.assertEqual(data, json_lines(self.table.select(['id', 'value'])))
+
+  def test_empty(self):
+    output = self.path('empty.json.zip')
+    export(self.table.slice(0, 0), output, workers=2)
+    with zipfile.ZipFile(output) as archive:
+      self.assertIsNone(archive.testzip())
+      self.assertEqual(archive.read(archive.namelist()[0]), b'')
+
+  def test_unknown_format(self):
+    with self.assertRaises(ValueError):
+      export(self.table, self.path('a2.json.bz2'), format='bz2')
+
+if __name__ == '__main__':
+  unittest.main()
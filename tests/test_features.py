@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""The NumPy feature pipeline against the output Spark gives on the same rows.
+
+The expected values are what pyspark.ml 3 produces for this fixture: the
+StringIndexer order (frequency, ties alphabetical), dropLast one-hot
+vectors written out dense, and L1-normalised features with zero rows left
+as they are.
+"""
+import unittest
+import numpy
+from hmp.features import (Normalizer, OneHotEncoder, OneHotEncoderModel, Pipeline,
+                          StringIndexer, StringIndexerModel, VectorAssembler)
+
+try:
+  import pyarrow
+except ImportError:
+  pyarrow = None
+
+# seven rows of accelerometer readings; a: 3 rows, b: 2, c and d: 1
+def fixture():
+  return {'class': numpy.array(['b', 'a', 'c', 'a', 'b', 'a', 'd']),
+          'x': numpy.array([1, 0, 3, 10, 0, 2, 5], dtype='int64'),
+          'y': numpy.array([2, 0, 1, 20, 0, 2, 5], dtype='int64'),
+          'z': numpy.array([-3, 0, 0, 30, 4, 2, 5], dtype='int64')}
+
+# labels ordered by frequency, ties alphabetically
+INDEX = [1.0, 0.0, 2.0, 0.0, 1.0, 0.0, 3.0]
+LABELS = {'frequencyDesc': ['a', 'b', 'c', 'd'], 'frequencyAsc': ['c', 'd', 'b', 'a'],
+          'alphabetDesc': ['d', 'c', 'b', 'a'], 'alphabetAsc': ['a', 'b', 'c', 'd']}
+# (3,[1],[1.0]), (3,[0],[1.0]), ... and (3,[],[]) for the dropped last class d
+ONE_HOT = [[0, 1, 0], [1, 0, 0], [0, 0, 1], [1, 0, 0], [0, 1, 0], [1, 0, 0], [0, 0, 0]]
+NORMALIZED = [[1 / 6., 2 / 6., -3 / 6.], [0, 0, 0], [0.75, 0.25, 0], [1 / 6., 2 / 6., 3 / 6.],
+              [0, 0, 1], [1 / 3., 1 / 3., 1 / 3.], [1 / 3., 1 / 3., 1 / 3.]]
+
+def pipeline():
+  return Pipeline([StringIndexer(inputCol='class', outputCol='classIndex'),
+                   OneHotEncoder(inputCol='classIndex', outputCol='categoryVec'),
+                   VectorAssembler(inputCols=['x', 'y', 'z'], outputCol='features'),
+                   Normalizer(inputCol='features', outputCol='features_norm', p=1.0)])
+
+class StringIndexerTest(unittest.TestCase):
+
+  def test_order_types(self):
+    for order_type, labels in LABELS.items():
+      model = StringIndexer('class', 'classIndex', stringOrderType=order_type).fit(fixture())
+      self.assertEqual(model.labels, labels)
+      index = model.transform(fixture())['classIndex']
+      self.assertEqual(index.dtype, numpy.float64)
+      self.assertEqual(index.tolist(), [float(labels.index(c)) for c in fixture()['class']])
+
+  # unseen labels under each handleInvalid mode
+  def test_unseen_labels(self):
+    data = {'class': numpy.array(['a', 'e', 'd', 'e']), 'x': numpy.arange(4)}
+    with self.assertRaises(ValueError):
+      StringIndexerModel(LABELS['frequencyDesc'], 'class', 'classIndex').transform(data)
+    skip = StringIndexerModel(LABELS['frequencyDesc'], 'class', 'classIndex', 'skip').transform(data)
+    self.assertEqual(skip['classIndex'].tolist(), [0.0, 3.0])
+    self.assertEqual(skip['x'].tolist(), [0, 2])
+    keep = StringIndexerModel(LABELS['frequencyDesc'], 'class', 'classIndex', 'keep').transform(data)
+    self.assertEqual(keep['classIndex'].tolist(), [0.0, 4.0, 3.0, 4.0])
+
+class OneHotEncoderTest(unittest.TestCase):
+
+  def setUp(self):
+    self.data = {'classIndex': numpy.array(INDEX)}
+
+  def test_drop_last(self):
+    model = OneHotEncoder('classIndex', 'categoryVec').fit(self.data)
+    self.assertEqual(model.size, 3)
+    self.assertEqual(model.transform(self.data)['categoryVec'].tolist(), ONE_HOT)
+
+  def test_keep_last(self):
+    vectors = OneHotEncoder('classIndex', 'categoryVec', dropLast=False).fit(self.data) \
+      .transform(self.data)['categoryVec']
+    self.assertEqual(vectors.tolist(), numpy.eye(4)[numpy.array(INDEX, dtype=int)].tolist())
+
+  # an index past the fitted categories: an error, or the extra category under 'keep'
+  def test_invalid_index(self):
+    data = {'classIndex': numpy.array([0.0, 4.0, 3.0])}
+    with self.assertRaises(ValueError):
+      OneHotEncoderModel(4, 'classIndex', 'categoryVec').transform(data)
+    # with dropLast the extra category is the dropped one: all zeros
+    keep = OneHotEncoderModel(4, 'classIndex', 'categoryVec', handleInvalid='keep')
+    self.assertEqual(keep.transform(data)['categoryVec'].tolist(),
+                     [[1, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 1]])
+    keep = OneHotEncoderModel(4, 'classIndex', 'categoryVec', dropLast=False, handleInvalid='keep')
+    self.assertEqual(keep.transform(data)['categoryVec'].tolist(),
+                     [[1, 0, 0, 0, 0], [0, 0, 0, 0, 1], [0, 0, 0, 1, 0]])
+
+class NormalizerTest(unittest.TestCase):
+
+  def test_norms(self):
+    vectors = numpy.array([[3.0, -4.0], [0.0, 0.0], [1.0, 1.0]])
+    data = {'features': vectors}
+    for p, norms in ((1, [7, 1, 2]), (2, [5, 1, 2 ** 0.5]), (float('inf'), [4, 1, 1]),
+                     (3, [(27 + 64) ** (1 / 3.), 1, 2 ** (1 / 3.)])):
+      result = Normalizer('features', 'norm', p=p).transform(data)['norm']
+      numpy.testing.assert_allclose(result, vectors / numpy.array(norms)[:, None])
+
+  def test_p_below_one(self):
+    with self.assertRaises(ValueError):
+      Normalizer('features', 'norm', p=0.5)
+
+class PipelineTest(unittest.TestCase):
+
+  def check(self, result):
+    self.assertEqual(result['classIndex'].tolist(), INDEX)
+    self.assertEqual(result['categoryVec'].tolist(), ONE_HOT)
+    self.assertEqual(result['features'].tolist(),
+                     numpy.stack([fixture()[c] for c in 'xyz'], axis=1).astype(float).tolist())
+    numpy.testing.assert_allclose(result['features_norm'], NORMALIZED, atol=1e-15)
+
+  def test_pipeline(self):
+    self.check(pipeline().fit(fixture()).transform(fixture()))
+
+  # fitted and transformed over chunks, the same as over the whole dataset
+  def test_chunks(self):
+    data = fixture()
+    chunks = [dict((name, values[i:i + 3]) for name, values in data.items()) for i in (0, 3, 6)]
+    model = pipeline().fit(chunks)
+    parts = list(model.transform(chunks))
+    self.check(dict((name, numpy.concatenate([part[name] for part in parts]))
+                    for name in parts[0]))
+
+  @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+  def test_arrow_table(self):
+    table = pyarrow.table(fixture())
+    self.check(pipeline().fit(table).transform(table))
+    batches = table.to_batches(max_chunksize=2)
+    parts = list(pipeline().fit(batches).transform(batches))
+    self.check(dict((name, numpy.concatenate([part[name] for part in parts]))
+                    for name in parts[0]))
+
+if __name__ == '__main__':
+  unittest.main()
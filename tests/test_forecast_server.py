@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""The forecast service: requests, appends and reloads of the model file."""
+import asyncio
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from champagne import forecast_server
+from champagne.artifact import ForecastModel
+from champagne.forecast_server import ForecastService, serve_connection, serve_stdin
+
+# an ARMA(1,1) artifact on the seasonal difference, n_obs observations seen
+def model(n_obs=24):
+  history = [100.0 + 10 * (i % 12) + i for i in range(n_obs)]
+  return ForecastModel((1, 0, 1), 12, 0.0, [0.5], [0.2], [12.0], [0.5], [], history[-12:],
+                       bias=1.0, n_obs=n_obs)
+
+class ForecastServiceTest(unittest.TestCase):
+
+  def setUp(self):
+    self.folder = tempfile.mkdtemp()
+    self.path = os.path.join(self.folder, 'model.json')
+    model().save(self.path)
+    self.service = ForecastService(self.path)
+
+  def tearDown(self):
+    shutil.rmtree(self.folder)
+
+  def test_forecast(self):
+    status, payload = self.service.handle('GET', '/forecast?steps=3')
+    self.assertEqual(status, 200)
+    self.assertEqual(payload, {'forecast': model().forecast(3), 'n_obs': 24})
+    self.assertEqual(self.service.handle('GET', '/forecast?steps=0')[0], 400)
+    self.assertEqual(self.service.handle('GET', '/nowhere')[0], 404)
+
+  # a bad value in a batch leaves the state as it was
+  def test_append_validates_first(self):
+    before = self.service.forecast(2)
+    for body in (b'{"values": [1.0, "x"]}', b'{"values": [1.0, NaN]}', b'{"values": 5}',
+                 b'{"other": 1}', b'not json'):
+      self.assertEqual(self.service.handle('POST', '/append', body)[0], 400)
+    self.assertEqual(self.service.forecast(2), before)
+    status, payload = self.service.handle('POST', '/append', b'{"values": [250.0, 260.0]}')
+    self.assertEqual(payload, {'appended': 2, 'n_obs': 26})
+
+  # observations appended after the new model's last one are replayed onto it
+  def test_reload_replays(self):
+    self.service.append([250.0, 260.0, 270.0])
+    expected = model()
+    for obs in (250.0, 260.0, 270.0):
+      expected.append(obs)
+    saved = model()
+    saved.append(250.0)
+    saved.save(self.path)
+    status, payload = self.service.handle('POST', '/reload')
+    self.assertEqual(payload, {'reloaded': True, 'n_obs': 27, 'replayed': 2})
+    self.assertEqual(self.service.forecast(4)['forecast'], expected.forecast(4))
+
+  # a missing model file is an error response, not the end of the service
+  def test_missing_file(self):
+    os.remove(self.path)
+    status, payload = self.service.handle('POST', '/reload')
+    self.assertEqual(status, 503)
+    self.assertIn('FileNotFoundError', payload['error'])
+    self.assertFalse(self.service.reload_if_changed())
+    self.assertEqual(self.service.handle('GET', '/forecast')[0], 200)
+    stdout = io.StringIO()
+    serve_stdin(self.service, io.StringIO('reload\nforecast 2\n'), stdout)
+    lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    self.assertIn('error', lines[0])
+    self.assertEqual(len(lines[1]['forecast']), 2)
+
+  def test_half_written_file(self):
+    with open(self.path, 'w') as f:
+      f.write('{"format": "arima-for')
+    self.assertFalse(self.service.reload_if_changed())
+    self.assertEqual(self.service.model.n_obs, 24)
+
+  def test_replay_is_bounded(self):
+    limit = forecast_server.REPLAY_LIMIT
+    self.service.append([300.0] * (limit + 10))
+    self.assertEqual(len(self.service.appended), limit)
+    self.assertEqual(self.service.appended[0][0], 34)
+
+  def test_stdin(self):
+    stdout = io.StringIO()
+    serve_stdin(self.service, io.StringIO('append 250 x\nappend 250\nforecast\nbogus\n'), stdout)
+    lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    self.assertIn('error', lines[0])
+    self.assertEqual(lines[1], {'appended': 1, 'n_obs': 25})
+    self.assertEqual(lines[2]['n_obs'], 25)
+    self.assertIn('error', lines[3])
+
+  def test_http(self):
+    os.remove(self.path)
+    async def exchange():
+      server = await asyncio.start_server(lambda r, w: serve_connection(self.service, r, w),
+                                          '127.0.0.1', 0)
+      port = server.sockets[0].getsockname()[1]
+      reader, writer = await asyncio.open_connection('127.0.0.1', port)
+      responses = list()
+      for request in (b'POST /reload HTTP/1.1\r\n\r\n', b'GET /forecast?steps=2 HTTP/1.1\r\n\r\n'):
+        writer.write(request)
+        status = await reader.readline()
+        headers = dict()
+        while True:
+          line = await reader.readline()
+          if line in (b'\r\n', b''):
+            break
+          name, _, value = line.decode().partition(':')
+          headers[name.lower()] = value.strip()
+        if not status:
+          break
+        body = await reader.readexactly(int(headers['content-length']))
+        responses.append((status.split()[1], json.loads(body)))
+      writer.close()
+      server.close()
+      await server.wait_closed()
+      return responses
+    responses = asyncio.run(asyncio.wait_for(exchange(), 10))
+    self.assertEqual(responses[0][0], b'503')
+    self.assertEqual(responses[1][0], b'200')
+    self.assertEqual(len(responses[1][1]['forecast']), 2)
+
+if __name__ == '__main__':
+  unittest.main()
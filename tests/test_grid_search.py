@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""evaluate_models() result selection and failure reporting."""
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import numpy
+from champagne import grid_search
+
+# a seasonal naive forecast scaled by p instead of an ARIMA fit; order (2, 0, 1) fails
+def forecast_step(X, n, order, interval=12, cache=None, stage='evaluate'):
+  if order == (2, 0, 1):
+    raise numpy.linalg.LinAlgError('SVD did not converge\nin the fit')
+  return X[n - interval] * (1 + 0.01 * order[0]) + order[2]
+
+class EvaluateModelsTest(unittest.TestCase):
+
+  def setUp(self):
+    patcher = mock.patch.object(grid_search, 'forecast_step', forecast_step)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    rng = numpy.random.default_rng(0)
+    t = numpy.arange(72)
+    self.X = 1000 + 200 * numpy.sin(2 * numpy.pi * t / 12) + 10 * rng.normal(size=72)
+
+  # the order with the lowest walk-forward RMSE, scored directly
+  def expected(self):
+    X = self.X.astype('float32')
+    start = len(X) // 2
+    scores = dict()
+    for order in [(p, 0, q) for p in (0, 1, 2) for q in (0, 1) if (p, q) != (2, 1)]:
+      errors = [X[n] - forecast_step(X, n, order) for n in range(start, len(X))]
+      scores[order] = numpy.sqrt(numpy.mean(numpy.square(errors)))
+    return min(scores, key=scores.get)
+
+  def run_grid(self, **kwargs):
+    out = io.StringIO()
+    with redirect_stdout(out):
+      result = grid_search.evaluate_models(self.X, [0, 1, 2], [0], [0, 1], workers=1, **kwargs)
+    return result, out.getvalue()
+
+  def test_failed_orders_are_reported(self):
+    for split_steps in (False, True):
+      (best_cfg, best_score), output = self.run_grid(split_steps=split_steps)
+      self.assertEqual(best_cfg, self.expected())
+      self.assertIn('ARIMA(2, 0, 1) failed: LinAlgError: SVD did not converge\n', output)
+      self.assertEqual(output.count('RMSE='), 6)
+
+  def test_same_result_either_way(self):
+    self.assertEqual(self.run_grid()[0], self.run_grid(split_steps=True)[0])
+
+if __name__ == '__main__':
+  unittest.main()
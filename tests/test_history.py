@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""SeriesHistory against the growing Python list it replaced."""
+import unittest
+import numpy
+from champagne.differencing import difference
+from champagne.history import SeriesHistory
+
+class SeriesHistoryTest(unittest.TestCase):
+
+  def setUp(self):
+    rng = numpy.random.default_rng(0)
+    self.X = (5000 + 1000 * rng.normal(size=300)).astype('float32')
+
+  # the store after each append, against list + difference() of the same observations
+  def check(self, history, seen, maxlen=None):
+    kept = seen if maxlen is None else seen[max(0, len(seen) - maxlen):]
+    numpy.testing.assert_array_equal(history.values(), kept)
+    numpy.testing.assert_array_equal(history.diff(), difference(numpy.array(kept), 12))
+    self.assertEqual(len(history), len(kept))
+    self.assertEqual(history.count, len(seen))
+    self.assertTrue(history.values().flags.c_contiguous)
+    self.assertTrue(history.diff().flags.c_contiguous)
+
+  def test_append_grows(self):
+    history = SeriesHistory(self.X[:20], capacity=16)
+    seen = list(self.X[:20])
+    for obs in self.X[20:]:
+      history.append(obs)
+      seen.append(obs)
+      self.check(history, seen)
+
+  # in maxlen mode the buffers slide and the views keep the last maxlen values
+  def test_maxlen_slides(self):
+    for start in (0, 5, 40, 100):
+      history = SeriesHistory(self.X[:start], maxlen=40)
+      seen = list(self.X[:start])
+      self.check(history, seen, 40)
+      for obs in self.X[start:]:
+        history.append(obs)
+        seen.append(obs)
+        self.check(history, seen, 40)
+      self.assertEqual(len(history._values.data), 80)
+
+  def test_views(self):
+    history = SeriesHistory(self.X[:50])
+    numpy.testing.assert_array_equal(history.tail(5), self.X[45:50])
+    numpy.testing.assert_array_equal(history.tail(100), self.X[:50])
+    numpy.testing.assert_array_equal(history.diff_tail(3), difference(self.X[:50], 12)[-3:])
+    self.assertEqual(history[-12], self.X[38])
+    self.assertEqual(numpy.asarray(history).dtype, numpy.float32)
+    self.assertEqual(numpy.asarray(history, dtype='float64').dtype, numpy.float64)
+    # zero-copy: the views share the store's buffer
+    self.assertTrue(numpy.shares_memory(history.values(), history._values.data))
+
+  def test_short_history(self):
+    history = SeriesHistory(self.X[:5])
+    self.assertEqual(len(history.diff()), 0)
+    for obs in self.X[5:14]:
+      history.append(obs)
+    numpy.testing.assert_array_equal(history.diff(), difference(self.X[:14], 12))
+
+  def test_maxlen_must_exceed_interval(self):
+    with self.assertRaises(ValueError):
+      SeriesHistory(maxlen=12)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""HMP file parsing and the local ingestion into the parquet cache."""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from hmp.ingest import discover, ingest, read_cache, read_file, read_manifest
+
+try:
+  import pyarrow
+except ImportError:
+  pyarrow = None
+
+class IngestTest(unittest.TestCase):
+
+  def setUp(self):
+    self.folder = tempfile.mkdtemp()
+    self.root = os.path.join(self.folder, 'HMP_Dataset')
+    self.samples = dict()
+    rng = numpy.random.default_rng(0)
+    for category, n_files in (('Brush_teeth', 2), ('Climb_stairs', 3), ('Drink_glass', 1)):
+      os.makedirs(os.path.join(self.root, category))
+      for i in range(n_files):
+        samples = rng.integers(0, 64, size=(50 + 10 * i, 3)).astype('int32')
+        self.samples[category, 'Accelerometer-%d.txt' % i] = samples
+        self.write(category, 'Accelerometer-%d.txt' % i, '\n'.join(
+          ' '.join(str(v) for v in row) for row in samples.tolist()) + '\n')
+    # not a category, not a sample file
+    os.makedirs(os.path.join(self.root, 'MANUAL'))
+    self.write('Brush_teeth', 'README', 'notes\n')
+    self.cache = os.path.join(self.folder, 'cache')
+
+  def tearDown(self):
+    shutil.rmtree(self.folder)
+
+  def write(self, category, name, text):
+    path = os.path.join(self.root, category, name)
+    with open(path, 'w') as f:
+      f.write(text)
+    return path
+
+  def test_read_file(self):
+    samples = self.samples['Brush_teeth', 'Accelerometer-1.txt']
+    path = os.path.join(self.root, 'Brush_teeth', 'Accelerometer-1.txt')
+    numpy.testing.assert_array_equal(read_file(path), samples)
+    self.assertEqual(read_file(path).dtype, numpy.int32)
+    self.assertEqual(read_file(self.write('Brush_teeth', 'empty.txt', '')).shape, (0, 3))
+    self.assertEqual(read_file(self.write('Brush_teeth', 'crlf.txt', '1 2 3\r\n4 5 6\r\n')).tolist(),
+                     [[1, 2, 3], [4, 5, 6]])
+
+  # a bad token fails the file instead of truncating it, even at a multiple of 3 values
+  def test_strict(self):
+    for text in ('1 2 3\n4 5 6\n7 8 x\n1 2 3\n', '1 2 3\n4 5\n7 8 9\n', '1 2 3 4 5 6\n',
+                 '1 2 3\n4.5 5 6\n'):
+      with self.assertRaises(ValueError):
+        read_file(self.write('Brush_teeth', 'bad.txt', text))
+
+  def test_discover(self):
+    files = discover(self.root)
+    self.assertEqual([(c, s) for c, s, p in files], sorted(self.samples))
+
+  @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+  def test_ingest(self):
+    for workers in (1, 2):
+      manifest = ingest(self.root, self.cache, workers=workers, force=True)
+      self.assertEqual(manifest['rows'], {'Brush_teeth': 110, 'Climb_stairs': 180, 'Drink_glass': 50})
+      table = read_cache(self.cache, classes=['Climb_stairs'])
+      rows = table.to_pydict()
+      for i in range(3):
+        name = 'Accelerometer-%d.txt' % i
+        mask = numpy.array(rows['source']) == name
+        got = numpy.stack([numpy.array(rows[c])[mask] for c in 'xyz'], axis=1)
+        numpy.testing.assert_array_equal(got, self.samples['Climb_stairs', name])
+    # up to date: no rebuild; a changed file: rebuilt
+    created = read_manifest(self.cache)['created']
+    self.assertEqual(ingest(self.root, self.cache)['created'], created)
+    self.write('Drink_glass', 'Accelerometer-0.txt', '1 2 3\n')
+    self.assertEqual(ingest(self.root, self.cache)['rows']['Drink_glass'], 1)
+
+  @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+  def test_bad_file_fails_ingest(self):
+    self.write('Drink_glass', 'Accelerometer-0.txt', '1 2 3\n4 5 6\n7 8 ?\n')
+    with self.assertRaises(ValueError):
+      ingest(self.root, self.cache, workers=1)
+    self.assertIsNone(read_manifest(self.cache))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Fit and forecast events: recording, the log file and pool hand-back."""
+import os
+import shutil
+import tempfile
+import unittest
+from champagne import instrumentation
+
+class Fitted(object):
+
+  mle_retvals = {'iterations': 7, 'converged': True}
+
+  def forecast(self, steps=1):
+    return [0.0] * steps
+
+class Model(object):
+
+  def __init__(self, n=30, fail=False):
+    self.endog = [0.0] * n
+    self.fail = fail
+
+  def fit(self, **kwargs):
+    if self.fail:
+      raise ValueError('singular matrix')
+    return Fitted()
+
+class InstrumentationTest(unittest.TestCase):
+
+  def setUp(self):
+    self.folder = tempfile.mkdtemp()
+    self.log = os.path.join(self.folder, 'events.jsonl')
+
+  def tearDown(self):
+    instrumentation.disable()
+    shutil.rmtree(self.folder)
+
+  def run_fits(self, n):
+    for i in range(n):
+      fitted = instrumentation.timed_fit(Model(), (1, 0, i % 2), 'evaluate', disp=0)
+      instrumentation.timed_forecast(fitted, (1, 0, i % 2), 'evaluate')
+
+  def fits(self, records):
+    return sum(1 for event in records if event['kind'] == 'fit')
+
+  # a second enable() starts a new run, in memory and in the log
+  def test_enable_starts_a_run(self):
+    for run in range(2):
+      instrumentation.enable(self.log)
+      self.run_fits(10)
+      self.assertEqual(self.fits(instrumentation.events()), 10)
+      self.assertEqual(self.fits(instrumentation.read_log(self.log)), 10)
+      rows, failures = instrumentation.summary()
+      self.assertEqual(sum(row['fits'] for order, row in rows), 10)
+
+  def test_failures(self):
+    instrumentation.enable()
+    self.run_fits(3)
+    with self.assertRaises(ValueError):
+      instrumentation.timed_fit(Model(fail=True), (2, 0, 0), 'evaluate')
+    rows, failures = instrumentation.summary()
+    self.assertEqual(failures, {'ValueError': 1})
+    self.assertEqual(dict(rows)[(2, 0, 0)]['failed'], 1)
+
+  # what a pool task takes from its process is merged into the parent's run
+  def test_take_and_merge(self):
+    instrumentation.enable()
+    self.run_fits(2)
+    start = instrumentation.mark()
+    self.run_fits(3)
+    taken = instrumentation.take(start)
+    self.assertEqual(self.fits(taken), 3)
+    self.assertEqual(self.fits(instrumentation.events()), 2)
+    instrumentation.merge(taken)
+    self.assertEqual(self.fits(instrumentation.events()), 5)
+
+  def test_disabled(self):
+    instrumentation.enable()
+    instrumentation.disable()
+    self.run_fits(2)
+    instrumentation.merge([{'kind': 'fit'}])
+    self.assertEqual(instrumentation.events(), [])
+
+if __name__ == '__main__':
+  unittest.main()
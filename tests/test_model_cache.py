@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""FitCache storage, eviction and concurrent removal of its entries."""
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy
+from champagne.model_cache import CachedFit, FitCache
+
+# a stored fit of about `size` bytes
+def cached_fit(size=800):
+  return CachedFit(params=numpy.zeros(3), arparams=numpy.zeros(1), maparams=numpy.zeros(1),
+                   sigma2=1.0, resid=numpy.zeros(size // 8), aic=1.0, bic=2.0, converged=True,
+                   forecasts=numpy.ones(1), stderr=numpy.ones(1), conf_int=numpy.ones((1, 2)))
+
+class FitCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.folder = tempfile.mkdtemp()
+    self.path = os.path.join(self.folder, 'cache')
+
+  def tearDown(self):
+    shutil.rmtree(self.folder)
+
+  def test_key(self):
+    cache = FitCache(self.path)
+    data = numpy.arange(10, dtype='float32')
+    self.assertEqual(cache.key(data, (1, 0, 0)), cache.key(data.copy(), (1, 0, 0)))
+    self.assertNotEqual(cache.key(data, (1, 0, 0)), cache.key(data, (1, 0, 1)))
+    self.assertNotEqual(cache.key(data, (1, 0, 0)), cache.key(data.astype('float64'), (1, 0, 0)))
+    self.assertNotEqual(cache.key(data, (1, 0, 0)), cache.key(data, (1, 0, 0), trend='c'))
+
+  def test_round_trip(self):
+    cache = FitCache(self.path)
+    key = cache.key(numpy.arange(5.0), (1, 0, 0))
+    self.assertIsNone(cache.load(key))
+    cache.store(key, cached_fit())
+    fit = cache.load(key)
+    self.assertEqual(fit.aic, 1.0)
+    numpy.testing.assert_array_equal(fit.conf_int, numpy.ones((1, 2)))
+    self.assertEqual(fit.forecast(1)[0].tolist(), [1.0])
+
+  # store() keeps the directory under max_bytes, dropping the oldest first
+  def test_evicts_by_size(self):
+    cache = FitCache(self.path, max_bytes=10000)
+    keys = [cache.key(numpy.arange(float(i)), (1, 0, 0)) for i in range(30)]
+    for i, key in enumerate(keys):
+      cache.store(key, cached_fit())
+      os.utime(cache._file(key), (1000000 + i, 1000000 + i))
+    self.assertLessEqual(cache.stats()['bytes'], 10000)
+    self.assertIsNotNone(cache.load(keys[-1]))
+    self.assertIsNone(cache.load(keys[0]))
+
+  def test_evicts_by_age(self):
+    cache = FitCache(self.path, max_age=60)
+    old, new = cache.key(numpy.zeros(1), (1, 0, 0)), cache.key(numpy.ones(1), (1, 0, 0))
+    cache.store(old, cached_fit())
+    os.utime(cache._file(old), (1000000, 1000000))
+    cache.store(new, cached_fit())
+    self.assertEqual(cache.evict(), 1)
+    self.assertIsNone(cache.load(old))
+    self.assertIsNotNone(cache.load(new))
+
+  # a copy sent to a pool worker leaves eviction to the parent
+  def test_pickled_copy_does_not_evict(self):
+    cache = FitCache(self.path, max_bytes=1000)
+    worker = pickle.loads(pickle.dumps(cache))
+    with mock.patch.object(FitCache, 'evict') as evict:
+      for i in range(5):
+        worker.store(worker.key(numpy.arange(float(i)), (1, 0, 0)), cached_fit())
+      evict.assert_not_called()
+    self.assertTrue(cache.evicts)
+    cache.evict()
+    self.assertLessEqual(cache.stats()['bytes'], 1000)
+
+  # entries removed by another process between listing and stat are skipped
+  def test_entries_removed_concurrently(self):
+    cache = FitCache(self.path)
+    key = cache.key(numpy.zeros(1), (1, 0, 0))
+    cache.store(key, cached_fit())
+    gone = os.path.join(self.path, 'ab', 'ab' + '0' * 62 + '.npz')
+    listing = [(self.path, [], []), (os.path.dirname(cache._file(key)), [],
+                                     [os.path.basename(cache._file(key)), os.path.basename(gone)])]
+    with mock.patch('os.walk', return_value=listing):
+      self.assertEqual(len(cache._entries()), 1)
+      self.assertEqual(cache.evict(), 0)
+    # and a load whose file vanishes before its access time is refreshed still returns the fit
+    with mock.patch('os.utime', side_effect=FileNotFoundError):
+      self.assertIsNotNone(cache.load(key))
+
+  def test_clear(self):
+    cache = FitCache(self.path)
+    for i in range(3):
+      cache.store(cache.key(numpy.arange(float(i)), (1, 0, 0)), cached_fit())
+    cache.clear()
+    self.assertEqual(cache.stats()['entries'], 0)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""pool_map(): order, laziness, errors and teardown of the shared pool."""
+import os
+import unittest
+from parallel import pool_map
+
+def square(x):
+  return x * x
+
+def fail_on_three(x):
+  if x == 3:
+    raise ValueError('bad task %d' % x)
+  return x
+
+def pid(x):
+  return os.getpid()
+
+class PoolMapTest(unittest.TestCase):
+
+  def test_ordered(self):
+    for workers in (1, 3):
+      self.assertEqual(list(pool_map(square, range(20), workers)), [x * x for x in range(20)])
+
+  def test_unordered(self):
+    self.assertEqual(sorted(pool_map(square, range(20), 3, ordered=False)),
+                     [x * x for x in range(20)])
+
+  def test_one_worker_runs_inline(self):
+    self.assertEqual(set(pool_map(pid, range(4), 1)), {os.getpid()})
+    self.assertNotIn(os.getpid(), set(pool_map(pid, range(4), 2)))
+
+  # in order, tasks are taken only as results are consumed
+  def test_bounded_in_flight(self):
+    taken = list()
+    def tasks():
+      for x in range(100):
+        taken.append(x)
+        yield x
+    results = pool_map(square, tasks(), 2, ahead=2)
+    self.assertEqual(next(results), 0)
+    self.assertLessEqual(len(taken), 5)
+    results.close()
+
+  def test_error_propagates(self):
+    for workers in (1, 2):
+      for ordered in (True, False):
+        with self.assertRaises(ValueError):
+          list(pool_map(fail_on_three, range(10), workers, ordered=ordered))
+
+  def test_stopping_early(self):
+    results = pool_map(square, range(1000), 2)
+    self.assertEqual([next(results) for i in range(3)], [0, 1, 4])
+    results.close()
+
+if __name__ == '__main__':
+  unittest.main()
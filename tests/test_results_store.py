@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""ResultsStore indexes, persistence and forecast reuse."""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy
+from champagne import results_store
+from champagne.results_store import ResultsStore, record_walk_forward
+
+# the forecasts of test_queries, as (series, order, origin, horizon, prediction, actual)
+def rows(seed=0):
+  rng = numpy.random.default_rng(seed)
+  result = list()
+  for series in ('a', 'b', 'c'):
+    for order in ((1, 0, 0), (2, 0, 1)):
+      for origin in rng.permutation(40)[:25].tolist():
+        for horizon in (1, 2):
+          result.append((series, order, origin, horizon, float(rng.normal()), float(rng.normal())))
+  rng.shuffle(result)
+  return result
+
+class ResultsStoreTest(unittest.TestCase):
+
+  def setUp(self):
+    self.folder = tempfile.mkdtemp()
+    self.path = os.path.join(self.folder, 'results')
+
+  def tearDown(self):
+    shutil.rmtree(self.folder)
+
+  # several flushes, so the indexes are merged rather than built once
+  def fill(self, store, data, flushes=4):
+    for i, (series, order, origin, horizon, prediction, actual) in enumerate(data):
+      store.append(series, order, origin, horizon, prediction, actual)
+      if i % (len(data) // flushes) == 0:
+        store.flush()
+    store.flush()
+
+  # the rows of data matching the conditions, ordered as query() orders them
+  def expected(self, data, series=None, low=0, high=1 << 24, order=None):
+    numbered = [(row, i) for i, row in enumerate(data)
+                if (series is None or row[0] == series) and low <= row[2] < high and
+                (order is None or row[1] == order)]
+    numbered.sort(key=lambda item: (item[0][2], item[0][3], item[1]) if series is not None
+                  else (item[0][2], item[1]))
+    return [row for row, i in numbered]
+
+  def check(self, result, rows):
+    self.assertEqual(result['series'].tolist(), [row[0] for row in rows])
+    self.assertEqual(result['origin'].tolist(), [row[2] for row in rows])
+    self.assertEqual(result['horizon'].tolist(), [row[3] for row in rows])
+    self.assertEqual(result['prediction'].tolist(), [row[4] for row in rows])
+    numpy.testing.assert_allclose(result['residual'], [row[5] - row[4] for row in rows])
+
+  def test_queries(self):
+    data = rows()
+    with ResultsStore(self.path) as store:
+      self.fill(store, data)
+      self.check(store.query(series='b'), self.expected(data, 'b'))
+      self.check(store.query(series='a', origin=(5, 17)), self.expected(data, 'a', 5, 17))
+      self.check(store.query(series='c', origin=(None, 3)), self.expected(data, 'c', 0, 3))
+      self.check(store.query(series='c', origin=(30, None)), self.expected(data, 'c', 30))
+      self.check(store.query(series='a', origin=7, order=(2, 0, 1)),
+                 self.expected(data, 'a', 7, 8, (2, 0, 1)))
+      # the origin index, across series
+      result = store.query(origin=(10, 20))
+      self.assertEqual(sorted(zip(result['series'], result['origin'], result['prediction'])),
+                       sorted((r[0], r[2], r[4]) for r in self.expected(data, None, 10, 20)))
+      self.assertEqual(len(store.query(series='missing')['origin']), 0)
+      self.assertEqual(len(store.query()['origin']), len(data))
+
+  def test_reopen(self):
+    data = rows(1)
+    with ResultsStore(self.path) as store:
+      self.fill(store, data)
+      summary = store.summary(series='a', order=(1, 0, 0), horizon=2)
+    store = ResultsStore(self.path)
+    self.assertEqual(len(store), len(data))
+    self.check(store.query(series='a', origin=(0, 40)), self.expected(data, 'a'))
+    self.assertEqual(store.summary(series='a', order=(1, 0, 0), horizon=2), summary)
+    # and the running statistics agree with the rows
+    residuals = store.query(series='a', order=(1, 0, 0), horizon=2)['residual']
+    self.assertEqual(summary['count'], len(residuals))
+    self.assertAlmostEqual(summary['mean'], residuals.mean())
+    self.assertAlmostEqual(summary['std'], residuals.std(ddof=1))
+    self.assertAlmostEqual(summary['rmse'], numpy.sqrt((residuals ** 2).mean()))
+    self.assertAlmostEqual(summary['mae'], numpy.abs(residuals).mean())
+    self.assertEqual(summary['max'], residuals.max())
+
+  # rows written by an interrupted flush are ignored, then overwritten
+  def test_torn_flush(self):
+    data = rows(2)
+    with ResultsStore(self.path) as store:
+      self.fill(store, data[:100], flushes=2)
+    for name, dtype in results_store.COLUMNS:
+      with open(os.path.join(self.path, name + '.bin'), 'ab') as f:
+        f.write(numpy.zeros(7, dtype=dtype).tobytes())
+    os.remove(os.path.join(self.path, 'origin.keys.npy'))
+    store = ResultsStore(self.path)
+    self.assertEqual(len(store), 100)
+    self.check(store.query(series='b'), self.expected(data[:100], 'b'))
+    self.assertEqual(len(store.query(origin=(0, 40))['origin']), 100)
+    self.fill(store, data[100:])
+    store = ResultsStore(self.path)
+    self.check(store.query(series='b'), self.expected(data, 'b'))
+    self.assertEqual(os.path.getsize(os.path.join(self.path, 'prediction.bin')), len(data) * 8)
+
+  def test_other_columns(self):
+    with ResultsStore(self.path) as store:
+      store.append('a', (1, 0, 0), 3, 1, 1.0, 2.0)
+    meta = os.path.join(self.path, results_store.META)
+    with open(meta) as f:
+      text = f.read()
+    with open(meta, 'w') as f:
+      f.write(text.replace('"fingerprint"', '"other"'))
+    with self.assertRaises(ValueError):
+      ResultsStore(self.path)
+
+  # a later forecast of the same origin replaces the earlier one in summary()
+  def test_summary_latest(self):
+    with ResultsStore(self.path) as store:
+      for origin in range(10):
+        store.append('a', (1, 0, 0), origin, 1, 0.0, 1.0)
+      store.flush()
+      store.append('a', (1, 0, 0), 4, 1, 0.0, 3.0)
+      store.append('a', (1, 0, 0), 4, 1, 0.0, 5.0)
+      store.append('a', (2, 0, 0), 4, 1, 0.0, 7.0)
+      summary = store.summary(series='a', order=(1, 0, 0))
+      self.assertEqual(summary['count'], 10)
+      self.assertEqual(summary['max'], 5.0)
+      self.assertAlmostEqual(summary['mean'], 1.4)
+      self.assertEqual(store.summary(series='a', order=(2, 0, 0))['count'], 1)
+    self.assertEqual(ResultsStore(self.path).summary(series='a', order=(1, 0, 0)), summary)
+
+class RecordWalkForwardTest(unittest.TestCase):
+
+  def setUp(self):
+    self.folder = tempfile.mkdtemp()
+    self.store = ResultsStore(os.path.join(self.folder, 'results'))
+    self.fits = list()
+    # a seasonal naive forecast instead of an ARIMA fit, recording each origin fitted
+    def forecast_step(X, n, order, interval=12, cache=None, stage='evaluate'):
+      self.fits.append(n)
+      return numpy.array([X[n - interval]])
+    patcher = mock.patch.object(results_store, 'forecast_step', forecast_step)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    rng = numpy.random.default_rng(0)
+    self.X = (1000 + 100 * rng.normal(size=60)).astype('float32')
+
+  def tearDown(self):
+    shutil.rmtree(self.folder)
+
+  def run_walk(self, X, interval=12):
+    self.fits = list()
+    return record_walk_forward(self.store, X, (1, 0, 0), start=40, interval=interval)
+
+  def test_reuse(self):
+    first = self.run_walk(self.X)
+    self.assertEqual(self.fits, list(range(40, 60)))
+    self.assertEqual(first['origin'].tolist(), list(range(40, 60)))
+    again = self.run_walk(self.X)
+    self.assertEqual(self.fits, [])
+    self.assertEqual(again['prediction'].tolist(), first['prediction'].tolist())
+
+  # only the origins whose data changed are refitted, and summary() follows
+  def test_changed_data(self):
+    self.run_walk(self.X)
+    X = self.X.copy()
+    X[48] += 500
+    result = self.run_walk(X)
+    self.assertEqual(self.fits, list(range(48, 60)))
+    self.assertEqual(result['actual'].tolist(), X[40:].tolist())
+    self.assertEqual(len(self.store), 32)
+    summary = self.store.summary(series='champagne', order=(1, 0, 0))
+    self.assertEqual(summary['count'], 20)
+    numpy.testing.assert_allclose(summary['mean'], result['residual'].mean(), rtol=1e-9)
+
+  def test_changed_interval(self):
+    self.run_walk(self.X)
+    self.run_walk(self.X, interval=6)
+    self.assertEqual(self.fits, list(range(40, 60)))
+
+  def test_longer_series(self):
+    self.run_walk(self.X[:50])
+    result = self.run_walk(self.X)
+    self.assertEqual(self.fits, list(range(50, 60)))
+    self.assertEqual(result['origin'].tolist(), list(range(40, 60)))
+
+if __name__ == '__main__':
+  unittest.main()